@@ -0,0 +1,64 @@
+"""
+Throughput of BallTracker.detect_frames per batch size (CPU by default)
+Batch size 1 is the old per-frame path; every batch size must give the same detections.
+"""
+
+import argparse
+import time
+from itertools import islice
+
+from trackers import BallTracker
+from utils import VideoFrameSource
+
+
+def benchmark_batch_size(model_path, frames, batch_size, device):
+    tracker = BallTracker(model_path, batch_size=batch_size)
+    tracker.model.to(device)
+
+    # Warm-up so model fusing / first-call allocations are not measured
+    tracker.detect_batch(frames[:batch_size])
+
+    start = time.perf_counter()
+    detections = tracker.detect_frames(frames)
+    elapsed = time.perf_counter() - start
+    return detections, elapsed
+
+
+def same_detections(a, b, tolerance=1.0):
+    """Batched letterboxing can move boxes by a fraction of a pixel, so compare with a tolerance"""
+    if len(a) != len(b):
+        return False
+    for det_a, det_b in zip(a, b):
+        if det_a.keys() != det_b.keys():
+            return False
+        if 1 in det_a and max(abs(x - y) for x, y in zip(det_a[1], det_b[1])) > tolerance:
+            return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-frame and batched ball detection throughput")
+    parser.add_argument('--video', default='input_videos/input_video2.mp4')
+    parser.add_argument('--model', default='models/yolo8_best2.pt')
+    parser.add_argument('--frames', type=int, default=120, help="number of frames to run on")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 4, 8, 16])
+    parser.add_argument('--device', default='cpu')
+    args = parser.parse_args()
+
+    frames = list(islice(VideoFrameSource(args.video), args.frames))
+    print(f"Benchmarking on {len(frames)} frames of {args.video} ({args.device})")
+
+    results = {}
+    for batch_size in args.batch_sizes:
+        results[batch_size] = benchmark_batch_size(args.model, frames, batch_size, args.device)
+
+    baseline_detections, baseline_time = results[args.batch_sizes[0]]
+    print(f"\n{'Batch':>6} {'Time (s)':>10} {'Frames/s':>10} {'Speedup':>8} {'Same output':>12}")
+    print("-" * 50)
+    for batch_size, (detections, elapsed) in results.items():
+        print(f"{batch_size:>6} {elapsed:>10.2f} {len(frames) / elapsed:>10.1f} "
+              f"{baseline_time / elapsed:>7.2f}x {str(same_detections(baseline_detections, detections)):>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Court keypoint engines: latency and accuracy against the float model (CPU)
+int8_static is calibrated on the first --calibration-frames frames and evaluated on the rest,
+so the reported keypoint error is on frames the calibration has not seen.
+"""
+
+import argparse
+import os
+import time
+from itertools import islice
+
+import numpy as np
+import torch
+
+from court_line_detector import CourtLineDetector, COURT_ENGINES
+from court_line_detector.inference_engine import engine_path, keypoint_error
+from utils import VideoFrameSource
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark court keypoint inference engines")
+    parser.add_argument('--video', default='input_videos/input_video2.mp4')
+    parser.add_argument('--model', default='models/court_keypoints_best.pt')
+    parser.add_argument('--frames', type=int, default=264, help="number of frames to run on")
+    parser.add_argument('--calibration-frames', type=int, default=64, help="int8_static calibration frames")
+    parser.add_argument('--engines', nargs='+', choices=list(COURT_ENGINES), default=list(COURT_ENGINES))
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--threads', type=int, default=None, help="torch CPU threads (default: torch's choice)")
+    parser.add_argument('--rebuild', action='store_true', help="ignore engines cached next to the model")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    frames = list(islice(VideoFrameSource(args.video), args.frames))
+    calibration_frames, frames = frames[:args.calibration_frames], frames[args.calibration_frames:]
+    print(f"Calibrating on {len(calibration_frames)} frames, evaluating on {len(frames)} frames of {args.video} "
+          f"(CPU, {torch.get_num_threads()} threads)")
+
+    results = {}
+    reference = None
+    for engine in ['eager'] + [engine for engine in args.engines if engine != 'eager']:
+        if args.rebuild and os.path.exists(engine_path(args.model, engine)):
+            os.remove(engine_path(args.model, engine))
+        # Infinite tolerance: measure the engine itself, never the float fallback
+        detector = CourtLineDetector(args.model, batch_size=args.batch_size, device='cpu', engine=engine,
+                                     engine_tolerance=float('inf'))
+        if engine != 'eager':
+            detector.prepare_engine(calibration_frames, check_frames=frames)
+        detector.predict_batch(frames[:args.batch_size])  # warm-up
+
+        start = time.perf_counter()
+        keypoints = np.array(detector.predict_video(frames))
+        elapsed = time.perf_counter() - start
+        if reference is None:
+            reference = keypoints
+        results[engine] = (elapsed, keypoint_error(reference, keypoints))
+
+    eager_time = results['eager'][0]
+    print(f"\n{'Engine':>14} {'ms/frame':>10} {'Frames/s':>10} {'Speedup':>8} {'Mean px':>8} {'P95 px':>8} {'Max px':>8}")
+    print("-" * 72)
+    for engine, (elapsed, error) in results.items():
+        print(f"{engine:>14} {1000 * elapsed / len(frames):>10.1f} {len(frames) / elapsed:>10.1f} "
+              f"{eager_time / elapsed:>7.2f}x {error.mean():>8.2f} {np.percentile(error, 95):>8.2f} {error.max():>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
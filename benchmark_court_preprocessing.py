@@ -0,0 +1,72 @@
+"""
+Court keypoint model input: per-frame PIL transform vs cv2 resize + batched normalize (CPU by default)
+Times preprocessing alone and full predict_video for each batch size, and reports how far the
+keypoints of the cv2 path are from the PIL path (the two resamplers differ slightly).
+"""
+
+import argparse
+import time
+from itertools import islice
+
+import numpy as np
+import torch
+
+from court_line_detector import CourtLineDetector
+from utils import VideoFrameSource, iter_batches
+
+
+def time_preprocessing(preprocess, frames, batch_size):
+    start = time.perf_counter()
+    with torch.inference_mode():
+        for batch_frames in iter_batches(frames, batch_size):
+            preprocess(batch_frames)
+    return time.perf_counter() - start
+
+
+def time_predict_video(detector, frames):
+    detector.predict_batch(frames[:detector.batch_size])  # warm-up
+    start = time.perf_counter()
+    keypoints = detector.predict_video(frames)
+    return keypoints, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark court keypoint preprocessing")
+    parser.add_argument('--video', default='input_videos/input_video2.mp4')
+    parser.add_argument('--model', default='models/court_keypoints_best.pt')
+    parser.add_argument('--frames', type=int, default=200, help="number of frames to run on")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8, 16, 32])
+    parser.add_argument('--device', default='cpu')
+    args = parser.parse_args()
+
+    frames = list(islice(VideoFrameSource(args.video), args.frames))
+    height, width = frames[0].shape[:2]
+    print(f"Benchmarking on {len(frames)} frames ({width}x{height}) of {args.video} ({args.device})")
+
+    detector = CourtLineDetector(args.model, device=args.device)
+
+    print(f"\nPreprocessing only (batch {detector.batch_size})")
+    pil_time = time_preprocessing(detector.preprocess_batch_pil, frames, detector.batch_size)
+    cv2_time = time_preprocessing(detector.preprocess_batch, frames, detector.batch_size)
+    print(f"PIL transform:  {len(frames) / pil_time:8.1f} frames/s")
+    print(f"cv2 + batched:  {len(frames) / cv2_time:8.1f} frames/s ({pil_time / cv2_time:.1f}x faster)")
+
+    # Original path: PIL transform, batches of 8
+    detector.fast_preprocess, detector.batch_size = False, 8
+    reference, reference_time = time_predict_video(detector, frames)
+    reference = np.array(reference)
+
+    print(f"\n{'Path':>22} {'Frames/s':>10} {'Speedup':>8} {'Mean px diff':>13} {'Max px diff':>12}")
+    print("-" * 69)
+    print(f"{'PIL, batch 8':>22} {len(frames) / reference_time:>10.1f} {1.0:>7.2f}x {0.0:>13.2f} {0.0:>12.2f}")
+    detector.fast_preprocess = True
+    for batch_size in args.batch_sizes:
+        detector.batch_size = batch_size
+        keypoints, elapsed = time_predict_video(detector, frames)
+        difference = np.abs(np.array(keypoints) - reference)
+        print(f"{f'cv2, batch {batch_size}':>22} {len(frames) / elapsed:>10.1f} {reference_time / elapsed:>7.2f}x "
+              f"{difference.mean():>13.2f} {difference.max():>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Mini court projection: closest-keypoint + player-height scaling (per point) vs per-frame court
+homography (whole video at once, MiniCourt.project_to_mini_court)
+Synthetic broadcast view: the court seen through a known perspective, panned in some segments
+and static in others, with keypoint noise. Reports time and the player position error of both
+against the true mini court positions.
+"""
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from mini_court import MiniCourt
+
+
+def synthetic_video(mini_court, num_frames, seed, keypoint_noise=2.0, static_fraction=0.5):
+    """Court keypoints, player boxes, ball boxes and the true mini court player positions"""
+    rng = np.random.default_rng(seed)
+    drawing = np.asarray(mini_court.drawing_key_points, dtype=np.float64).reshape(-1, 2)
+    # Broadcast-like trapezoid for the outer court corners (points 0, 1, 2, 3)
+    image_corners = np.array([[620, 260], [1300, 260], [330, 930], [1590, 930]], dtype=np.float64)
+    image_to_mini = cv2.getPerspectiveTransform(image_corners.astype(np.float32), drawing[:4].astype(np.float32))
+    mini_to_image = np.linalg.inv(image_to_mini)
+
+    # Camera pan: piecewise, static in static_fraction of the segments
+    segment_length = 60
+    pan = np.zeros(num_frames)
+    for start in range(0, num_frames, segment_length):
+        step = 0.0 if rng.random() < static_fraction else rng.uniform(-3, 3)
+        pan[start:start + segment_length] = step
+    pan = np.cumsum(pan)
+
+    court_keypoints, player_boxes, ball_boxes, true_positions = [], [], [], []
+    keypoints = cv2.perspectiveTransform(drawing[None], mini_to_image)[0]
+    player_mini = np.array([[drawing[:, 0].mean(), drawing[2, 1] + 5], [drawing[:, 0].mean(), drawing[0, 1] - 5]])
+    noise = rng.normal(0, keypoint_noise, keypoints.shape)
+    for frame_num in range(num_frames):
+        if frame_num == 0 or pan[frame_num] != pan[frame_num - 1]:
+            noise = rng.normal(0, keypoint_noise, keypoints.shape)  # static camera: same detection
+        shift = np.array([pan[frame_num], 0.0])
+        court_keypoints.append((keypoints + shift + noise).reshape(-1).astype(np.float32))
+
+        player_mini = player_mini + rng.normal(0, 0.3, player_mini.shape)
+        feet = cv2.perspectiveTransform(player_mini[None], mini_to_image)[0] + shift
+        heights = (150, 90)  # near and far player
+        player_boxes.append({player_id: [foot[0] - 25, foot[1] - height, foot[0] + 25, foot[1]]
+                             for player_id, foot, height in zip((1, 2), feet, heights)})
+        true_positions.append(player_mini.copy())
+
+        if rng.random() < 0.8:
+            x, y = rng.uniform(400, 1500), rng.uniform(200, 900)
+            ball_boxes.append({1: [x - 5, y - 5, x + 5, y + 5]})
+        else:
+            ball_boxes.append({})
+    return court_keypoints, player_boxes, ball_boxes, np.array(true_positions)
+
+
+def position_error(player_mini_court_detections, true_positions):
+    errors = [np.hypot(*(np.asarray(positions[player_id]) - true_positions[frame_num, player_id - 1]))
+              for frame_num, positions in enumerate(player_mini_court_detections) for player_id in positions]
+    return float(np.mean(errors))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark mini court projection")
+    parser.add_argument('--frames', type=int, default=5000)
+    parser.add_argument('--width', type=int, default=1920)
+    parser.add_argument('--height', type=int, default=1080)
+    args = parser.parse_args()
+
+    frame = np.zeros((args.height, args.width, 3), dtype=np.uint8)
+    keypoint_court, homography_court = MiniCourt(frame), MiniCourt(frame, projection='homography')
+    court_keypoints, player_boxes, ball_boxes, true_positions = synthetic_video(keypoint_court, args.frames, seed=0)
+    print(f"{args.frames} frames, {sum(len(players) for players in player_boxes)} player boxes, "
+          f"{sum(1 for ball in ball_boxes if ball)} ball boxes")
+
+    start = time.perf_counter()
+    keypoint_players, _ = keypoint_court.convert_bounding_boxes_to_mini_court_coordinates(
+        player_boxes, ball_boxes, court_keypoints)
+    keypoint_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    homography_court.project_to_mini_court(player_boxes, ball_boxes, court_keypoints)
+    arrays_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    homography_players, _ = homography_court.convert_bounding_boxes_to_mini_court_coordinates(
+        player_boxes, ball_boxes, court_keypoints)
+    dicts_time = time.perf_counter() - start
+
+    print(f"\n{'Projection':>24} {'Time':>9} {'Speedup':>8} {'Player error (mini px)':>23}")
+    print("-" * 67)
+    print(f"{'closest keypoint':>24} {keypoint_time:>8.3f}s {1.0:>7.1f}x "
+          f"{position_error(keypoint_players, true_positions):>23.2f}")
+    print(f"{'homography (arrays)':>24} {arrays_time:>8.3f}s {keypoint_time / arrays_time:>7.1f}x {'':>23}")
+    print(f"{'homography (dicts)':>24} {dicts_time:>8.3f}s {keypoint_time / dicts_time:>7.1f}x "
+          f"{position_error(homography_players, true_positions):>23.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Mini court overlay rendering: full-frame background blend + court redrawn every frame
+(draw_background_rectangle + draw_court) vs the pre-rendered court sprite blended into the
+mini court rectangle only (MiniCourt.draw_mini_court_frame), at 1080p and 4K.
+Reports ms per frame and checks that both give the same pixels.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from mini_court import MiniCourt
+
+RESOLUTIONS = {'1080p': (1080, 1920), '4K': (2160, 3840)}
+
+
+def redraw_frame(mini_court, frame):
+    """Overlay as drawn before the sprite: full-frame blend, then every line and keypoint"""
+    frame = mini_court.draw_background_rectangle(frame)
+    return mini_court.draw_court(frame)
+
+
+def time_render(render, frames, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for frame in frames:
+            render(frame)
+    return (time.perf_counter() - start) / (repeats * len(frames)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark mini court overlay rendering")
+    parser.add_argument('--frames', type=int, default=20)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'Resolution':>10} {'Redraw':>10} {'Sprite':>10} {'Speedup':>8} {'Identical':>10}")
+    print("-" * 52)
+    for name, (height, width) in RESOLUTIONS.items():
+        frames = [rng.integers(0, 256, (height, width, 3), dtype=np.uint8) for _ in range(args.frames)]
+        mini_court = MiniCourt(frames[0])
+
+        identical = all(np.array_equal(redraw_frame(mini_court, frame), mini_court.draw_mini_court_frame(frame.copy()))
+                        for frame in frames)
+        redraw_time = time_render(lambda frame: redraw_frame(mini_court, frame), frames, args.repeats)
+        # The sprite path draws in place, like the annotation pipeline does on its own frame copy
+        sprite_time = time_render(mini_court.draw_mini_court_frame, frames, args.repeats)
+
+        print(f"{name:>10} {redraw_time:>8.3f}ms {sprite_time:>8.3f}ms {redraw_time / sprite_time:>7.1f}x "
+              f"{str(identical):>10}")
+
+
+if __name__ == "__main__":
+    main()
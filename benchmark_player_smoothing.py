@@ -0,0 +1,117 @@
+"""
+Array-based PlayerTracker.smooth_detections vs the original per-track-ID frame scan
+Checks both give the same detections (values and key order) on synthetic tracks, then times
+them on broadcast-like footage with hundreds of transient track IDs.
+"""
+
+import argparse
+import copy
+import time
+
+import numpy as np
+
+from trackers.player_tracker import PlayerTracker
+
+
+def smooth_detections_loop(player_detections, max_gap=5):
+    """Original implementation (scans every frame once per track ID)"""
+    if not player_detections:
+        return player_detections
+
+    all_track_ids = set()
+    for frame_detections in player_detections:
+        all_track_ids.update(frame_detections.keys())
+
+    for track_id in all_track_ids:
+        frame_positions = []
+        for frame_idx, frame_detections in enumerate(player_detections):
+            if track_id in frame_detections:
+                frame_positions.append((frame_idx, frame_detections[track_id]))
+
+        if len(frame_positions) > 1:
+            for i in range(len(frame_positions) - 1):
+                start_frame, start_bbox = frame_positions[i]
+                end_frame, end_bbox = frame_positions[i + 1]
+                gap = end_frame - start_frame - 1
+                if 0 < gap <= max_gap:
+                    for frame_idx in range(start_frame + 1, end_frame):
+                        alpha = (frame_idx - start_frame) / (end_frame - start_frame)
+                        player_detections[frame_idx][track_id] = [
+                            start_bbox[0] + alpha * (end_bbox[0] - start_bbox[0]),
+                            start_bbox[1] + alpha * (end_bbox[1] - start_bbox[1]),
+                            start_bbox[2] + alpha * (end_bbox[2] - start_bbox[2]),
+                            start_bbox[3] + alpha * (end_bbox[3] - start_bbox[3])
+                        ]
+
+    return player_detections
+
+
+def synthetic_player_detections(num_frames, seed, num_players=2, transient_rate=0.5, miss_rate=0.1):
+    """
+    Two long player tracks plus short-lived IDs (crowd, ball kids, re-identified players),
+    each missing miss_rate of its frames; about transient_rate new IDs start per frame.
+    """
+    rng = np.random.default_rng(seed)
+    player_detections = [{} for _ in range(num_frames)]
+
+    tracks = [(track_id, 0, num_frames) for track_id in range(1, num_players + 1)]
+    next_id = num_players + 1
+    for start in np.flatnonzero(rng.random(num_frames) < transient_rate):
+        tracks.append((next_id, start, min(num_frames, start + int(rng.integers(3, 120)))))
+        next_id += 1
+
+    for track_id, start, stop in tracks:
+        x, y = rng.uniform(0, 1800), rng.uniform(0, 1000)
+        for frame_idx in range(start, stop):
+            x += rng.normal(0, 3)
+            y += rng.normal(0, 2)
+            if rng.random() >= miss_rate:
+                player_detections[frame_idx][track_id] = [x, y, x + 60, y + 150]
+    return player_detections
+
+
+def same_detections(a, b):
+    """Equal boxes and equal key order in every frame"""
+    return [list(frame.items()) for frame in a] == [list(frame.items()) for frame in b]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark player detection smoothing")
+    parser.add_argument('--frames', type=int, default=20000, help="length of the timed video")
+    parser.add_argument('--transient-rate', type=float, default=0.5, help="new track IDs per frame")
+    parser.add_argument('--checks', type=int, default=50, help="number of short random videos to compare")
+    args = parser.parse_args()
+
+    tracker = PlayerTracker.__new__(PlayerTracker)  # smoothing does not need the YOLO model
+
+    mismatches = 0
+    for seed in range(args.checks):
+        rng = np.random.default_rng(seed)
+        detections = synthetic_player_detections(int(rng.integers(1, 800)), seed,
+                                                 transient_rate=rng.uniform(0, 1), miss_rate=rng.uniform(0, 0.5))
+        max_gap = int(rng.integers(1, 10))
+        expected = smooth_detections_loop(copy.deepcopy(detections), max_gap)
+        if not same_detections(expected, tracker.smooth_detections(copy.deepcopy(detections), max_gap)):
+            mismatches += 1
+    print(f"Same output on {args.checks - mismatches}/{args.checks} random videos")
+
+    detections = synthetic_player_detections(args.frames, seed=0, transient_rate=args.transient_rate)
+    num_ids = len({track_id for frame in detections for track_id in frame})
+    print(f"\nTiming on {args.frames} frames with {num_ids} track IDs")
+
+    loop_input, vectorized_input = copy.deepcopy(detections), copy.deepcopy(detections)
+    start = time.perf_counter()
+    smooth_detections_loop(loop_input)
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    tracker.smooth_detections(vectorized_input)
+    vectorized_time = time.perf_counter() - start
+
+    print(f"Per-ID loop:  {loop_time:.3f}s")
+    print(f"Array-based:  {vectorized_time:.3f}s ({loop_time / vectorized_time:.0f}x faster)")
+    print(f"Same output:  {same_detections(loop_input, vectorized_input)}")
+
+
+if __name__ == "__main__":
+    main()
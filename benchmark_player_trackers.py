@@ -0,0 +1,78 @@
+"""
+Cost and ID stability of each player tracker profile (CPU by default)
+Reports ms/frame of PlayerTracker.detect_frames (detection + tracking + smoothing) and an
+ID-switch count, so the cheapest profile that keeps player IDs stable can be picked.
+"""
+
+import argparse
+import time
+from itertools import islice
+
+from trackers import PlayerTracker, TRACKER_PROFILES
+from trackers.player_tracker import box_iou
+from utils import VideoFrameSource
+
+
+def count_id_switches(player_detections, iou_threshold=0.5, max_gap=30):
+    """
+    ID switches without ground truth: a new ID that starts on the last box of a track lost
+    within max_gap frames (fragmentation), or an ID whose box jumps onto the previous box
+    of another ID (swap). Overlap means IoU >= iou_threshold.
+    """
+    last_seen = {}  # track_id -> (frame_num, bbox)
+    switches = 0
+    for frame_num, players in enumerate(player_detections):
+        for track_id, bbox in players.items():
+            if track_id in last_seen and box_iou([bbox], [last_seen[track_id][1]])[0, 0] >= iou_threshold:
+                continue
+            # Recent boxes of other IDs (for a new ID: only IDs missing from this frame)
+            others = [box for other_id, (seen, box) in last_seen.items()
+                      if other_id != track_id and frame_num - seen <= max_gap
+                      and (track_id in last_seen or other_id not in players)]
+            if others and box_iou([bbox], others).max() >= iou_threshold:
+                switches += 1
+        for track_id, bbox in players.items():
+            last_seen[track_id] = (frame_num, bbox)
+    return switches
+
+
+def benchmark_profile(model_path, frames, profile, device, batch_size):
+    tracker = PlayerTracker(model_path, tracker_profile=profile, batch_size=batch_size)
+    tracker.model.to(device)
+
+    # Warm-up so model fusing / first-call allocations are not measured
+    tracker.model.predict(frames[:1], verbose=False)
+
+    start = time.perf_counter()
+    detections = tracker.detect_frames(frames)
+    elapsed = time.perf_counter() - start
+    return detections, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare player tracker profiles: cost per frame and ID switches")
+    parser.add_argument('--video', default='input_videos/input_video2.mp4')
+    parser.add_argument('--model', default='yolov8x')
+    parser.add_argument('--frames', type=int, default=300, help="number of frames to run on")
+    parser.add_argument('--profiles', nargs='+', choices=list(TRACKER_PROFILES), default=list(TRACKER_PROFILES))
+    parser.add_argument('--batch-size', type=int, default=8, help="batch size of the numpy_bytetrack profile")
+    parser.add_argument('--device', default='cpu')
+    args = parser.parse_args()
+
+    frames = list(islice(VideoFrameSource(args.video), args.frames))
+    print(f"Benchmarking on {len(frames)} frames of {args.video} ({args.device})")
+
+    results = {}
+    for profile in args.profiles:
+        results[profile] = benchmark_profile(args.model, frames, profile, args.device, args.batch_size)
+
+    print(f"\n{'Profile':>16} {'ms/frame':>10} {'Frames/s':>10} {'IDs':>5} {'ID switches':>12}")
+    print("-" * 58)
+    for profile, (detections, elapsed) in results.items():
+        unique_ids = {track_id for players in detections for track_id in players}
+        print(f"{profile:>16} {1000 * elapsed / len(frames):>10.1f} {len(frames) / elapsed:>10.1f} "
+              f"{len(unique_ids):>5} {count_id_switches(detections):>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Vectorized find_ball_hits vs the original per-frame pandas loop
+Checks both give the same hit frames on synthetic ball trajectories, then times them on a long one.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from trackers.ball_tracker import get_ball_delta_y, find_ball_hits
+
+
+def find_ball_hits_loop(delta_y, start, stop, minimum_change_frames_for_hit=25):
+    """Original implementation (iloc lookups plus a look-ahead loop per sign change)"""
+    hits = []
+    look_ahead = int(minimum_change_frames_for_hit * 1.2)
+
+    for i in range(start, stop):
+        d0 = delta_y.iloc[i]
+        d1 = delta_y.iloc[i + 1]
+        neg2pos = (d0 < 0) and (d1 > 0)
+        pos2neg = (d0 > 0) and (d1 < 0)
+        if not (neg2pos or pos2neg):
+            continue
+
+        initial_sign = 1 if d0 > 0 else -1
+        change_count = 0
+        for j in range(i + 1, min(len(delta_y), i + look_ahead + 1)):
+            dj = delta_y.iloc[j]
+            if (initial_sign > 0 and dj < 0) or (initial_sign < 0 and dj > 0):
+                change_count += 1
+
+        if change_count >= minimum_change_frames_for_hit:
+            hits.append(i)
+
+    return hits
+
+
+def synthetic_ball_detections(num_frames, seed, miss_rate=0.2, noise=3.0):
+    """Ball bouncing between players (rallies of random length) with jitter and missed frames"""
+    rng = np.random.default_rng(seed)
+    detections = []
+    y, direction = 300.0, 1
+    frames_left = rng.integers(20, 90)
+    for _ in range(num_frames):
+        if frames_left == 0:
+            direction = -direction
+            frames_left = rng.integers(20, 90)
+        frames_left -= 1
+        y += direction * rng.uniform(2, 12)
+        if rng.random() < miss_rate:
+            detections.append({})
+            continue
+        x = 600 + rng.normal(0, 50)
+        cy = y + rng.normal(0, noise)
+        detections.append({1: [x - 5, cy - 5, x + 5, cy + 5]})
+    return detections
+
+
+def hit_range(delta_y, minimum_change_frames_for_hit):
+    look_ahead = int(minimum_change_frames_for_hit * 1.2)
+    return 1, max(1, len(delta_y) - look_ahead)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vectorized ball hit detection")
+    parser.add_argument('--frames', type=int, default=100_000, help="length of the benchmark trajectory")
+    parser.add_argument('--trajectories', type=int, default=50, help="synthetic trajectories for the equivalence check")
+    args = parser.parse_args()
+
+    # Equivalence on many short trajectories and hit parameters
+    checked_hits = 0
+    for seed in range(args.trajectories):
+        detections = synthetic_ball_detections(2_000, seed, miss_rate=0.05 * (seed % 8), noise=seed % 6)
+        for minimum_change_frames_for_hit in (5, 15, 25):
+            delta_y = get_ball_delta_y(detections)
+            start, stop = hit_range(delta_y, minimum_change_frames_for_hit)
+            expected = find_ball_hits_loop(delta_y, start, stop, minimum_change_frames_for_hit)
+            actual = find_ball_hits(delta_y, start, stop, minimum_change_frames_for_hit)
+            assert actual == expected, f"Mismatch for seed {seed}, minimum {minimum_change_frames_for_hit}"
+            checked_hits += len(expected)
+    print(f"✓ Same hit frames on {args.trajectories} trajectories x 3 settings ({checked_hits} hits)")
+
+    # Timing on one long trajectory
+    detections = synthetic_ball_detections(args.frames, seed=0)
+    delta_y = get_ball_delta_y(detections)
+    start, stop = hit_range(delta_y, 25)
+
+    t0 = time.perf_counter()
+    expected = find_ball_hits_loop(delta_y, start, stop)
+    loop_time = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    actual = find_ball_hits(delta_y, start, stop)
+    vectorized_time = time.perf_counter() - t0
+
+    assert actual == expected
+    print(f"\n{args.frames:,} frames, {len(actual)} hits")
+    print(f"  Loop:       {loop_time * 1000:10.1f} ms")
+    print(f"  Vectorized: {vectorized_time * 1000:10.1f} ms  ({loop_time / vectorized_time:.0f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
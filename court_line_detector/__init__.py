@@ -1 +1,4 @@
-from .court_line_detector import CourtLineDetector
\ No newline at end of file
+from .court_line_detector import CourtLineDetector
+from .camera_motion import CameraMotionDetector
+from .inference_engine import COURT_ENGINES
+from .keypoint_stabilizer import KeypointStabilizer, STABILIZER_METHODS
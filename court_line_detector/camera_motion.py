@@ -0,0 +1,87 @@
+import cv2
+import numpy as np
+
+
+class CameraMotionDetector:
+    """
+    Cheap camera motion / scene cut estimate for keyframe court detection.
+
+    Each frame is reduced to a small grayscale thumbnail and compared with the thumbnail of
+    the last keyframe by phase correlation, which gives the global translation and a
+    response (how well the two images match after shifting). The court fills most of a
+    broadcast frame, so players moving around barely affect the estimate.
+
+    check() classifies a frame as:
+    - 'static': shift below reuse_shift px, the keyframe keypoints are reused
+    - 'warp': shift up to max_warp_shift px, the keyframe keypoints are translated
+    - 'keyframe': scene cut or zoom (response below min_response), larger camera motion,
+      or max_interval frames since the last keyframe; the court model has to run
+    """
+
+    def __init__(self, thumbnail_width=480, reuse_shift=2.0, max_warp_shift=40.0, min_response=0.1,
+                 max_interval=300):
+        self.thumbnail_width = thumbnail_width
+        self.reuse_shift = reuse_shift          # full-resolution pixels
+        self.max_warp_shift = max_warp_shift    # full-resolution pixels
+        self.min_response = min_response
+        self.max_interval = max_interval
+        self.reset()
+
+    def reset(self):
+        """Forget the keyframe (call per video)"""
+        self.keyframe_thumbnail = None
+        self.keyframe_keypoints = None
+        self.frames_since_keyframe = 0
+        self.window = None
+        self.scale = 1.0
+        self.stats = {'frames': 0, 'keyframes': 0, 'cuts': 0, 'motion_keyframes': 0,
+                      'interval_keyframes': 0, 'warped': 0, 'reused': 0}
+
+    def thumbnail(self, frame):
+        height, width = frame.shape[:2]
+        thumbnail_height = max(1, round(height * self.thumbnail_width / width))
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        thumbnail = cv2.resize(gray, (self.thumbnail_width, thumbnail_height), interpolation=cv2.INTER_AREA)
+        self.scale = width / self.thumbnail_width
+        return thumbnail.astype(np.float32)
+
+    def check(self, frame):
+        """Classify one frame: ('static' | 'warp' | 'keyframe', (dx, dy) shift from the keyframe in px)"""
+        self.stats['frames'] += 1
+        thumbnail = self.thumbnail(frame)
+        if self.keyframe_thumbnail is None or thumbnail.shape != self.keyframe_thumbnail.shape:
+            return self._keyframe(thumbnail, None)
+
+        self.frames_since_keyframe += 1
+        if self.frames_since_keyframe >= self.max_interval:
+            return self._keyframe(thumbnail, 'interval_keyframes')
+
+        if self.window is None or self.window.shape != thumbnail.shape:
+            self.window = cv2.createHanningWindow(thumbnail.shape[::-1], cv2.CV_32F)
+        (dx, dy), response = cv2.phaseCorrelate(self.keyframe_thumbnail, thumbnail, self.window)
+        if response < self.min_response:
+            return self._keyframe(thumbnail, 'cuts')
+
+        shift = (dx * self.scale, dy * self.scale)
+        magnitude = np.hypot(*shift)
+        if magnitude > self.max_warp_shift:
+            return self._keyframe(thumbnail, 'motion_keyframes')
+        if magnitude < self.reuse_shift:
+            self.stats['reused'] += 1
+            return 'static', (0.0, 0.0)
+        self.stats['warped'] += 1
+        return 'warp', shift
+
+    def _keyframe(self, thumbnail, reason):
+        self.keyframe_thumbnail = thumbnail
+        self.frames_since_keyframe = 0
+        self.stats['keyframes'] += 1
+        if reason is not None:
+            self.stats[reason] += 1
+        return 'keyframe', (0.0, 0.0)
+
+    def get_stats(self):
+        """Counters, including the court model calls saved compared to running it on every frame"""
+        stats = dict(self.stats)
+        stats['model_calls_saved'] = stats['frames'] - stats['keyframes']
+        return stats
@@ -6,10 +6,47 @@ from torchvision.models import ResNet50_Weights
 import numpy as np
 import pickle
 import os
+import sys
+sys.path.append('../')
+from utils import iter_batches
+from .inference_engine import (COURT_ENGINES, QUANTIZED_ENGINES, build_engine, engine_path, keypoint_error,
+                               load_engine)
+
+INPUT_SIZE = 224
+IMAGENET_MEAN = [0.485, 0.456, 0.406]
+IMAGENET_STD = [0.229, 0.224, 0.225]
 
 class CourtLineDetector:
-    def __init__(self, model_path):
-        self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    def __init__(self, model_path, batch_size=8, fast_preprocess=False, device=None, engine='eager',
+                 engine_tolerance=3.0, calibration_frames=64, engine_check_frames=16):
+        """
+        batch_size: frames per forward pass in predict_video
+        fast_preprocess: cv2 resize + one batched normalize (see preprocess_batch) instead of
+        the per-frame torchvision PIL transform the model was trained with (keypoints differ
+        slightly, see benchmark_court_preprocessing.py), off by default
+        device: torch device, CUDA when available by default
+        engine: one of COURT_ENGINES; traced / int8 engines are built before the first prediction
+        (int8_static calibrated on frames sampled across the video) and cached next to the
+        weights, see prepare_engine
+        engine_tolerance: mean keypoint error (px) above which the engine is rejected for the float model
+        calibration_frames: frames sampled across the video to build / calibrate the engine on
+        engine_check_frames: frames sampled across the video, held out from calibration, on which
+        the engine is checked against the float model
+        """
+        if engine not in COURT_ENGINES:
+            raise ValueError(f"Unknown court engine '{engine}', choose from {list(COURT_ENGINES)}")
+        self.batch_size = batch_size
+        self.fast_preprocess = fast_preprocess
+        self.model_path = model_path
+        self.engine = engine
+        self.engine_tolerance = engine_tolerance
+        self.calibration_frames = calibration_frames
+        self.engine_check_frames = engine_check_frames
+        self.engine_model = None
+        self.device = torch.device(device or ('cpu' if engine in QUANTIZED_ENGINES or not torch.cuda.is_available()
+                                              else 'cuda'))
+        if engine in QUANTIZED_ENGINES and self.device.type != 'cpu':
+            raise ValueError(f"The {engine} court engine runs on CPU only")
         # Fix deprecation warning
         self.model = models.resnet50(weights=ResNet50_Weights.IMAGENET1K_V1)
         self.model.fc = torch.nn.Linear(self.model.fc.in_features, 14*2) 
@@ -18,65 +55,51 @@ class CourtLineDetector:
         self.model.eval()  # Set to evaluation mode
         self.transform = transforms.Compose([
             transforms.ToPILImage(),
-            transforms.Resize((224, 224)),
+            transforms.Resize((INPUT_SIZE, INPUT_SIZE)),
             transforms.ToTensor(),
-            transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
+            transforms.Normalize(mean=IMAGENET_MEAN, std=IMAGENET_STD)
         ])
+        # Batched normalize on the device: (pixel - 255 * mean) / (255 * std)
+        self.pixel_mean = torch.tensor(IMAGENET_MEAN, device=self.device).view(1, 3, 1, 1) * 255.0
+        self.pixel_scale = 1.0 / (torch.tensor(IMAGENET_STD, device=self.device).view(1, 3, 1, 1) * 255.0)
+        self.resize_buffer = np.empty((0, INPUT_SIZE, INPUT_SIZE, 3), dtype=np.uint8)
+        self.input_tensor = None
 
     def predict(self, image):
         """Predict keypoints for a single frame"""
-        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        image_tensor = self.transform(image_rgb).unsqueeze(0).to(self.device)
-        
-        with torch.no_grad():
-            outputs = self.model(image_tensor)
-        
-        keypoints = outputs.squeeze().cpu().numpy()
-        original_h, original_w = image.shape[:2]
-        keypoints[::2] *= original_w / 224.0
-        keypoints[1::2] *= original_h / 224.0
-
-        return keypoints
+        return self.predict_batch([image])[0]
     
-    def predict_video(self, video_frames, read_from_stub=False, stub_path=None):
-        """Predict keypoints for all frames with caching"""
+    def predict_video(self, video_frames, read_from_stub=False, stub_path=None, motion_detector=None):
+        """
+        Predict keypoints for all frames with caching.
+        With a CameraMotionDetector the model only runs on keyframes (see predict_keyframes).
+        """
         # Try to load from cache
         if read_from_stub and stub_path and os.path.exists(stub_path):
             with open(stub_path, 'rb') as f:
                 print(f"Loading court keypoints from cache: {stub_path}")
                 return pickle.load(f)
         
-        print(f"Detecting court keypoints in {len(video_frames)} frames...")
-        all_keypoints = []
+        # Engine built / checked on frames from across the video rather than the first batch
+        if self.engine_model is None and self.engine != 'eager' and len(video_frames) > 0:
+            calibration_frames, check_frames = self.sample_engine_frames(video_frames)
+            if calibration_frames:
+                self.prepare_engine(calibration_frames, check_frames)
         
-        # Batch processing for speed
-        batch_size = 8
-        for i in range(0, len(video_frames), batch_size):
-            batch_frames = video_frames[i:i+batch_size]
-            
-            # Process batch
-            batch_tensors = []
-            for frame in batch_frames:
-                image_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                image_tensor = self.transform(image_rgb)
-                batch_tensors.append(image_tensor)
-            
-            # Stack and predict
-            batch_tensor = torch.stack(batch_tensors).to(self.device)
-            with torch.no_grad():
-                outputs = self.model(batch_tensor)
+        if motion_detector is not None:
+            all_keypoints = self.predict_keyframes(video_frames, motion_detector)
+        else:
+            print(f"Detecting court keypoints in {len(video_frames)} frames...")
+            all_keypoints = []
             
-            # Process outputs
-            for j, output in enumerate(outputs):
-                keypoints = output.cpu().numpy()
-                frame = batch_frames[j]
-                original_h, original_w = frame.shape[:2]
-                keypoints[::2] *= original_w / 224.0
-                keypoints[1::2] *= original_h / 224.0
-                all_keypoints.append(keypoints)
-            
-            if (i+batch_size) % 100 == 0:
-                print(f"Processed {min(i+batch_size, len(video_frames))}/{len(video_frames)} frames")
+            # Batch processing for speed (works on lists and streaming frame sources alike)
+            batch_size = self.batch_size
+            for batch_index, batch_frames in enumerate(iter_batches(video_frames, batch_size)):
+                i = batch_index * batch_size
+                all_keypoints.extend(self.predict_batch(batch_frames))
+                
+                if (i+batch_size) % 100 == 0:
+                    print(f"Processed {min(i+batch_size, len(video_frames))}/{len(video_frames)} frames")
         
         # Save to cache
         if stub_path:
@@ -86,6 +109,161 @@ class CourtLineDetector:
             print(f"Saved court keypoints to: {stub_path}")
         
         return all_keypoints
+    
+    def preprocess_batch(self, batch_frames):
+        """
+        Model input for a list of BGR frames: each frame is resized with cv2 (INTER_AREA, the
+        closest to PIL's antialiased downscale) and converted to RGB into a reused uint8 buffer,
+        then the whole batch is moved to the device as uint8 and normalized in one step into a
+        reused float tensor.
+        """
+        batch_size = len(batch_frames)
+        if len(self.resize_buffer) < batch_size:
+            self.resize_buffer = np.empty((batch_size, INPUT_SIZE, INPUT_SIZE, 3), dtype=np.uint8)
+        for i, frame in enumerate(batch_frames):
+            resized = cv2.resize(frame, (INPUT_SIZE, INPUT_SIZE), interpolation=cv2.INTER_AREA)
+            cv2.cvtColor(resized, cv2.COLOR_BGR2RGB, dst=self.resize_buffer[i])
+        
+        pixels = torch.from_numpy(self.resize_buffer[:batch_size]).to(self.device, non_blocking=True)
+        if self.input_tensor is None or self.input_tensor.shape[0] < batch_size:
+            self.input_tensor = torch.empty((batch_size, 3, INPUT_SIZE, INPUT_SIZE), device=self.device)
+        input_tensor = self.input_tensor[:batch_size]
+        torch.sub(pixels.permute(0, 3, 1, 2), self.pixel_mean, out=input_tensor)
+        return input_tensor.mul_(self.pixel_scale)
+    
+    def preprocess_batch_pil(self, batch_frames):
+        """Model input through the per-frame torchvision transform (ToPILImage, Resize, ToTensor, Normalize)"""
+        batch_tensors = []
+        for frame in batch_frames:
+            image_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            image_tensor = self.transform(image_rgb)
+            batch_tensors.append(image_tensor)
+        return torch.stack(batch_tensors).to(self.device)
+    
+    def sample_engine_frames(self, video_frames):
+        """
+        (calibration frames, check frames) spread evenly over video_frames (a list or a frame
+        source), disjoint so the engine is checked on frames its calibration has not seen.
+        """
+        num_samples = min(len(video_frames), self.calibration_frames + self.engine_check_frames)
+        indices = np.unique(np.linspace(0, len(video_frames) - 1, num_samples).round().astype(int)).tolist()
+        if hasattr(video_frames, 'read_frames'):
+            frames = video_frames.read_frames(indices)
+        else:
+            frames = [video_frames[i] for i in indices]
+        return self.split_engine_frames(frames)
+    
+    def split_engine_frames(self, frames):
+        """Hold out engine_check_frames of frames (every k-th, at most half) for the engine check"""
+        num_check = min(self.engine_check_frames, len(frames) // 2)
+        if num_check == 0:
+            return frames, frames  # a single frame: nothing to hold out
+        held_out = set(np.linspace(0, len(frames) - 1, num_check + 2)[1:-1].round().astype(int).tolist())
+        return ([frame for i, frame in enumerate(frames) if i not in held_out],
+                [frame for i, frame in enumerate(frames) if i in held_out])
+    
+    def prepare_engine(self, calibration_frames, check_frames=None):
+        """
+        Load the cached engine, or build it from the float model (int8_static is calibrated on
+        calibration_frames) and cache it. Either way its keypoints are checked against the float
+        model on check_frames (by default held out from calibration_frames, see
+        split_engine_frames); above engine_tolerance the float model is used.
+        """
+        if check_frames is None:
+            calibration_frames, check_frames = self.split_engine_frames(list(calibration_frames))
+        path = engine_path(self.model_path, self.engine)
+        if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(self.model_path):
+            print(f"Loading {self.engine} court engine from: {path}")
+            self.engine_model = load_engine(path, self.engine, self.device)
+        else:
+            print(f"Building {self.engine} court engine on {len(calibration_frames)} frames...")
+            calibration_batches = []
+            for batch_frames in iter_batches(calibration_frames, self.batch_size):
+                with torch.inference_mode():
+                    batch_tensor = self.model_input(batch_frames)
+                calibration_batches.append(batch_tensor.clone())  # normal tensor, usable for tracing
+            self.engine_model = build_engine(self.model, self.engine, calibration_batches[0], calibration_batches)
+            torch.jit.save(self.engine_model, path)
+            print(f"Saved {self.engine} court engine to: {path}")
+        
+        error = np.concatenate([keypoint_error(self.run_model(self.model, batch_frames),
+                                               self.run_model(self.engine_model, batch_frames))
+                                for batch_frames in iter_batches(check_frames, self.batch_size)])
+        print(f"{self.engine} court engine keypoint error vs float model on {len(check_frames)} held-out frames: "
+              f"mean {error.mean():.2f}px, max {error.max():.2f}px")
+        if error.mean() > self.engine_tolerance:
+            print(f"Warning: above the {self.engine_tolerance}px tolerance, using the float court model instead")
+            self.engine_model = self.model
+    
+    def model_input(self, batch_frames):
+        if self.fast_preprocess:
+            return self.preprocess_batch(batch_frames)
+        return self.preprocess_batch_pil(batch_frames)
+    
+    def predict_batch(self, batch_frames):
+        """Predict keypoints for a list of frames in one forward pass"""
+        if self.engine_model is None:
+            if self.engine == 'eager':
+                self.engine_model = self.model
+            else:
+                self.prepare_engine(batch_frames)
+        return self.run_model(self.engine_model, batch_frames)
+    
+    def run_model(self, model, batch_frames):
+        """Keypoints of a batch in original frame pixels, from the given model / engine"""
+        with torch.inference_mode():
+            outputs = model(self.model_input(batch_frames)).cpu().numpy()
+        
+        # Process outputs
+        all_keypoints = []
+        for keypoints, frame in zip(outputs, batch_frames):
+            original_h, original_w = frame.shape[:2]
+            keypoints[::2] *= original_w / float(INPUT_SIZE)
+            keypoints[1::2] *= original_h / float(INPUT_SIZE)
+            all_keypoints.append(keypoints)
+        return all_keypoints
+    
+    def predict_keyframes(self, video_frames, motion_detector, batch_size=None):
+        """
+        Run the model only on keyframes chosen by a CameraMotionDetector: the first frame,
+        scene cuts, larger camera motion. Other frames reuse the keypoints of the last keyframe,
+        translated by the estimated camera shift. Keyframes are batched, so only up to
+        batch_size frames are held at a time.
+        
+        The detector keeps the last keyframe between calls, so a video can be processed in
+        consecutive chunks (call motion_detector.reset() per video).
+        """
+        print(f"Detecting court keypoints in {len(video_frames)} frames (keyframes only)...")
+        batch_size = batch_size or self.batch_size
+        # Per frame: (index into keyframe_keypoints, (dx, dy)); -1 is the keyframe of a previous call
+        frame_sources = []
+        keyframe_keypoints = []
+        pending_keyframes = []
+        
+        for frame in video_frames:
+            kind, shift = motion_detector.check(frame)
+            if kind == 'keyframe':
+                pending_keyframes.append(frame)
+                if len(pending_keyframes) == batch_size:
+                    keyframe_keypoints.extend(self.predict_batch(pending_keyframes))
+                    pending_keyframes = []
+            frame_sources.append((len(keyframe_keypoints) + len(pending_keyframes) - 1, shift))
+        if pending_keyframes:
+            keyframe_keypoints.extend(self.predict_batch(pending_keyframes))
+        
+        all_keypoints = []
+        for keyframe, (dx, dy) in frame_sources:
+            keypoints = (keyframe_keypoints[keyframe] if keyframe >= 0 else motion_detector.keyframe_keypoints).copy()
+            keypoints[::2] += dx
+            keypoints[1::2] += dy
+            all_keypoints.append(keypoints)
+        if keyframe_keypoints:
+            motion_detector.keyframe_keypoints = keyframe_keypoints[-1]
+        
+        stats = motion_detector.get_stats()
+        print(f"Court model ran on {stats['keyframes']}/{stats['frames']} frames "
+              f"({stats['model_calls_saved']} calls saved: {stats['reused']} reused, {stats['warped']} warped)")
+        return all_keypoints
 
     def draw_keypoints(self, image, keypoints):
         """Draw keypoints on a single image"""
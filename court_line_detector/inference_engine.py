@@ -0,0 +1,85 @@
+import copy
+import os
+
+import numpy as np
+import torch
+
+# name -> description; everything but 'eager' is TorchScript, int8 engines run on CPU only
+COURT_ENGINES = {
+    'eager': "float32 torchvision model (default)",
+    'traced': "float32, traced and frozen TorchScript",
+    'int8_dynamic': "traced, fully connected head dynamically quantized to int8",
+    'int8_static': "traced, convolutions and head statically quantized to int8 (needs calibration frames)",
+}
+QUANTIZED_ENGINES = ('int8_dynamic', 'int8_static')
+
+
+def quantized_backend():
+    """Best available quantized kernel backend for this CPU (x86 > fbgemm > qnnpack)"""
+    supported = torch.backends.quantized.supported_engines
+    for backend in ('x86', 'fbgemm', 'qnnpack'):
+        if backend in supported:
+            return backend
+    raise RuntimeError(f"No int8 backend available in this torch build (supported: {supported})")
+
+
+def engine_path(model_path, engine):
+    """Where the engine built from model_path is cached, e.g. models/court_keypoints_best.int8_static.ts"""
+    return f"{os.path.splitext(model_path)[0]}.{engine}.ts"
+
+
+def trace_model(model, example_input):
+    """TorchScript trace of an eval model, frozen so weights are constants and conv/bn can be folded"""
+    with torch.no_grad():
+        traced = torch.jit.trace(model.eval(), example_input)
+    return torch.jit.freeze(traced)
+
+
+def quantize_dynamic(model):
+    """int8 weights for the nn.Linear layers, activations quantized on the fly"""
+    return torch.ao.quantization.quantize_dynamic(copy.deepcopy(model).eval(), {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def quantize_static(model, calibration_batches, backend):
+    """
+    Post-training static int8 quantization (FX graph mode): conv/bn/relu are fused, observers
+    record activation ranges on calibration_batches (preprocessed input tensors), and the
+    model is converted to int8 kernels.
+    """
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+    torch.backends.quantized.engine = backend
+    prepared = prepare_fx(copy.deepcopy(model).eval(), get_default_qconfig_mapping(backend),
+                          example_inputs=(calibration_batches[0],))
+    with torch.no_grad():
+        for batch in calibration_batches:
+            prepared(batch)
+    return convert_fx(prepared)
+
+
+def build_engine(model, engine, example_input, calibration_batches=None):
+    """Engine module for a float eval model; example_input is a preprocessed batch used for tracing"""
+    if engine not in COURT_ENGINES:
+        raise ValueError(f"Unknown court engine '{engine}', choose from {list(COURT_ENGINES)}")
+    if engine == 'eager':
+        return model
+    if engine == 'int8_dynamic':
+        torch.backends.quantized.engine = quantized_backend()
+        model = quantize_dynamic(model)
+    elif engine == 'int8_static':
+        model = quantize_static(model, calibration_batches or [example_input], quantized_backend())
+    return trace_model(model, example_input)
+
+
+def load_engine(path, engine, device):
+    """Load a cached engine (TorchScript); the quantized backend has to be set before loading"""
+    if engine in QUANTIZED_ENGINES:
+        torch.backends.quantized.engine = quantized_backend()
+    return torch.jit.load(path, map_location=device)
+
+
+def keypoint_error(reference, keypoints):
+    """Euclidean pixel distance of each keypoint from the reference, shape (frames, 14)"""
+    difference = np.asarray(keypoints, dtype=np.float64) - np.asarray(reference, dtype=np.float64)
+    return np.linalg.norm(difference.reshape(len(difference), -1, 2), axis=2)
@@ -0,0 +1,131 @@
+import numpy as np
+
+STABILIZER_METHODS = ('median', 'one_euro')
+
+
+def causal_median(values, window, start=0):
+    """
+    Median of values[max(0, i - window + 1):i + 1] for every i >= start, shape (len(values) - start, dims).
+    Full windows are sorted all at once as `window` shifted copies; only the first window - 1
+    rows of a sequence need a partial window.
+    """
+    medians = np.empty((len(values) - start, values.shape[1]))
+    first_full = max(start, window - 1)
+    for i in range(start, min(first_full, len(values))):
+        medians[i - start] = np.median(values[:i + 1], axis=0)
+    if first_full < len(values):
+        shifted = np.stack([values[first_full - window + 1 + k:len(values) - window + 1 + k] for k in range(window)])
+        shifted.sort(axis=0)
+        middle = window // 2
+        medians[first_full - start:] = shifted[middle] if window % 2 else (shifted[middle - 1] + shifted[middle]) / 2
+    return medians
+
+
+class KeypointStabilizer:
+    """
+    Temporal stabilization of court keypoints (N x 28, as from CourtLineDetector.predict_video).
+
+    1. Outlier frames: each frame is compared with the median of the previous `window` raw
+       frames after removing their median translation (so camera pans are not outliers). A
+       frame whose keypoints are then on average more than outlier_threshold px off is replaced
+       by the last good frame. A camera cut is accepted once the window median has moved to the
+       new view.
+    2. Smoothing, causal so it works while streaming:
+       - 'median': median of the last `window` frames
+       - 'one_euro': One-Euro filter per coordinate, smoothing jitter when the keypoints are
+         still while following camera pans with little lag (the cutoff grows with speed).
+         Its gain depends on the previous filtered value, so frames are filtered one after
+         another (vectorized over the 28 coordinates only): about 10-20 us per frame, i.e.
+         0.2-0.4 s for 20k frames (the array-based 'median' takes about 0.07 s)
+
+    stabilize() processes a whole sequence with array operations and continues from the state
+    of the previous call, so a video can be stabilized at once or chunk by chunk (or frame by
+    frame with update()) with the same result. Call reset() per video.
+    """
+
+    def __init__(self, method='one_euro', fps=30.0, window=5, outlier_threshold=25.0,
+                 min_cutoff=1.0, beta=0.02, d_cutoff=1.0):
+        if method not in STABILIZER_METHODS:
+            raise ValueError(f"Unknown keypoint stabilizer '{method}', choose from {list(STABILIZER_METHODS)}")
+        self.method = method
+        self.fps = fps
+        self.window = window
+        self.outlier_threshold = outlier_threshold  # mean keypoint distance in px, None disables
+        self.min_cutoff = min_cutoff  # Hz
+        self.beta = beta              # cutoff increase per px/s of keypoint speed
+        self.d_cutoff = d_cutoff      # Hz, for the speed estimate
+        self.reset()
+
+    def reset(self):
+        self.raw_history = None      # last `window` raw frames
+        self.clean_history = None    # last `window` frames after outlier replacement
+        self.filtered = None         # One-Euro state: last output and speed
+        self.speed = None
+        self.rejected_frames = 0
+
+    def update(self, keypoints):
+        """Stabilize one frame"""
+        return self.stabilize([keypoints])[0]
+
+    def stabilize(self, keypoints):
+        """Stabilize consecutive frames (continuing from the previous call), list of float32 arrays"""
+        if len(keypoints) == 0:  # empty streaming chunk
+            return []
+        raw = np.asarray(keypoints, dtype=np.float64).reshape(len(keypoints), -1)
+        history = 0 if self.raw_history is None else len(self.raw_history)
+        all_raw = raw if history == 0 else np.concatenate([self.raw_history, raw])
+
+        clean = self._replace_outliers(raw, all_raw, history)
+        all_clean = clean if history == 0 else np.concatenate([self.clean_history, clean])
+        if self.method == 'median':
+            stabilized = causal_median(all_clean, self.window, start=history)
+        else:
+            stabilized = self._one_euro(clean)
+
+        self.raw_history = all_raw[-self.window:]
+        self.clean_history = all_clean[-self.window:]
+        return list(stabilized.astype(np.float32))
+
+    def _replace_outliers(self, raw, all_raw, history):
+        """raw with outlier frames replaced by the last good frame (hold-last-good)"""
+        good = np.ones(len(raw), dtype=bool)
+        if self.outlier_threshold is not None:
+            # Reference for frame i: median of the window raw frames before it
+            first = 1 if history == 0 else 0  # the very first frame has no reference
+            if first < len(raw):
+                previous = all_raw[:-1]
+                reference = causal_median(previous, self.window, start=history + first - 1)
+                offsets = (raw[first:] - reference).reshape(len(reference), -1, 2)
+                offsets -= np.median(offsets, axis=1, keepdims=True)  # camera translation
+                good[first:] = np.linalg.norm(offsets, axis=2).mean(axis=1) <= self.outlier_threshold
+        self.rejected_frames += int((~good).sum())
+
+        # Forward fill: index of the last good frame, -1 before the first good one in this call
+        last_good = np.maximum.accumulate(np.where(good, np.arange(len(raw)), -1))
+        clean = raw[np.maximum(last_good, 0)]
+        if (last_good < 0).any():
+            clean[last_good < 0] = self.clean_history[-1]
+        return clean
+
+    def _one_euro(self, values):
+        """
+        One-Euro filter over frames, vectorized over the coordinates. The recursion is
+        nonlinear (the cutoff follows the speed estimated from the last output), so it cannot
+        be turned into array operations over time like causal_median; the loop stays per frame.
+        """
+        # Smoothing factor for a cutoff f: 1 / (1 + fps / (2 pi f)) = 2 pi f / (2 pi f + fps)
+        output = np.empty_like(values)
+        fps = self.fps
+        alpha_speed = 2 * np.pi * self.d_cutoff / (2 * np.pi * self.d_cutoff + fps)
+        min_cutoff, beta = 2 * np.pi * self.min_cutoff, 2 * np.pi * self.beta
+        filtered, speed = self.filtered, self.speed
+        if filtered is None:
+            filtered, speed = values[0].copy(), np.zeros_like(values[0])
+        for i, value in enumerate(values):
+            change = value - filtered
+            speed += alpha_speed * (change * fps - speed)
+            cutoff = min_cutoff + beta * np.abs(speed)
+            filtered += cutoff / (cutoff + fps) * change
+            output[i] = filtered
+        self.filtered, self.speed = filtered, speed
+        return output
@@ -1,40 +1,106 @@
-from utils import (read_video, 
+from utils import (open_video,
+                   BallTrajectory,
                    save_video,
-                   measure_distance,
-                   draw_player_stats,
-                   convert_pixel_distance_to_meters)
+                   get_initial_player_stats,
+                   get_next_player_stats,
+                   get_player_stats_dataframe)
 
-from trackers import PlayerTracker, BallTracker
-from court_line_detector import CourtLineDetector
-from mini_court import MiniCourt
+from trackers import PlayerTracker, BallTracker, TRACKER_PROFILES, DEFAULT_TRACKER_PROFILE
+from court_line_detector import (CourtLineDetector, CameraMotionDetector, KeypointStabilizer, COURT_ENGINES,
+                                 STABILIZER_METHODS)
+from mini_court import MiniCourt, MINI_COURT_PROJECTIONS
+from pipeline import WindowedPipeline, annotate_frame
+import argparse
 import os
-import cv2  
-import pandas as pd
-import constants
-from copy import deepcopy
 
-def main():
-    #read video
-    input_video_path = 'input_videos/input_video2.mp4'
-    video_frames = read_video(input_video_path)
+INPUT_VIDEO_PATH = 'input_videos/input_video2.mp4'
+
+def generate_output_frames(video_frames, player_tracker, player_detections, ball_tracker, ball_detections,
+                           court_line_detector, court_keypoints, mini_court, player_stats_data_df,
+                           player_mini_court_detections, ball_mini_court_detections):
+    """Annotate frames one at a time so the output video never has to be held in memory."""
+    for i, frame in enumerate(video_frames):
+        yield annotate_frame(frame, i, player_tracker, ball_tracker, court_line_detector, mini_court,
+                             player_detections[i], ball_detections[i], court_keypoints[i],
+                             player_stats_data_df.iloc[i],
+                             player_mini_court_detections[i], ball_mini_court_detections[i])
+
+def print_throughput_stats(video_frames, video_writer):
+    """Report background decode (only available when prefetching) and encode throughput."""
+    if hasattr(video_frames, 'get_throughput_stats'):
+        stats = video_frames.get_throughput_stats()
+        print(f"Decoded {stats['frames_decoded']} frames at {stats['decode_fps']:.1f} frames/s, "
+              f"consumer waited {stats['consumer_wait_seconds']:.1f}s for frames")
+    stats = video_writer.get_throughput_stats()
+    print(f"Encoded {stats['frames_written']} frames at {stats['encode_fps']:.1f} frames/s")
+
+def main_windowed(input_video_path=INPUT_VIDEO_PATH, chunk_size=320, prefetch=32, ball_tracker_options=None,
+                  player_tracker_options=None, court_keyframes=False, court_detector_options=None,
+                  court_stabilizer_method=None, mini_court_projection='keypoint'):
+    """Same analysis as main(), processed in chunks with bounded memory (see WindowedPipeline)."""
+    video_frames = open_video(input_video_path, prefetch=prefetch)
+    print(f"Total frames: {len(video_frames)}")
+    print(f"Video FPS: {video_frames.fps}")
+    
+    video_name = os.path.splitext(os.path.basename(input_video_path))[0]
+    
+    pipeline = WindowedPipeline(PlayerTracker(model_path='yolov8x', **(player_tracker_options or {})),
+                                BallTracker(model_path='models/yolo8_best2.pt', **(ball_tracker_options or {})),
+                                CourtLineDetector('models/court_keypoints_best.pt', **(court_detector_options or {})),
+                                video_fps=video_frames.fps,
+                                chunk_size=chunk_size,
+                                court_motion_detector=CameraMotionDetector() if court_keyframes else None,
+                                court_stabilizer=KeypointStabilizer(court_stabilizer_method, fps=video_frames.fps)
+                                if court_stabilizer_method else None,
+                                mini_court=MiniCourt(video_frames.read_frame(0), projection=mini_court_projection))
+    output_video_frames = pipeline.run(video_frames,
+                                       player_stub_path=f'tracker_stubs/player_detections_{video_name}.pkl',
+                                       ball_stub_path=f'tracker_stubs/ball_detections_{video_name}.pkl',
+                                       court_stub_path=f'tracker_stubs/court_keypoints_{video_name}.pkl')
+    
+    output_path = f'output_videos/output_{video_name}.avi'
+    video_writer = save_video(output_video_frames, output_path, source=video_frames)
+    print(f"Saved output to: {output_path}")
+    print(f"Detected ball hit frames: {pipeline.ball_shot_frames}")
+    print_throughput_stats(video_frames, video_writer)
+
+def main(input_video_path=INPUT_VIDEO_PATH, prefetch=32, ball_tracker_options=None, player_tracker_options=None,
+         court_keyframes=False, court_detector_options=None, court_stabilizer_method=None,
+         mini_court_projection='keypoint'):
+    #read video (streamed: frames are decoded lazily by every stage instead of loaded up front,
+    #on a background thread so decoding overlaps with inference)
+    video_frames = open_video(input_video_path, prefetch=prefetch)
     
     print(f"Total frames: {len(video_frames)}")
     
     # Get video FPS for accurate time calculation
-    cap = cv2.VideoCapture(input_video_path)
-    video_fps = cap.get(cv2.CAP_PROP_FPS)
-    cap.release()
+    video_fps = video_frames.fps
     print(f"Video FPS: {video_fps}")
     
     # Generate unique stub paths based on video name
     video_name = os.path.splitext(os.path.basename(input_video_path))[0]
     
+    # detect court lines (auto-detect cache), first so player detection can be cropped to the court
+    court_model_path = 'models/court_keypoints_best.pt'
+    court_line_detector = CourtLineDetector(court_model_path, **(court_detector_options or {}))
+    court_keypoints = court_line_detector.predict_video(
+        video_frames,
+        read_from_stub=True,
+        stub_path=f'tracker_stubs/court_keypoints_{video_name}.pkl',
+        motion_detector=CameraMotionDetector() if court_keyframes else None
+    )
+    if court_stabilizer_method:
+        stabilizer = KeypointStabilizer(court_stabilizer_method, fps=video_fps)
+        court_keypoints = stabilizer.stabilize(court_keypoints)
+        print(f"Stabilized court keypoints ({court_stabilizer_method}), {stabilizer.rejected_frames} outlier frames replaced")
+    
     #detect players (auto-detect cache)
-    player_tracker = PlayerTracker(model_path='yolov8x')
+    player_tracker = PlayerTracker(model_path='yolov8x', **(player_tracker_options or {}))
     player_detections = player_tracker.detect_frames(
         video_frames, 
         read_from_stub=True,  # Not used anymore, but kept for compatibility
-        stub_path=f'tracker_stubs/player_detections_{video_name}.pkl'
+        stub_path=f'tracker_stubs/player_detections_{video_name}.pkl',
+        court_keypoints=court_keypoints  # only used with court_crop
     )
     
     # Debug: Print player detection stats
@@ -48,23 +114,19 @@ def main():
         print(f"First frame detections: {len(player_detections[0])} players")
     
     #detect ball (auto-detect cache)
-    ball_tracker = BallTracker(model_path='models/yolo8_best2.pt')  
+    ball_tracker = BallTracker(model_path='models/yolo8_best2.pt', **(ball_tracker_options or {}))
     ball_detections = ball_tracker.detect_frames(
         video_frames, 
         read_from_stub=True,
         stub_path=f'tracker_stubs/ball_detections_{video_name}.pkl'
     )
     
-    ball_detections = ball_tracker.interpolate_ball_positions(ball_detections)
+    # Columnar trajectory from here on (arrays instead of one dict per frame)
+    # Drop false positives before they get interpolated (only with kalman_gating)
+    ball_detections = ball_tracker.filter_ball_positions(ball_detections)
     
-    # detect court lines (auto-detect cache)
-    court_model_path = 'models/court_keypoints_best.pt'
-    court_line_detector = CourtLineDetector(court_model_path)
-    court_keypoints = court_line_detector.predict_video(
-        video_frames,
-        read_from_stub=True,
-        stub_path=f'tracker_stubs/court_keypoints_{video_name}.pkl'
-    )
+    ball_detections = BallTrajectory.from_detections(ball_detections)
+    ball_detections = ball_tracker.interpolate_ball_positions(ball_detections)
     
     #choose and filter players based on court keypoints
     print(f"\nFiltering players based on court keypoints...")
@@ -88,7 +150,7 @@ def main():
     
     
     # Initialize mini court
-    mini_court = MiniCourt(video_frames[0])
+    mini_court = MiniCourt(video_frames.read_frame(0), projection=mini_court_projection)
     
     # Convert player and ball positions to mini court coordinates
     print("Converting positions to mini court coordinates...")
@@ -98,98 +160,95 @@ def main():
         court_keypoints
     )
     
-    player_stats_data = [{
-        'frame_num' : 0,
-        'player_1_number_of_shots': 0,
-        'player_1_total_shot_speed': 0,
-        'player_1_last_shot_speed': 0,
-        'player_1_total_player_speed': 0,
-        'player_1_last_player_speed': 0,
-        
-        'player_2_number_of_shots': 0,
-        'player_2_total_shot_speed': 0,
-        'player_2_last_shot_speed': 0,
-        'player_2_total_player_speed': 0,
-        'player_2_last_player_speed': 0,
-    }]
+    player_stats_data = [get_initial_player_stats()]
     
     for ball_shot_ind in range(len(ball_shot_frames) - 1):
         start_frame = ball_shot_frames[ball_shot_ind]
         end_frame = ball_shot_frames[ball_shot_ind+1] 
-        ball_shot_time_in_seconds = (end_frame - start_frame) / video_fps  # Use actual video FPS
-        
-        #get distance covered by the ball
-        distance_covered_pixels = measure_distance(ball_mini_court_detections[start_frame][1], ball_mini_court_detections[end_frame][1])
-        distance_covered_meters = convert_pixel_distance_to_meters( distance_covered_pixels, constants.DOUBLE_LINE_WIDTH,
-                                                                    mini_court.get_width_of_mini_court())
-                                             
-        
-        #speed of ball shot in km/h
-        speed_of_ball_shot = distance_covered_meters / ball_shot_time_in_seconds * 3.6  # Convert m/s to km/h
-        
-        #player who shot the ball
-        #find player closest to ball at start_frame
-        player_positions = player_mini_court_detections[start_frame]
-        player_shot_ball = min(player_positions.keys(), key=lambda player_id: measure_distance(player_positions[player_id], 
-                                                                                               ball_mini_court_detections[start_frame][1]))
-
-        #opponent player speed
-        opponent_player_id = 1 if player_shot_ball == 2 else 2
-        distance_covered_pixels_opponent = measure_distance(player_mini_court_detections[start_frame][opponent_player_id], 
-                                                          player_mini_court_detections[end_frame][opponent_player_id])
-        distance_covered_meters_opponent = convert_pixel_distance_to_meters(distance_covered_pixels_opponent, 
-                                                                            constants.DOUBLE_LINE_WIDTH,
-                                                                            mini_court.get_width_of_mini_court())
-        
-        speed_of_opponent_player = distance_covered_meters_opponent / ball_shot_time_in_seconds * 3.6  # Convert m/s to km/h
+        player_stats_data.append(get_next_player_stats(player_stats_data[-1], start_frame, end_frame,
+                                                       ball_mini_court_detections, player_mini_court_detections,
+                                                       video_fps, mini_court.get_width_of_mini_court()))
         
-        current_player_stats = deepcopy(player_stats_data[-1])
-        current_player_stats['frame_num'] = start_frame
-        current_player_stats[f'player_{player_shot_ball}_number_of_shots'] += 1
-        current_player_stats[f'player_{player_shot_ball}_total_shot_speed'] += speed_of_ball_shot
-        current_player_stats[f'player_{player_shot_ball}_last_shot_speed'] = speed_of_ball_shot
-        
-        current_player_stats[f'player_{opponent_player_id}_total_player_speed'] += speed_of_opponent_player
-        current_player_stats[f'player_{opponent_player_id}_last_player_speed'] = speed_of_opponent_player
-        
-        player_stats_data.append(current_player_stats)
-        
-    player_stats_data_df = pd.DataFrame(player_stats_data) 
-    frames_df = pd.DataFrame({'frame_num': range(len(video_frames))})
-    player_stats_data_df = pd.merge(frames_df, player_stats_data_df, on='frame_num', how='left')
-    player_stats_data_df = player_stats_data_df.ffill()
-    
-    player_stats_data_df['player_1_average_shot_speed'] = player_stats_data_df['player_1_total_shot_speed'] / player_stats_data_df['player_1_number_of_shots']
-    player_stats_data_df['player_2_average_shot_speed'] = player_stats_data_df['player_2_total_shot_speed'] / player_stats_data_df['player_2_number_of_shots']
-    player_stats_data_df['player_1_average_player_speed'] = player_stats_data_df['player_1_total_player_speed'] / player_stats_data_df['player_2_number_of_shots']
-    player_stats_data_df['player_2_average_player_speed'] = player_stats_data_df['player_2_total_player_speed'] / player_stats_data_df['player_1_number_of_shots']
-    
-    #draw output
-    output_video_frames = player_tracker.draw_bboxes(video_frames, player_detections)
-    output_video_frames = ball_tracker.draw_bboxes(output_video_frames, ball_detections)
-    output_video_frames = court_line_detector.draw_keypoints_on_video(output_video_frames, court_keypoints)
-    
-    #draw mini court
-    output_video_frames = mini_court.draw_mini_court(output_video_frames)
-    
-    # Draw player stats on video frames
-    output_video_frames = draw_player_stats(output_video_frames, player_stats_data_df)
-    
-    # Draw player positions on mini court (green for players)
-    output_video_frames = mini_court.draw_points_on_mini_court(output_video_frames, player_mini_court_detections, color=(0, 255, 0))
-    
-    # Draw ball position on mini court (yellow for ball)
-    output_video_frames = mini_court.draw_points_on_mini_court(output_video_frames, ball_mini_court_detections, color=(0, 255, 255))
-    
-    #draw frame numbers
-    for i, frame in enumerate(output_video_frames):
-        cv2.putText(frame, f"Frame {i+1}", (10, 30),  # Changed idx to i
-                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 2)
+    player_stats_data_df = get_player_stats_dataframe(player_stats_data, range(len(player_detections)))
+    
+    #draw output (lazily, frame by frame)
+    output_video_frames = generate_output_frames(video_frames,
+                                                 player_tracker, player_detections,
+                                                 ball_tracker, ball_detections,
+                                                 court_line_detector, court_keypoints,
+                                                 mini_court, player_stats_data_df,
+                                                 player_mini_court_detections, ball_mini_court_detections)
         
     #save output video
     output_path = f'output_videos/output_{video_name}.avi'
-    save_video(output_video_frames, output_path)
+    video_writer = save_video(output_video_frames, output_path, source=video_frames)
     print(f"Saved output to: {output_path}")
+    print_throughput_stats(video_frames, video_writer)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Tennis match analysis")
+    parser.add_argument('--input', default=INPUT_VIDEO_PATH, help="input video path")
+    parser.add_argument('--windowed', action='store_true',
+                        help="process the video in chunks with bounded memory (same output as the default batch mode)")
+    parser.add_argument('--chunk-size', type=int, default=320, help="frames per chunk in windowed mode")
+    parser.add_argument('--prefetch', type=int, default=32,
+                        help="frames decoded ahead on a background thread (0 decodes on the main thread)")
+    parser.add_argument('--player-tracker', choices=list(TRACKER_PROFILES), default=DEFAULT_TRACKER_PROFILE,
+                        help="player tracker profile (numpy_bytetrack: batched detection + NumPy ByteTrack-style "
+                             "tracker; see benchmark_player_trackers.py for the cost of each)")
+    parser.add_argument('--player-batch-size', type=int, default=8,
+                        help="frames per player detection call with --player-tracker numpy_bytetrack")
+    parser.add_argument('--player-court-crop', action='store_true',
+                        help="detect players only inside the padded court region (from the court keypoints)")
+    parser.add_argument('--player-reacquire', action='store_true',
+                        help="keep a chosen player's ID when the tracker gives them a new track ID")
+    parser.add_argument('--court-keyframes', action='store_true',
+                        help="run the court model only on keyframes (camera motion / scene cuts) and "
+                             "reuse or shift the last keypoints in between")
+    parser.add_argument('--court-batch-size', type=int, default=8, help="frames per court model forward pass")
+    parser.add_argument('--court-fast-preprocess', action='store_true',
+                        help="preprocess court model input with cv2 and one batched normalize instead of the "
+                             "per-frame PIL transform the model was trained with (see benchmark_court_preprocessing.py)")
+    parser.add_argument('--court-engine', choices=list(COURT_ENGINES), default='eager',
+                        help="court model engine: traced TorchScript or int8-quantized for CPU "
+                             "(see benchmark_court_engine.py for latency and keypoint error)")
+    parser.add_argument('--court-calibration-frames', type=int, default=64,
+                        help="frames sampled across the video to calibrate the court engine on (a further "
+                             "16 held-out frames check it against the float model)")
+    parser.add_argument('--court-stabilize', choices=STABILIZER_METHODS, default=None,
+                        help="temporally stabilize court keypoints (outlier frames held, then median or One-Euro)")
+    parser.add_argument('--mini-court-projection', choices=MINI_COURT_PROJECTIONS, default='keypoint',
+                        help="homography: map players and ball to the mini court through a per-frame court "
+                             "homography, whole video at once (see benchmark_mini_court_projection.py)")
+    parser.add_argument('--ball-roi', action='store_true',
+                        help="search the ball only around its predicted position (full frame after misses)")
+    parser.add_argument('--ball-kalman', action='store_true',
+                        help="reject ball outliers with a Kalman filter before interpolation")
+    parser.add_argument('--ball-candidates', action='store_true',
+                        help="keep every ball candidate and pick the most plausible path over the video (batch mode only)")
+    parser.add_argument('--ball-conf', type=float, default=0.15,
+                        help="ball detection confidence (can be lowered with --ball-kalman)")
+    args = parser.parse_args()
+    
+    ball_tracker_options = {'conf': args.ball_conf,
+                            'roi_search': args.ball_roi,
+                            'kalman_gating': args.ball_kalman,
+                            'candidate_decoding': args.ball_candidates}
+    player_tracker_options = {'tracker_profile': args.player_tracker,
+                              'batch_size': args.player_batch_size,
+                              'court_crop': args.player_court_crop,
+                              'reacquire_players': args.player_reacquire}
+    court_detector_options = {'batch_size': args.court_batch_size,
+                              'fast_preprocess': args.court_fast_preprocess,
+                              'engine': args.court_engine,
+                              'calibration_frames': args.court_calibration_frames}
+    if args.windowed:
+        main_windowed(args.input, chunk_size=args.chunk_size, prefetch=args.prefetch,
+                      ball_tracker_options=ball_tracker_options, player_tracker_options=player_tracker_options,
+                      court_keyframes=args.court_keyframes, court_detector_options=court_detector_options,
+                      court_stabilizer_method=args.court_stabilize, mini_court_projection=args.mini_court_projection)
+    else:
+        main(args.input, prefetch=args.prefetch, ball_tracker_options=ball_tracker_options,
+             player_tracker_options=player_tracker_options, court_keyframes=args.court_keyframes,
+             court_detector_options=court_detector_options, court_stabilizer_method=args.court_stabilize,
+             mini_court_projection=args.mini_court_projection)
\ No newline at end of file
@@ -1 +1 @@
-from .mini_court import MiniCourt
\ No newline at end of file
+from .mini_court import MiniCourt, MINI_COURT_PROJECTIONS
@@ -0,0 +1,121 @@
+import numpy as np
+
+
+def normalizing_transforms(points):
+    """Hartley normalization per point set (..., P, 2): centroid to the origin, mean distance sqrt(2)"""
+    centroid = points.mean(axis=-2)
+    scale = np.sqrt(2) / np.maximum(np.linalg.norm(points - centroid[..., None, :], axis=-1).mean(axis=-1), 1e-9)
+    transforms = np.zeros(points.shape[:-2] + (3, 3))
+    transforms[..., 0, 0] = transforms[..., 1, 1] = scale
+    transforms[..., :2, 2] = -scale[..., None] * centroid
+    transforms[..., 2, 2] = 1.0
+    return transforms
+
+
+def apply_homographies(homographies, points):
+    """(F, 3, 3) homographies applied to (F, P, 2) points"""
+    projected = points @ homographies[:, :2, :2].transpose(0, 2, 1) + homographies[:, None, :2, 2]
+    scale = points @ homographies[:, 2, :2, None] + homographies[:, None, 2, 2:]
+    return projected / scale
+
+
+def solve_homographies(source, destination, weights):
+    """
+    Weighted least-squares homographies for F frames at once: source (F, P, 2) -> destination
+    (P, 2), weights (F, P). Both sides are Hartley-normalized, where the court centroid maps to
+    a finite point, so h33 can be fixed to 1 and the F 8 x 8 normal equations solved in one
+    batched np.linalg.solve. Frames whose system is singular or ill-conditioned (degenerate,
+    e.g. collinear, or non-finite keypoints) get a NaN homography instead of failing the batch.
+    """
+    source_transform = normalizing_transforms(source)
+    destination_transform = normalizing_transforms(destination)
+    x, y = apply_homographies(source_transform, source).transpose(2, 0, 1)
+    u, v = (destination @ destination_transform[:2, :2].T + destination_transform[:2, 2]).T
+    u, v = np.broadcast_to(u, x.shape), np.broadcast_to(v, x.shape)
+    zeros, ones = np.zeros_like(x), np.ones_like(x)
+    rows_u = np.stack([x, y, ones, zeros, zeros, zeros, -u * x, -u * y], axis=-1)
+    rows_v = np.stack([zeros, zeros, zeros, x, y, ones, -v * x, -v * y], axis=-1)
+    system = np.concatenate([rows_u, rows_v], axis=1)
+    targets = np.concatenate([u, v], axis=1)
+    weighted = system * np.concatenate([weights, weights], axis=1)[..., None]
+    normal_matrix = weighted.transpose(0, 2, 1) @ system
+    right_side = weighted.transpose(0, 2, 1) @ targets[..., None]
+    solvable = np.isfinite(normal_matrix).all(axis=(1, 2)) & np.isfinite(right_side).all(axis=(1, 2))
+    # Both sides are normalized, so the determinant is a cheap (LU) test for a near-singular system
+    solvable[solvable] = np.linalg.slogdet(normal_matrix[solvable])[1] > np.log(1e-10)
+    solution = np.full((len(normal_matrix), 8), np.nan)
+    if solvable.any():
+        solution[solvable] = np.linalg.solve(normal_matrix[solvable], right_side[solvable])[..., 0]
+    normalized = np.concatenate([solution, np.ones((len(solution), 1))], axis=1).reshape(-1, 3, 3)
+    homographies = np.linalg.inv(destination_transform) @ normalized @ source_transform
+    return homographies / homographies[:, 2:, 2:]
+
+
+def fit_court_homographies(court_keypoints, drawing_keypoints, outlier_threshold=3.0):
+    """
+    Homography per frame from the 14 detected court keypoints to the mini court keypoints, (N, 3, 3).
+
+    Only frames whose keypoints differ from the previous frame are fitted (static cameras,
+    keyframe reuse and held outlier frames give long runs of identical keypoints); the others
+    share the previous fit. All fits are one batched least-squares solve, refitted once without
+    keypoints more than outlier_threshold mini court px (or 2.5x the frame's median residual)
+    off, so a single bad keypoint does not bend the court. Frames without a solvable fit
+    (degenerate keypoints) take the previous frame's homography (the first good one before
+    any); if no frame can be fitted the homographies are NaN and nothing is projected.
+    """
+    if len(court_keypoints) == 0:
+        return np.empty((0, 3, 3))
+    keypoints = np.asarray(court_keypoints, dtype=np.float64).reshape(len(court_keypoints), -1, 2)
+    destination = np.asarray(drawing_keypoints, dtype=np.float64).reshape(-1, 2)
+
+    changed = np.ones(len(keypoints), dtype=bool)
+    changed[1:] = (keypoints[1:] != keypoints[:-1]).any(axis=(1, 2))
+    source = keypoints[changed]
+
+    weights = np.ones(source.shape[:2])
+    homographies = solve_homographies(source, destination, weights)
+    residuals = np.linalg.norm(apply_homographies(homographies, source) - destination, axis=2)
+    limit = np.maximum(outlier_threshold, 2.5 * np.median(residuals, axis=1, keepdims=True))
+    inliers = residuals <= limit
+    refit = (~inliers).any(axis=1) & (inliers.sum(axis=1) >= 4)
+    if refit.any():
+        refitted = solve_homographies(source[refit], destination, inliers[refit].astype(np.float64))
+        refit_good = np.isfinite(refitted).all(axis=(1, 2))
+        homographies[np.flatnonzero(refit)[refit_good]] = refitted[refit_good]
+
+    # Unchanged frames take the homography of the last fitted frame, failed fits the last good one
+    fit_number = np.cumsum(changed) - 1
+    good = np.isfinite(homographies).all(axis=(1, 2))
+    if good.any() and not good.all():
+        last_good = np.maximum.accumulate(np.where(good, np.arange(len(good)), -1))
+        last_good[last_good < 0] = np.flatnonzero(good)[0]
+        fit_number = last_good[fit_number]
+    return homographies[fit_number]
+
+
+def project_points(homographies, frame_indices, points):
+    """
+    Apply each point's frame homography in one batched call: homographies (N, 3, 3),
+    frame_indices (M,), points (M, 2) -> (M, 2). cv2.perspectiveTransform takes a single matrix,
+    so the M different matrices are applied with one einsum.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if len(points) == 0:
+        return np.empty((0, 2))
+    homogeneous = np.concatenate([points, np.ones((len(points), 1))], axis=1)
+    projected = np.einsum('mij,mj->mi', homographies[frame_indices], homogeneous)
+    return projected[:, :2] / projected[:, 2:]
+
+
+def player_foot_points(player_boxes, player_ids):
+    """Foot points (bottom center) of player_boxes: (frame_indices, id_indices, points) over present boxes"""
+    frame_indices, id_indices, boxes = [], [], []
+    for frame_num, players in enumerate(player_boxes):
+        for id_index, player_id in enumerate(player_ids):
+            if player_id in players:
+                frame_indices.append(frame_num)
+                id_indices.append(id_index)
+                boxes.append(players[player_id])
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    points = np.stack([(boxes[:, 0] + boxes[:, 2]) / 2, boxes[:, 3]], axis=1)
+    return np.asarray(frame_indices, dtype=np.intp), np.asarray(id_indices, dtype=np.intp), points
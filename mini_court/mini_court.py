@@ -8,15 +8,24 @@ from utils import (
     convert_pixel_distance_to_meters,
     get_foot_position,
     get_closest_keypoint_index,
-    get_closest_keypoint_index_by_zone,
-    get_height_of_bbox,
+    get_closest_keypoint_indices_by_zone,
     measure_xy_distance,
     get_center_of_bbox,
-    measure_distance
+    measure_distance,
+    as_ball_trajectory,
+    get_player_reference_heights
 )
+from .court_projection import fit_court_homographies, project_points, player_foot_points
+
+# 'keypoint': offset from the closest court keypoint, scaled by the player height (original)
+# 'homography': per-frame court homography, whole video projected at once (project_to_mini_court)
+MINI_COURT_PROJECTIONS = ('keypoint', 'homography')
 
 class MiniCourt():
-    def __init__(self,frame):
+    def __init__(self,frame, projection='keypoint'):
+        if projection not in MINI_COURT_PROJECTIONS:
+            raise ValueError(f"Unknown mini court projection '{projection}', choose from {list(MINI_COURT_PROJECTIONS)}")
+        self.projection = projection
         self.drawing_rectangle_width = 150  # Reduced from 180
         self.drawing_rectangle_height = 300  # Reduced from 360
         self.buffer = 30  # Reduced from 40
@@ -29,6 +38,7 @@ class MiniCourt():
         self.set_mini_court_position()
         self.set_court_drawing_key_points()
         self.set_court_lines()
+        self.render_court_sprite(frame)
 
 
     def convert_meters_to_pixels(self, meters):
@@ -142,14 +152,42 @@ class MiniCourt():
 
         return out
 
+    def render_court_sprite(self, frame):
+        """
+        Render the static court graphic once, cropped to the background rectangle: the court
+        colors (self.court_sprite) and which pixels the court covers (self.court_sprite_mask).
+        The court is drawn over a black and over a white canvas; pixels equal in both are covered
+        (lines and keypoints are drawn without anti-aliasing, so they are fully opaque).
+        """
+        self.background_alpha = 0.5
+        canvas_shape = (min(frame.shape[0], self.end_y + 1), min(frame.shape[1], self.end_x + 1), 3)
+        on_black = self.draw_court(np.zeros(canvas_shape, np.uint8))
+        on_white = self.draw_court(np.full(canvas_shape, 255, np.uint8))
+        roi = (slice(max(self.start_y, 0), self.end_y + 1), slice(max(self.start_x, 0), self.end_x + 1))
+        self.court_sprite = on_black[roi].copy()
+        self.court_sprite_mask = (on_black[roi] == on_white[roi]).all(axis=2)
+        self.court_sprite_roi = roi
+
     def draw_mini_court(self,frames):
+        """Draw the mini court on copies of frames (the input frames are left unchanged)"""
         output_frames = []
         for frame in frames:
-            frame = self.draw_background_rectangle(frame)
-            frame = self.draw_court(frame)
-            output_frames.append(frame)
+            output_frames.append(self.draw_mini_court_frame(frame.copy()))
         return output_frames
 
+    def draw_mini_court_frame(self,frame):
+        """
+        Draw the mini court on a single frame (streaming output), in place. Same pixels as
+        draw_background_rectangle + draw_court, but only the background rectangle is touched:
+        it is blended with white and the pre-rendered court sprite is copied over it. Pass a
+        frame the caller owns (annotate_frame draws on its own copy); draw_mini_court copies.
+        """
+        roi = frame[self.court_sprite_roi]
+        blended = cv2.convertScaleAbs(roi, alpha=self.background_alpha, beta=255 * (1 - self.background_alpha))
+        np.copyto(blended, self.court_sprite, where=self.court_sprite_mask[..., None])
+        roi[...] = blended
+        return frame
+
     def get_start_point_of_mini_court(self):
         return (self.court_start_x,self.court_start_y)
     def get_width_of_mini_court(self):
@@ -190,15 +228,58 @@ class MiniCourt():
 
         return  mini_court_player_position
 
-    def convert_bounding_boxes_to_mini_court_coordinates(self,player_boxes, ball_boxes, original_court_key_points ):
+    def project_to_mini_court(self, player_boxes, ball_boxes, original_court_key_points, player_ids=(1, 2)):
+        """
+        Project player foot points and ball centers of all frames through each frame's court
+        homography (fitted from the 14 keypoints to the mini court keypoints) in one batched call.
+        
+        Returns:
+            player_positions: (frames, len(player_ids), 2) mini court positions, NaN where the player is missing
+            ball_positions: (frames, 2) mini court positions, NaN where there is no ball
+        """
+        ball_trajectory = as_ball_trajectory(ball_boxes)
+        num_frames = min(len(player_boxes), len(ball_trajectory), len(original_court_key_points))
+        homographies = fit_court_homographies(original_court_key_points[:num_frames], self.drawing_key_points)
+        
+        player_positions = np.full((num_frames, len(player_ids), 2), np.nan)
+        frame_indices, id_indices, foot_points = player_foot_points(player_boxes[:num_frames], player_ids)
+        player_positions[frame_indices, id_indices] = project_points(homographies, frame_indices, foot_points)
+        
+        ball_positions = np.full((num_frames, 2), np.nan)
+        ball_frames = np.flatnonzero(ball_trajectory.valid[:num_frames])
+        ball_positions[ball_frames] = project_points(homographies, ball_frames, ball_trajectory.centers[ball_frames])
+        return player_positions, ball_positions
+    
+    def convert_bounding_boxes_to_mini_court_coordinates(self,player_boxes, ball_boxes, original_court_key_points,
+                                                         player_reference_heights=None):
+        """
+        player_reference_heights: optional {player_id: per-frame max bbox height} aligned with
+        player_boxes (e.g. from a streaming PlayerHeightWindows); computed from player_boxes
+        over frames [frame-20, frame+50) by default
+        """
+        if self.projection == 'homography':
+            player_ids = [1, 2]
+            player_positions, ball_positions = self.project_to_mini_court(player_boxes, ball_boxes,
+                                                                          original_court_key_points, player_ids)
+            output_player_boxes = [{player_id: tuple(position) for player_id, position in zip(player_ids, positions)
+                                    if not np.isnan(position[0])} for positions in player_positions.tolist()]
+            output_ball_boxes = [{1: tuple(position)} if not np.isnan(position[0]) else {}
+                                 for position in ball_positions.tolist()]
+            return output_player_boxes, output_ball_boxes
+        
         player_heights = {
             1: constants.PLAYER_1_HEIGHT_METERS,
             2: constants.PLAYER_2_HEIGHT_METERS
         }
+        if player_reference_heights is None:
+            player_reference_heights = get_player_reference_heights(player_boxes, look_behind=20, look_ahead=50)
 
         output_player_boxes= []
         output_ball_boxes= []
         
+        # ball_boxes can be a BallTrajectory or the legacy list of {1: bbox} dicts
+        ball_trajectory = as_ball_trajectory(ball_boxes)
+        
         # Ensure all arrays have the same length
         min_frames = min(len(player_boxes), len(ball_boxes), len(original_court_key_points))
         
@@ -206,13 +287,30 @@ class MiniCourt():
             print(f"Warning: Frame count mismatch - Player: {len(player_boxes)}, Ball: {len(ball_boxes)}, Court: {len(original_court_key_points)}")
             print(f"Using minimum frame count: {min_frames}")
 
+        # Zone-aware closest keypoints of every foot point and ball center in two batched lookups
+        zone_keypoints = [0, 1, 2, 3, 12, 13]
+        foot_positions, foot_frames = [], []
+        for frame_num in range(min_frames):
+            for bbox in player_boxes[frame_num].values():
+                foot_positions.append(get_foot_position(bbox))
+                foot_frames.append(frame_num)
+        ball_frames = np.flatnonzero(ball_trajectory.valid[:min_frames])
+        ball_centers = [get_center_of_bbox(ball_trajectory.get_box(frame_num)) for frame_num in ball_frames]
+        court_keypoints_array = np.asarray(original_court_key_points[:min_frames], dtype=np.float64).reshape(min_frames, -1)
+        foot_keypoint_indices, _ = get_closest_keypoint_indices_by_zone(
+            foot_positions, court_keypoints_array[foot_frames], zone_keypoints)
+        ball_keypoint_indices, _ = get_closest_keypoint_indices_by_zone(
+            ball_centers, court_keypoints_array[ball_frames], zone_keypoints)
+        foot_keypoint_indices = iter(foot_keypoint_indices.tolist())
+        ball_keypoint_indices = dict(zip(ball_frames.tolist(), ball_keypoint_indices.tolist()))
+
         for frame_num in range(min_frames):
             player_bbox = player_boxes[frame_num]
             # Get court keypoints for this specific frame
             court_keypoints_frame = original_court_key_points[frame_num]
             
             # Check if ball exists in this frame
-            ball_box = ball_boxes[frame_num].get(1, None)
+            ball_box = ball_trajectory.get_box(frame_num)
             
             output_player_bboxes_dict = {}
             output_ball_dict = {}
@@ -227,16 +325,13 @@ class MiniCourt():
             for player_id, bbox in player_bbox.items():
                 foot_position = get_foot_position(bbox)
 
-                # Get The closest keypoint using zone-based selection to prevent incorrect net mapping
-                closest_key_point_index = get_closest_keypoint_index_by_zone(foot_position, court_keypoints_frame, [0, 1, 2, 3, 12, 13])
+                # The closest keypoint using zone-based selection to prevent incorrect net mapping
+                closest_key_point_index = next(foot_keypoint_indices)
                 closest_key_point = (float(court_keypoints_frame[closest_key_point_index*2]), 
                                      float(court_keypoints_frame[closest_key_point_index*2+1]))
 
-                # Get Player height in pixels
-                frame_index_min = max(0, frame_num-20)
-                frame_index_max = min(len(player_boxes), frame_num+50)
-                bboxes_heights_in_pixels = [get_height_of_bbox(player_boxes[i][player_id]) for i in range (frame_index_min,frame_index_max) if player_id in player_boxes[i]]
-                max_player_height_in_pixels = max(bboxes_heights_in_pixels) if bboxes_heights_in_pixels else get_height_of_bbox(bbox)
+                # Get Player height in pixels (max over the surrounding frames)
+                max_player_height_in_pixels = player_reference_heights[player_id][frame_num]
 
                 mini_court_player_position = self.get_mini_court_coordinates(foot_position,
                                                                             closest_key_point, 
@@ -249,8 +344,8 @@ class MiniCourt():
 
                 # Process ball only once for the closest player
                 if ball_box is not None and closest_player_id_to_ball == player_id:
-                    # Get The closest keypoint using zone-based selection
-                    closest_key_point_index = get_closest_keypoint_index_by_zone(ball_position, court_keypoints_frame, [0, 1, 2, 3, 12, 13])
+                    # The closest keypoint using zone-based selection
+                    closest_key_point_index = ball_keypoint_indices[frame_num]
                     closest_key_point = (float(court_keypoints_frame[closest_key_point_index*2]), 
                                         float(court_keypoints_frame[closest_key_point_index*2+1]))
                     
@@ -272,24 +367,29 @@ class MiniCourt():
         Draw player/ball positions on mini court.
         Positions are clipped to visible area with extended baseline zones.
         """
+        for frame_num, frame in enumerate(frames):
+            self.draw_points_on_mini_court_frame(frame, postions[frame_num], color)
+        return frames
+
+    def draw_points_on_mini_court_frame(self, frame, positions, color=(0,255,0)):
+        """Draw the {id: (x, y)} positions of a single frame on its mini court (in place)"""
         # Extended boundaries for drawing (allow some space beyond baselines)
         min_x = self.court_start_x - 10
         max_x = self.court_end_x + 10
         min_y = self.court_start_y - self.baseline_extension  # Allow space above top baseline
         max_y = self.court_end_y + self.baseline_extension    # Allow space below bottom baseline
         
-        for frame_num, frame in enumerate(frames):
-            for _, position in postions[frame_num].items():
-                x, y = position
-                
-                # Clip to extended boundaries for visibility
-                x = max(min_x, min(x, max_x))
-                y = max(min_y, min(y, max_y))
-                
-                x = int(x)
-                y = int(y)
-                cv2.circle(frame, (x,y), 5, color, -1)
-        return frames
+        for _, position in positions.items():
+            x, y = position
+            
+            # Clip to extended boundaries for visibility
+            x = max(min_x, min(x, max_x))
+            y = max(min_y, min(y, max_y))
+            
+            x = int(x)
+            y = int(y)
+            cv2.circle(frame, (x,y), 5, color, -1)
+        return frame
     
     def calculate_player_stats(self, player_mini_court_positions, ball_mini_court_positions, fps=24):
         """
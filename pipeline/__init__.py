@@ -0,0 +1,2 @@
+from .annotation import annotate_frame
+from .windowed_pipeline import WindowedPipeline
\ No newline at end of file
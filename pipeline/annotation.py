@@ -0,0 +1,34 @@
+import cv2
+import sys
+sys.path.append('../')
+from utils import draw_player_stats_frame
+
+
+def annotate_frame(frame, frame_num, player_tracker, ball_tracker, court_line_detector, mini_court,
+                   player_dict, ball_dict, court_keypoints, player_stats_row,
+                   player_mini_court_dict, ball_mini_court_dict):
+    """
+    Draw every overlay of the analysis video on a single frame.
+
+    Shared by the batch path and the windowed pipeline so both produce the same output.
+    """
+    frame = player_tracker.draw_frame_bboxes(frame, player_dict)
+    frame = ball_tracker.draw_frame_bboxes(frame, ball_dict)
+    frame = court_line_detector.draw_keypoints(frame.copy(), court_keypoints)
+
+    #draw mini court
+    frame = mini_court.draw_mini_court_frame(frame)
+
+    # Draw player stats on video frames
+    frame = draw_player_stats_frame(frame, player_stats_row)
+
+    # Draw player positions on mini court (green for players)
+    mini_court.draw_points_on_mini_court_frame(frame, player_mini_court_dict, color=(0, 255, 0))
+
+    # Draw ball position on mini court (yellow for ball)
+    mini_court.draw_points_on_mini_court_frame(frame, ball_mini_court_dict, color=(0, 255, 255))
+
+    #draw frame numbers
+    cv2.putText(frame, f"Frame {frame_num+1}", (10, 30),
+                cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 2)
+    return frame
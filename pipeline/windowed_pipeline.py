@@ -0,0 +1,343 @@
+import os
+import pickle
+import sys
+sys.path.append('../')
+from utils import (iter_batches,
+                   BallTrajectory,
+                   RawDetections,
+                   load_detection_stub,
+                   PlayerHeightWindows,
+                   get_initial_player_stats,
+                   get_next_player_stats,
+                   get_player_stats_dataframe)
+from mini_court import MiniCourt
+from trackers import OnlineShotDetector, OnlinePlayerSelector
+from .annotation import annotate_frame
+
+# How far the batch stages look around a frame (defaults used by main.py)
+PLAYER_SMOOTHING_MAX_GAP = 5        # PlayerTracker.smooth_detections
+PLAYER_SELECTION_FRAMES = 10        # OnlinePlayerSelector warm-up (PlayerTracker.choose_player_id_mapping)
+PLAYER_HEIGHT_LOOK_BEHIND = 20      # MiniCourt height window [frame-20, frame+50)
+PLAYER_HEIGHT_LOOK_AHEAD = 50
+SHOT_MINIMUM_CHANGE_FRAMES = 25     # BallTracker.get_ball_shot_frames
+
+BALL_RAW_COLUMNS = ['x1', 'y1', 'x2', 'y2', 'conf', 'cls']
+
+
+class WindowedPipeline:
+    """
+    Bounded-memory version of the main.py pipeline.
+
+    The video is analysed in chunks of chunk_size frames, and frame pixels are only held while
+    their chunk goes through detection. Per-frame metadata (boxes, keypoints, mini court
+    positions, a few hundred bytes per frame) is kept for the whole match. A frame is annotated
+    as soon as everything it depends on is final:
+
+    - player smoothing needs max_gap frames of look-ahead, player selection the first 10 frames
+    - ball interpolation needs the next ball detection (or the end of the video)
+    - a hit at frame i needs the ball trajectory up to i + look_ahead (OnlineShotDetector)
+    - the mini court player height window needs players up to frame + 50
+    - the stats row of a shot needs the next shot
+
+    Finished frames are decoded again by a second, trailing pass over the source, annotated and
+    yielded in order, so the output matches the batch path while memory stays O(chunk_size).
+    The source must therefore be re-iterable (e.g. a VideoFrameSource). Keep chunk_size a
+    multiple of the court detector batch size so its batches line up with the batch path.
+    """
+
+    def __init__(self, player_tracker, ball_tracker, court_line_detector, video_fps,
+                 chunk_size=320, mini_court=None, court_motion_detector=None, court_stabilizer=None):
+        if ball_tracker.candidate_decoding:
+            raise ValueError("Ball candidate decoding needs the whole video; it is not available in windowed mode")
+        if player_tracker.court_crop and chunk_size < player_tracker.court_crop_frames:
+            raise ValueError(f"The player court crop is set from the first {player_tracker.court_crop_frames} frames; "
+                             f"use a chunk_size of at least that")
+        self.player_tracker = player_tracker
+        self.ball_tracker = ball_tracker
+        self.court_line_detector = court_line_detector
+        self.video_fps = video_fps
+        self.chunk_size = chunk_size
+        self.mini_court = mini_court
+        # Optional CameraMotionDetector: court model only on keyframes, carried across chunks
+        self.court_motion_detector = court_motion_detector
+        # Optional KeypointStabilizer, streamed across chunks (the stub keeps the raw keypoints)
+        self.court_stabilizer = court_stabilizer
+
+    def run(self, video_frames, player_stub_path=None, ball_stub_path=None, court_stub_path=None):
+        """Yield annotated output frames in order, each as soon as it is final."""
+        self._reset()
+        cached_keypoints = self._load_stub(court_stub_path, "court keypoints")
+        if cached_keypoints is not None and self.court_stabilizer is not None:
+            cached_keypoints = self.court_stabilizer.stabilize(cached_keypoints)
+        if cached_keypoints is not None:
+            # Player caches are only valid for the same court crop
+            self.player_tracker.set_court_region(cached_keypoints)
+        cached_players = self._load_detection_stub(player_stub_path, "player detections", self.player_tracker)
+        cached_balls = self._load_detection_stub(ball_stub_path, "ball detections", self.ball_tracker)
+
+        self._render_frames = iter(video_frames)
+        for chunk in iter_batches(video_frames, self.chunk_size):
+            if self.mini_court is None:
+                self.mini_court = MiniCourt(chunk[0])
+            self._detect_chunk(chunk, cached_players, cached_balls, cached_keypoints)
+            yield from self._advance(ended=False)
+            print(f"Processed {len(self.player_detections)} frames, written {self.frames_written}")
+
+        yield from self._advance(ended=True)
+        print(f"Windowed pipeline finished: {self.frames_written} frames written")
+
+        if cached_players is None and player_stub_path:
+            RawDetections(self.raw_player_frames, self.player_tracker.raw_columns,
+                          floor_conf=self.player_tracker.raw_floor_conf, iou=self.player_tracker.raw_iou,
+                          model_path=self.player_tracker.model_path,
+                          tracker=self.player_tracker.tracker_profile,
+                          crop_region=self.player_tracker.crop_region).save(player_stub_path)
+            print(f"Saved raw player detections to: {player_stub_path}")
+        if cached_balls is None and self.ball_tracker.roi_search:
+            self._save_stub(ball_stub_path, self.raw_ball_detections, "ball detections")
+        elif cached_balls is None and ball_stub_path:
+            RawDetections(self.raw_ball_frames, BALL_RAW_COLUMNS,
+                          floor_conf=self.ball_tracker.raw_floor_conf,
+                          model_path=self.ball_tracker.model_path).save(ball_stub_path)
+            print(f"Saved raw ball detections to: {ball_stub_path}")
+        if cached_keypoints is None:
+            self._save_stub(court_stub_path, self.raw_court_keypoints, "court keypoints")
+
+    # ---------- Per-chunk detection ----------
+    def _detect_chunk(self, frames, cached_players, cached_balls, cached_keypoints):
+        start = len(self.player_detections)
+        end = start + len(frames)
+
+        # Court first, so the first chunk can set the player court crop
+        if cached_keypoints is not None:
+            self.court_keypoints.extend(cached_keypoints[start:end])
+        else:
+            keypoints = self.court_line_detector.predict_video(frames, motion_detector=self.court_motion_detector)
+            self.raw_court_keypoints.extend(keypoints)
+            if self.court_stabilizer is not None:
+                keypoints = self.court_stabilizer.stabilize(keypoints)
+            self.court_keypoints.extend(keypoints)
+        if start == 0 and cached_keypoints is None:
+            self.player_tracker.set_court_region(self.court_keypoints)
+
+        if cached_players is not None:
+            self.player_detections.extend(cached_players[start:end])
+        else:
+            # Detect at the raw cache settings and filter, like PlayerTracker.detect_frames;
+            # the NumPy tracker state carries over from the previous chunk
+            raw_frames = self.player_tracker.detect_raw(frames)
+            self.raw_player_frames.extend(raw_frames)
+            self.player_detections.extend(self.player_tracker.detections_from_raw(
+                RawDetections(raw_frames, self.player_tracker.raw_columns,
+                              floor_conf=self.player_tracker.raw_floor_conf, iou=self.player_tracker.raw_iou),
+                reset=False))
+
+        if cached_balls is not None:
+            self.ball_detections.extend(cached_balls[start:end])
+        elif self.ball_tracker.roi_search:
+            self.ball_detections.extend(self.ball_tracker.detect_frame_roi(frame) for frame in frames)
+        else:
+            raw_frames = []
+            for batch in iter_batches(frames, self.ball_tracker.batch_size):
+                raw_frames.extend(self.ball_tracker.detect_batch_raw(batch))
+            self.raw_ball_frames.extend(raw_frames)
+            self.ball_detections.extend(self.ball_tracker.detections_from_raw(
+                RawDetections(raw_frames, BALL_RAW_COLUMNS, floor_conf=self.ball_tracker.raw_floor_conf)))
+
+        if cached_balls is None and self.ball_tracker.roi_search:
+            # The ROI stub keeps ungated detections, like BallTracker.detect_frames
+            self.raw_ball_detections.extend(self.ball_detections[start:end])
+        if self.ball_tracker.kalman_filter is not None:
+            # Streaming gating: the filter state carries over from the previous chunk
+            self.ball_detections[start:end] = [self.ball_tracker.kalman_filter.update_detection(detection)
+                                               for detection in self.ball_detections[start:end]]
+
+    # ---------- Incremental stages ----------
+    def _advance(self, ended):
+        num_frames = len(self.player_detections)
+        players_final = self._update_players(num_frames, ended)
+        balls_final = self._update_ball_positions(num_frames, ended)
+        shots_final = self._update_shots(num_frames, balls_final, ended)
+        mini_court_final = self._update_mini_court(num_frames, players_final, balls_final, ended)
+        stats_final = self._update_player_stats(num_frames, shots_final, mini_court_final, ended)
+
+        ready = min(players_final, balls_final, mini_court_final, stats_final)
+        if ready <= self.frames_written:
+            return
+
+        stats_df = get_player_stats_dataframe(self.player_stats_data, range(self.frames_written, ready))
+        for row_index, frame_num in enumerate(range(self.frames_written, ready)):
+            frame = next(self._render_frames)
+            yield annotate_frame(frame, frame_num,
+                                 self.player_tracker, self.ball_tracker, self.court_line_detector, self.mini_court,
+                                 self.filtered_player_detections[frame_num],
+                                 self.ball_positions[frame_num],
+                                 self.court_keypoints[frame_num],
+                                 stats_df.iloc[row_index],
+                                 self.player_mini_court_detections[frame_num],
+                                 self.ball_mini_court_detections[frame_num])
+        self.frames_written = ready
+
+    def _update_players(self, num_frames, ended):
+        """Smooth the new frames, choose the players once possible; returns the final frame count."""
+        # Gap filling is idempotent, so re-smoothing the overlap with the previous chunk is harmless
+        smooth_start = max(0, self.players_smoothed - PLAYER_SMOOTHING_MAX_GAP - 1)
+        self.player_tracker.smooth_detections(self.player_detections[smooth_start:num_frames])
+        self.players_smoothed = num_frames
+        smoothed_final = num_frames if ended else max(0, num_frames - PLAYER_SMOOTHING_MAX_GAP)
+
+        # The selector buffers the first PLAYER_SELECTION_FRAMES frames, then filters frame by frame
+        for frame_num in range(self.players_selected, smoothed_final):
+            self.filtered_player_detections.extend(self.player_selector.update(
+                self.player_detections[frame_num], self.court_keypoints[frame_num]))
+        self.players_selected = smoothed_final
+        if ended:
+            self.filtered_player_detections.extend(self.player_selector.finish())
+        return len(self.filtered_player_detections)
+
+    def _update_ball_positions(self, num_frames, ended):
+        """Interpolate up to the latest ball detection (to the end once the video is done)."""
+        last_detection = self.last_ball_detection
+        for frame_num in range(self.balls_scanned, num_frames):
+            if len(self.ball_detections[frame_num].get(1, [])) == 4:
+                last_detection = frame_num
+        self.balls_scanned = num_frames
+
+        # Start each slice at the previous detection so gaps interpolate exactly like the full
+        # trajectory; with no previous detection the leading frames are back-filled
+        start = max(self.last_ball_detection, 0)
+        if last_detection > self.last_ball_detection:
+            self.ball_positions[start:] = self._interpolate_ball_positions(start, last_detection + 1)
+            self.last_ball_detection = last_detection
+            start = last_detection
+
+        if ended and len(self.ball_positions) < num_frames:
+            self.ball_positions[start:] = self._interpolate_ball_positions(start, num_frames)
+        return len(self.ball_positions)
+
+    def _interpolate_ball_positions(self, start, stop):
+        """Interpolate a slice through BallTrajectory (float32), like the batch path does"""
+        trajectory = BallTrajectory.from_detections(self.ball_detections[start:stop])
+        return self.ball_tracker.interpolate_ball_positions(trajectory).to_detections()
+
+    def _update_shots(self, num_frames, balls_final, ended):
+        """Feed final ball positions to the online detector; returns the frame count with a known hit status."""
+        for ball_position in self.ball_positions[self.shots_fed:balls_final]:
+            for shot_frame in self.shot_detector.update(ball_position):
+                print(f"Shot detected at frame {shot_frame}")
+                self.ball_shot_frames.append(shot_frame)
+        self.shots_fed = balls_final
+
+        if ended:
+            self.ball_shot_frames.extend(self.shot_detector.finish())
+            return num_frames
+        # Hits are reported look_ahead frames late
+        return max(0, balls_final - self.shot_detector.look_ahead)
+
+    def _update_mini_court(self, num_frames, players_final, balls_final, ended):
+        """Convert frames whose player height window is final; returns the converted frame count."""
+        for players in self.filtered_player_detections[self.player_heights.frames:players_final]:
+            self.player_heights.push(players)
+        if ended:
+            self.player_heights.finish()
+            ready = num_frames
+        else:
+            ready = min(self.player_heights.ready, balls_final, num_frames)
+
+        done = len(self.player_mini_court_detections)
+        if ready <= done:
+            return done
+
+        ball_boxes = self.ball_positions[done:ready]
+        ball_boxes = ball_boxes + [{}] * (ready - done - len(ball_boxes))
+        player_mini_court, ball_mini_court = self.mini_court.convert_bounding_boxes_to_mini_court_coordinates(
+            self.filtered_player_detections[done:ready], ball_boxes, self.court_keypoints[done:ready],
+            player_reference_heights=self.player_heights.pop_heights(ready))
+        self.player_mini_court_detections.extend(player_mini_court)
+        self.ball_mini_court_detections.extend(ball_mini_court)
+        return ready
+
+    def _update_player_stats(self, num_frames, shots_final, mini_court_final, ended):
+        """Add stats rows for completed shots; returns the frame count whose stats row is final."""
+        shots = self.ball_shot_frames
+        while len(self.player_stats_data) < len(shots) and shots[len(self.player_stats_data)] < mini_court_final:
+            shot_ind = len(self.player_stats_data) - 1
+            self.player_stats_data.append(get_next_player_stats(
+                self.player_stats_data[-1], shots[shot_ind], shots[shot_ind + 1],
+                self.ball_mini_court_detections, self.player_mini_court_detections,
+                self.video_fps, self.mini_court.get_width_of_mini_court()))
+
+        # Frames from the first shot without a row on wait until its next shot (or the end)
+        if ended:
+            return num_frames
+        next_row_frame = len(self.player_stats_data) - 1
+        if next_row_frame < len(shots):
+            return min(shots[next_row_frame], shots_final)
+        return shots_final
+
+    # ---------- Helpers ----------
+    def _reset(self):
+        self.player_tracker.reset_tracking()
+        self.player_tracker.set_court_region(None)
+        self.ball_tracker.reset_roi_tracking()
+        if self.ball_tracker.kalman_filter is not None:
+            self.ball_tracker.kalman_filter.reset()
+        self.player_detections = []
+        self.ball_detections = []
+        self.raw_ball_detections = []
+        self.raw_player_frames = []
+        self.raw_ball_frames = []
+        self.court_keypoints = []
+        self.raw_court_keypoints = []
+        if self.court_motion_detector is not None:
+            self.court_motion_detector.reset()
+        if self.court_stabilizer is not None:
+            self.court_stabilizer.reset()
+
+        self.players_smoothed = 0
+        self.players_selected = 0
+        self.player_selector = OnlinePlayerSelector(self.player_tracker, warmup_frames=PLAYER_SELECTION_FRAMES,
+                                                    reacquire=self.player_tracker.reacquire_players)
+        self.filtered_player_detections = []
+        self.player_heights = PlayerHeightWindows(PLAYER_HEIGHT_LOOK_BEHIND, PLAYER_HEIGHT_LOOK_AHEAD)
+
+        self.balls_scanned = 0
+        self.last_ball_detection = -1
+        self.ball_positions = []
+
+        self.shot_detector = OnlineShotDetector(minimum_change_frames_for_hit=SHOT_MINIMUM_CHANGE_FRAMES)
+        self.shots_fed = 0
+        self.ball_shot_frames = []
+
+        self.player_mini_court_detections = []
+        self.ball_mini_court_detections = []
+        self.player_stats_data = [get_initial_player_stats()]
+        self.frames_written = 0
+
+    def _load_detection_stub(self, stub_path, name, tracker):
+        """Load a detection stub; raw caches are filtered with the tracker's current settings"""
+        if not (stub_path and os.path.exists(stub_path)):
+            return None
+        cached = load_detection_stub(stub_path)
+        if not isinstance(cached, RawDetections):
+            print(f"Loading {name} from cache: {stub_path}")
+            return cached
+        if tracker.can_filter_raw(cached):
+            print(f"Filtering raw {name} from cache: {stub_path}")
+            return tracker.detections_from_raw(cached)
+        print(f"Raw cache {stub_path} does not cover the current settings, re-running detection")
+        return None
+
+    def _load_stub(self, stub_path, name):
+        if stub_path and os.path.exists(stub_path):
+            print(f"Loading {name} from cache: {stub_path}")
+            with open(stub_path, 'rb') as f:
+                return pickle.load(f)
+        return None
+
+    def _save_stub(self, stub_path, data, name):
+        if stub_path:
+            os.makedirs(os.path.dirname(stub_path), exist_ok=True)
+            with open(stub_path, 'wb') as f:
+                pickle.dump(data, f)
+            print(f"Saved {name} to: {stub_path}")
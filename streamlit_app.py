@@ -16,8 +16,9 @@ import sys
 sys.path.append(str(Path(__file__).parent))
 
 from utils import video_utils
-from court_line_detector import CourtLineDetector
+from court_line_detector import CourtLineDetector, CameraMotionDetector, KeypointStabilizer
 from mini_court import MiniCourt
+from trackers.player_tracker import TRACKER_PROFILES, DEFAULT_TRACKER_PROFILE
 
 # Page config
 st.set_page_config(
@@ -76,6 +77,14 @@ with st.sidebar:
         help="YOLOv8x model for player detection"
     )
     
+    player_tracker_profile = st.selectbox(
+        "Player Tracker Profile",
+        list(TRACKER_PROFILES),
+        index=list(TRACKER_PROFILES).index(DEFAULT_TRACKER_PROFILE),
+        help="Ordered from cheapest to most expensive on CPU. ReID and global motion compensation "
+             "cost the most; numpy_bytetrack detects players in batches (see benchmark_player_trackers.py)"
+    )
+    
     st.markdown("---")
     
     # Detection parameters
@@ -95,10 +104,32 @@ with st.sidebar:
     # Processing options
     st.markdown("### 📊 Processing Options")
     
-    enable_moving_camera = st.checkbox(
-        "Enable Moving Camera Detection",
-        value=True,
-        help="Detect court keypoints in all frames (for moving camera videos). Slower but more accurate."
+    court_detection_mode = st.selectbox(
+        "Court Detection",
+        ["Every frame", "Keyframes (adaptive)", "First frame only (static camera)"],
+        index=0,
+        help="Every frame: the court model on every frame (slowest, for heavily moving cameras). "
+             "Keyframes: run the court model only on scene cuts and larger camera motion, reusing or "
+             "shifting the last keypoints in between."
+    )
+    
+    stabilize_court_keypoints = st.checkbox(
+        "Stabilize Court Keypoints",
+        value=False,
+        help="Smooth keypoint jitter over time (One-Euro filter) and hold the last good keypoints on outlier frames"
+    )
+    
+    homography_mini_court = st.checkbox(
+        "Homography Mini-Court Projection",
+        value=False,
+        help="Map players and ball to the mini court through a per-frame court homography instead of "
+             "the closest keypoint scaled by player height"
+    )
+    
+    crop_players_to_court = st.checkbox(
+        "Crop Player Detection to Court",
+        value=False,
+        help="Detect players only inside the padded court region: skips the stands and gives far players more pixels"
     )
     
     show_court_keypoints = st.checkbox("Show Court Keypoints", value=True)
@@ -122,12 +153,19 @@ with st.sidebar:
         ["MP4 (H.264)", "AVI (XVID)"]
     )
     
+    use_source_fps = st.checkbox(
+        "Use Source Video FPS",
+        value=True,
+        help="Write the output at the frame rate of the uploaded video"
+    )
+    
     output_fps = st.number_input(
         "Output FPS",
         min_value=15,
         max_value=60,
         value=24,
-        step=1
+        step=1,
+        disabled=use_source_fps
     )
     
     st.markdown("---")
@@ -232,17 +270,29 @@ if uploaded_file is not None:
             status_text = st.empty()
             
             try:
-                # Step 1: Read video frames
+                # Step 1: Open video as a streaming frame source (frames are decoded lazily per stage)
                 status_text.text("📹 Reading video frames...")
                 progress_bar.progress(10)
                 
-                video_frames = video_utils.read_video(video_path)
+                video_frames = video_utils.open_video(video_path, prefetch=32)
+                first_frame = video_frames.read_frame(0)
                 st.info(f"✅ Loaded {len(video_frames)} frames")
                 
                 # Step 2: Detect court keypoints
                 court_detector = CourtLineDetector(court_model_path)
                 
-                if enable_moving_camera:
+                if court_detection_mode == "Keyframes (adaptive)":
+                    status_text.text("🎯 Detecting court keypoints (keyframes on camera motion)...")
+                    progress_bar.progress(20)
+                    
+                    # Model on keyframes only, keypoints reused / shifted in between
+                    motion_detector = CameraMotionDetector()
+                    court_keypoints = court_detector.predict_video(video_frames, motion_detector=motion_detector)
+                    motion_stats = motion_detector.get_stats()
+                    st.success(f"✅ Court keypoints detected in {len(court_keypoints)} frames "
+                               f"(model ran on {motion_stats['keyframes']} keyframes, "
+                               f"{motion_stats['model_calls_saved']} calls saved)!")
+                elif court_detection_mode == "Every frame":
                     status_text.text("🎯 Detecting court keypoints (moving camera mode - all frames)...")
                     progress_bar.progress(20)
                     
@@ -254,17 +304,26 @@ if uploaded_file is not None:
                     progress_bar.progress(20)
                     
                     # Use predict for static camera (single frame)
-                    single_keypoint = court_detector.predict(video_frames[0])
+                    single_keypoint = court_detector.predict(first_frame)
                     court_keypoints = [single_keypoint] * len(video_frames)
                     st.success("✅ Court keypoints detected (static camera)!")
                 
+                if stabilize_court_keypoints and court_detection_mode != "First frame only (static camera)":
+                    stabilizer = KeypointStabilizer('one_euro', fps=video_frames.fps)
+                    court_keypoints = stabilizer.stabilize(court_keypoints)
+                    st.info(f"✅ Court keypoints stabilized ({stabilizer.rejected_frames} outlier frames replaced)")
+                
                 # Step 3: Detect players
                 status_text.text("👥 Detecting players...")
                 progress_bar.progress(40)
                 
                 from trackers.player_tracker import PlayerTracker
-                player_tracker_obj = PlayerTracker(player_model_path)
-                player_detections = player_tracker_obj.detect_frames(video_frames)
+                player_tracker_obj = PlayerTracker(player_model_path, tracker_profile=player_tracker_profile,
+                                                   court_crop=crop_players_to_court)
+                player_detections = player_tracker_obj.detect_frames(video_frames, court_keypoints=court_keypoints)
+                if court_detection_mode == "First frame only (static camera)":
+                    # One entry per decoded frame (the container frame count is only an estimate)
+                    court_keypoints = [single_keypoint] * len(player_detections)
                 
                 # Choose and filter to 2 players with court keypoints
                 if len(player_detections) > 0:
@@ -295,7 +354,7 @@ if uploaded_file is not None:
                 progress_bar.progress(70)
                 
                 # Initialize mini court
-                mini_court = MiniCourt(video_frames[0])
+                mini_court = MiniCourt(first_frame, projection='homography' if homography_mini_court else 'keypoint')
                 
                 # Convert positions to mini court coordinates
                 player_mini_court_detections, ball_mini_court_detections = mini_court.convert_bounding_boxes_to_mini_court_coordinates(
@@ -389,7 +448,7 @@ if uploaded_file is not None:
                 
                 # Create dataframe and merge with all frames
                 player_stats_data_df = pd.DataFrame(player_stats_data)
-                frames_df = pd.DataFrame({'frame_num': range(len(video_frames))})
+                frames_df = pd.DataFrame({'frame_num': range(len(player_detections))})
                 player_stats_data_df = pd.merge(frames_df, player_stats_data_df, on='frame_num', how='left')
                 player_stats_data_df = player_stats_data_df.ffill()
                 
@@ -401,54 +460,65 @@ if uploaded_file is not None:
                 
                 st.success("✅ Player statistics calculated!")
                 
-                # Step 6: Draw annotations
-                status_text.text("🎨 Drawing annotations...")
+                # Step 6 & 7: Draw annotations and save output video, one frame at a time
+                status_text.text("🎨 Drawing annotations and saving output video...")
                 progress_bar.progress(80)
                 
-                output_frames = video_frames.copy()
-                
-                # Draw player boxes
-                if show_player_boxes:
-                    output_frames = player_tracker_obj.draw_bboxes(output_frames, player_detections)
-                
-                # Draw ball
-                if show_ball:
-                    output_frames = ball_tracker_obj.draw_bboxes(output_frames, ball_detections)
-                
-                # Draw court keypoints
-                if show_court_keypoints:
-                    output_frames = court_detector.draw_keypoints_on_video(output_frames, court_keypoints)
-                
-                # Draw mini court
-                if show_mini_court:
-                    output_frames = mini_court.draw_mini_court(output_frames)
-                    # Draw player positions on mini court (green)
-                    output_frames = mini_court.draw_points_on_mini_court(output_frames, player_mini_court_detections, color=(0, 255, 0))
-                    # Draw ball position on mini court (yellow)
-                    output_frames = mini_court.draw_points_on_mini_court(output_frames, ball_mini_court_detections, color=(0, 255, 255))
-                
-                # Draw player stats
-                from utils import draw_player_stats
-                output_frames = draw_player_stats(output_frames, player_stats_data_df)
-                
-                # Draw frame numbers
-                for i, frame in enumerate(output_frames):
-                    cv2.putText(frame, f"Frame {i+1}", (10, 30),
-                                cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 2)
-                
-                # Step 7: Save output video
-                status_text.text("💾 Saving output video...")
-                progress_bar.progress(90)
-                
-                output_path = tempfile.NamedTemporaryFile(delete=False, suffix='.mp4').name
-                
-                fourcc = cv2.VideoWriter_fourcc(*'mp4v') if output_format == "MP4 (H.264)" else cv2.VideoWriter_fourcc(*'XVID')
-                out = cv2.VideoWriter(output_path, fourcc, output_fps, (width, height))
-                
-                for frame in output_frames:
-                    out.write(frame)
-                
-                out.release()
+                from utils import draw_player_stats_frame
+                
+                # MP4 (mp4v) or AVI (XVID), each in its own container
+                output_suffix = '.mp4' if output_format == "MP4 (H.264)" else '.avi'
+                output_path = tempfile.NamedTemporaryFile(delete=False, suffix=output_suffix).name
+                codec = video_utils.codec_for_container(output_path, 'mp4v' if output_suffix == '.mp4' else 'XVID')
+                writer_fps = video_frames.fps if use_source_fps else output_fps
+                
+                # Only the handful of sample frames shown below are kept in memory
+                num_frames = len(player_stats_data_df)
+                sample_indices = [0, num_frames//3, 2*num_frames//3, num_frames-1]
+                sample_frames = {}
+                frames_written = 0
+                
+                # Frames are encoded on a background thread while the next ones are drawn; the
+                # with block releases the file even if drawing fails
+                with video_utils.AsyncVideoWriter(output_path, fps=writer_fps, codec=codec) as out:
+                    for i, frame in enumerate(video_frames):
+                        if i >= num_frames:
+                            break
+                        
+                        # Draw player boxes
+                        if show_player_boxes:
+                            frame = player_tracker_obj.draw_frame_bboxes(frame, player_detections[i])
+                        
+                        # Draw ball
+                        if show_ball:
+                            frame = ball_tracker_obj.draw_frame_bboxes(frame, ball_detections[i])
+                        
+                        # Draw court keypoints
+                        if show_court_keypoints:
+                            frame = court_detector.draw_keypoints(frame.copy(), court_keypoints[i])
+                        
+                        # Draw mini court
+                        if show_mini_court:
+                            frame = mini_court.draw_mini_court_frame(frame)
+                            # Draw player positions on mini court (green)
+                            mini_court.draw_points_on_mini_court_frame(frame, player_mini_court_detections[i], color=(0, 255, 0))
+                            # Draw ball position on mini court (yellow)
+                            mini_court.draw_points_on_mini_court_frame(frame, ball_mini_court_detections[i], color=(0, 255, 255))
+                        
+                        # Draw player stats
+                        frame = draw_player_stats_frame(frame, player_stats_data_df.iloc[i])
+                        
+                        # Draw frame numbers
+                        cv2.putText(frame, f"Frame {i+1}", (10, 30),
+                                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 2)
+                        
+                        out.write(frame)
+                        frames_written += 1
+                        if i in sample_indices:
+                            sample_frames[i] = frame
+                
+                encode_stats = out.get_throughput_stats()
+                st.info(f"✅ Encoded {encode_stats['frames_written']} frames at {encode_stats['encode_fps']:.1f} frames/s")
                 
                 progress_bar.progress(100)
                 status_text.text("✅ Analysis complete!")
@@ -462,7 +532,7 @@ if uploaded_file is not None:
                 col1, col2, col3, col4 = st.columns(4)
                 
                 with col1:
-                    st.metric("Total Frames", len(output_frames))
+                    st.metric("Total Frames", frames_written)
                 
                 with col2:
                     # Count ball detections (dict with key 1)
@@ -476,7 +546,8 @@ if uploaded_file is not None:
                 
                 with col4:
                     court_frames = len(court_keypoints)
-                    court_mode = "Moving" if enable_moving_camera else "Static"
+                    court_mode = {"Keyframes (adaptive)": "Keyframes", "Every frame": "Moving"}.get(
+                        court_detection_mode, "Static")
                     st.metric("Court Frames", court_frames, delta=court_mode)
                 
                 # Download button
@@ -485,8 +556,8 @@ if uploaded_file is not None:
                     st.download_button(
                         label="⬇️ Download Processed Video",
                         data=f,
-                        file_name=f"tennis_analysis_{uploaded_file.name}",
-                        mime="video/mp4",
+                        file_name=f"tennis_analysis_{os.path.splitext(uploaded_file.name)[0]}{output_suffix}",
+                        mime="video/mp4" if output_suffix == '.mp4' else "video/x-msvideo",
                         use_container_width=True,
                         type="primary"
                     )
@@ -494,14 +565,14 @@ if uploaded_file is not None:
                 # Display sample frames
                 st.markdown("### 🎬 Sample Frames")
                 
-                sample_indices = [0, len(output_frames)//3, 2*len(output_frames)//3, -1]
                 cols = st.columns(4)
                 
                 for idx, col in zip(sample_indices, cols):
+                    if idx not in sample_frames:
+                        continue
                     with col:
-                        frame_rgb = cv2.cvtColor(output_frames[idx], cv2.COLOR_BGR2RGB)
-                        frame_num = idx if idx >= 0 else len(output_frames)+idx
-                        st.image(frame_rgb, caption=f"Frame {frame_num}", use_container_width=True)
+                        frame_rgb = cv2.cvtColor(sample_frames[idx], cv2.COLOR_BGR2RGB)
+                        st.image(frame_rgb, caption=f"Frame {idx}", use_container_width=True)
                 
             except Exception as e:
                 st.error(f"❌ Error during processing: {str(e)}")
@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")  # the court_line_detector package imports torch
+
+from court_line_detector import KeypointStabilizer, STABILIZER_METHODS
+
+
+def keypoint_frames(num_frames, seed=0):
+    rng = np.random.default_rng(seed)
+    return list(np.tile([500.0, 300.0], 14) + rng.normal(0, 2, (num_frames, 28)))
+
+
+@pytest.mark.parametrize("method", STABILIZER_METHODS)
+def test_empty_input(method):
+    stabilizer = KeypointStabilizer(method)
+    assert stabilizer.stabilize([]) == []
+    assert stabilizer.rejected_frames == 0
+
+
+@pytest.mark.parametrize("method", STABILIZER_METHODS)
+def test_empty_chunks_while_streaming(method):
+    frames = keypoint_frames(60)
+    whole = KeypointStabilizer(method).stabilize(frames)
+
+    stabilizer = KeypointStabilizer(method)
+    streamed = stabilizer.stabilize([])
+    for start in range(0, len(frames), 20):
+        streamed += stabilizer.stabilize(frames[start:start + 20])
+        streamed += stabilizer.stabilize([])
+    assert np.array_equal(np.array(whole), np.array(streamed))
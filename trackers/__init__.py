@@ -1,2 +1,2 @@
-from .player_tracker import PlayerTracker
-from .ball_tracker import BallTracker
\ No newline at end of file
+from .player_tracker import PlayerTracker, ByteTracker, OnlinePlayerSelector, TRACKER_PROFILES, DEFAULT_TRACKER_PROFILE
+from .ball_tracker import BallTracker, OnlineShotDetector, BallKalmanFilter, filter_ball_trajectory, decode_ball_candidates
\ No newline at end of file
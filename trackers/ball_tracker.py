@@ -2,20 +2,400 @@ from ultralytics import YOLO
 import cv2
 import os
 import pickle
+import sys
+import numpy as np
 import pandas as pd
-from typing import List, Dict, Optional
+from collections import deque
+from typing import List, Dict, Optional, Iterable
+sys.path.append('../')
+from utils import iter_batches, BallTrajectory, as_ball_trajectory, RawDetections, load_detection_stub
+
+
+# ---------- Hit estimation (tanpa model, dipakai juga oleh benchmark) ----------
+def get_ball_delta_y(ball_detections, window: int = 5) -> Optional[pd.Series]:
+    """
+    delta_y per frame dari rolling mean mid_y (None kalau tidak ada bola sama sekali).
+    ball_detections: BallTrajectory atau list [{1:[x1,y1,x2,y2]}, ...].
+    """
+    trajectory = as_ball_trajectory(ball_detections)
+    if not trajectory.any():
+        return None
+
+    boxes = trajectory.interpolated().boxes.astype(np.float64)
+    mid_y = pd.Series((boxes[:, 1] + boxes[:, 3]) / 2.0)
+    return mid_y.rolling(window=window, min_periods=1).mean().diff()
+
+
+def find_ball_hits(delta_y, start: int, stop: int, minimum_change_frames_for_hit: int = 25) -> List[int]:
+    """
+    Cek kandidat hit i di range(start, stop). Hit i butuh delta_y sampai i + look_ahead,
+    jadi pemanggil (mis. pipeline windowed) cukup memberi delta_y yang sudah final sampai situ.
+
+    Kandidat = perubahan tanda delta_y di i -> i+1; hit kalau di (i, i + look_ahead] ada
+    >= minimum_change_frames_for_hit frame dengan tanda berlawanan dari delta_y[i].
+    Jumlah per window dihitung dari cumulative sum, jadi O(n) tanpa loop Python.
+    """
+    dy = np.asarray(delta_y, dtype=float)
+    look_ahead = int(minimum_change_frames_for_hit * 1.2)
+    stop = min(stop, len(dy) - 1)
+    if stop <= start:
+        return []
+
+    # NaN tidak positif maupun negatif, sama seperti perbandingan di versi loop
+    pos = dy > 0
+    neg = dy < 0
+    pos_cumsum = np.concatenate(([0], np.cumsum(pos)))
+    neg_cumsum = np.concatenate(([0], np.cumsum(neg)))
+
+    i = np.arange(start, stop)
+    sign_change = (neg[i] & pos[i + 1]) | (pos[i] & neg[i + 1])
+
+    window_end = np.minimum(len(dy), i + look_ahead + 1)
+    opposite_count = np.where(pos[i],
+                              neg_cumsum[window_end] - neg_cumsum[i + 1],
+                              pos_cumsum[window_end] - pos_cumsum[i + 1])
+
+    return i[sign_change & (opposite_count >= minimum_change_frames_for_hit)].tolist()
+
+
+class OnlineShotDetector:
+    """
+    Versi streaming dari get_ball_shot_frames: terima satu deteksi bola per frame
+    ({1: [x1,y1,x2,y2]} atau {}), keluarkan frame hit begitu look-ahead-nya lengkap.
+
+    Logikanya sama dengan versi batch: frame tanpa bola diinterpolasi linear (menunggu
+    deteksi berikutnya), frame awal di-backfill, sisa di akhir di-forward-fill oleh
+    finish(), lalu rolling mean mid_y -> delta_y -> perubahan tanda yang bertahan.
+    Hit di frame i dilaporkan setelah frame i + look_ahead masuk. Memori O(window +
+    look_ahead) plus panjang gap deteksi yang sedang ditunggu.
+    """
+
+    def __init__(self, window: int = 5, minimum_change_frames_for_hit: int = 25):
+        self.window = window
+        self.minimum_change_frames_for_hit = minimum_change_frames_for_hit
+        self.look_ahead = int(minimum_change_frames_for_hit * 1.2)
+
+        self.frames_received = 0
+        self.shot_frames = []
+
+        # Interpolasi: deteksi terakhir (frame, y1, y2) dan jumlah frame kosong sesudahnya
+        self._last_detection = None
+        self._pending_frames = 0
+
+        # Rolling mean mid_y dan delta_y
+        self._frames_pushed = 0
+        self._mid_y_window = deque(maxlen=window)
+        self._previous_mean = None
+
+        # delta_y[i .. i + look_ahead] untuk kandidat i, plus jumlah positif/negatif di
+        # delta_y[i+1 .. i + look_ahead]
+        self._delta_y = deque()
+        self._positive_after = 0
+        self._negative_after = 0
+
+    def update(self, ball_detection: Dict[int, list]) -> List[int]:
+        """Tambah deteksi frame berikutnya; return frame hit yang baru pasti."""
+        frame_num = self.frames_received
+        self.frames_received += 1
+
+        bbox = ball_detection.get(1, []) if ball_detection else []
+        if len(bbox) != 4:
+            self._pending_frames += 1
+            return []
+
+        y1, y2 = float(bbox[1]), float(bbox[3])
+        hits = []
+        if self._last_detection is None:
+            # Frame sebelum deteksi pertama di-backfill
+            for _ in range(self._pending_frames):
+                hits.extend(self._push_mid_y((y1 + y2) / 2.0))
+        else:
+            # Interpolasi linear seperti np.interp / DataFrame.interpolate
+            last_frame, last_y1, last_y2 = self._last_detection
+            slope_y1 = (y1 - last_y1) / (frame_num - last_frame)
+            slope_y2 = (y2 - last_y2) / (frame_num - last_frame)
+            for step in range(1, self._pending_frames + 1):
+                gap_y1 = slope_y1 * step + last_y1
+                gap_y2 = slope_y2 * step + last_y2
+                hits.extend(self._push_mid_y((gap_y1 + gap_y2) / 2.0))
+
+        hits.extend(self._push_mid_y((y1 + y2) / 2.0))
+        self._last_detection = (frame_num, y1, y2)
+        self._pending_frames = 0
+        return hits
+
+    def finish(self) -> List[int]:
+        """Akhir video: frame kosong terakhir di-forward-fill; return hit yang tersisa."""
+        hits = []
+        if self._last_detection is not None:
+            _, last_y1, last_y2 = self._last_detection
+            for _ in range(self._pending_frames):
+                hits.extend(self._push_mid_y((last_y1 + last_y2) / 2.0))
+        self._pending_frames = 0
+        return hits
+
+    def _push_mid_y(self, mid_y: float) -> List[int]:
+        self._mid_y_window.append(mid_y)
+        mean = sum(self._mid_y_window) / len(self._mid_y_window)
+        delta_y = mean - self._previous_mean if self._previous_mean is not None else float('nan')
+        self._previous_mean = mean
+        self._frames_pushed += 1
+
+        if len(self._delta_y) == self.look_ahead + 1:
+            self._delta_y.popleft()
+            leaving = self._delta_y[0]  # jadi d0 kandidat berikutnya, keluar dari hitungan
+            self._positive_after -= leaving > 0
+            self._negative_after -= leaving < 0
+        if self._delta_y:
+            self._positive_after += delta_y > 0
+            self._negative_after += delta_y < 0
+        self._delta_y.append(delta_y)
+
+        # Kandidat i = frame terbaru - look_ahead sekarang punya look-ahead lengkap
+        candidate = self._frames_pushed - 1 - self.look_ahead
+        if candidate < 1 or len(self._delta_y) < 2:
+            return []
+
+        d0, d1 = self._delta_y[0], self._delta_y[1]
+        if d0 > 0 and d1 < 0:
+            change_count = self._negative_after
+        elif d0 < 0 and d1 > 0:
+            change_count = self._positive_after
+        else:
+            return []
+
+        if change_count >= self.minimum_change_frames_for_hit:
+            self.shot_frames.append(candidate)
+            return [candidate]
+        return []
+
+
+class BallKalmanFilter:
+    """
+    Filter Kalman constant-acceleration untuk pusat bola, dengan gating outlier.
+
+    State per sumbu [posisi, kecepatan, percepatan]; x dan y memakai model dan jadwal
+    pengukuran yang sama, jadi cukup satu kovarians 3x3 untuk keduanya. Deteksi yang
+    jarak Mahalanobis-nya (d^2, 2 dof) > gate dibuang (sepatu, logo, ...). Setelah
+    max_rejections penolakan berturut-turut filter mulai ulang di deteksi terbaru (bola
+    memang berbelok tajam, mis. pantulan), setelah max_missed frame tanpa bola track
+    dianggap hilang. O(1) per frame, jadi bisa dipakai streaming (update) atau untuk
+    satu video (filter_ball_trajectory).
+    """
+
+    def __init__(self, process_noise: float = 200.0, measurement_noise: float = 9.0,
+                 gate: float = 13.8, max_missed: int = 10, max_rejections: int = 3):
+        self.measurement_noise = measurement_noise  # varian posisi deteksi (px^2)
+        self.gate = gate                            # chi-square 2 dof, 99.9%
+        self.max_missed = max_missed
+        self.max_rejections = max_rejections
+
+        self.F = np.array([[1.0, 1.0, 0.5],
+                           [0.0, 1.0, 1.0],
+                           [0.0, 0.0, 1.0]])
+        # White-noise jerk model, dt = 1 frame; cukup besar supaya pukulan/pantulan lolos
+        self.Q = process_noise * np.array([[1 / 20, 1 / 8, 1 / 6],
+                                           [1 / 8, 1 / 3, 1 / 2],
+                                           [1 / 6, 1 / 2, 1.0]])
+        self.initial_P = np.diag([measurement_noise, 400.0, 100.0])
+        self.reset()
+
+    def reset(self):
+        self.state = None   # 3x2: kolom x dan y
+        self.P = None
+        self.missed = 0
+        self.rejections = 0
+        self.accepted_count = 0
+        self.rejected_count = 0
+        self.restart_count = 0
+
+    def update(self, bbox) -> Optional[list]:
+        """
+        Proses satu frame (bbox [x1,y1,x2,y2] atau None). Return bbox yang dipakai, dengan
+        pusat dari filter dan ukuran dari deteksi, atau None kalau tidak ada / outlier.
+        """
+        if self.state is not None:
+            self.state = self.F @ self.state
+            self.P = self.F @ self.P @ self.F.T + self.Q
+
+        if bbox is None:
+            if self.state is not None:
+                self.missed += 1
+                if self.missed > self.max_missed:
+                    self.state = None
+            return None
+
+        x1, y1, x2, y2 = bbox
+        center = np.array([(x1 + x2) / 2.0, (y1 + y2) / 2.0])
+        if self.state is None:
+            self._start(center)
+            return list(bbox)
+
+        innovation_variance = self.P[0, 0] + self.measurement_noise
+        innovation = center - self.state[0]
+        if innovation @ innovation / innovation_variance > self.gate:
+            self.rejected_count += 1
+            self.rejections += 1
+            self.missed += 1
+            if self.rejections >= self.max_rejections:
+                self.restart_count += 1
+                self._start(center)
+                return list(bbox)
+            return None
+
+        gain = self.P[:, 0] / innovation_variance
+        self.state = self.state + np.outer(gain, innovation)
+        self.P = self.P - np.outer(gain, self.P[0, :])
+        self.missed = 0
+        self.rejections = 0
+        self.accepted_count += 1
+
+        cx, cy = self.state[0]
+        half_w, half_h = (x2 - x1) / 2.0, (y2 - y1) / 2.0
+        return [float(cx - half_w), float(cy - half_h), float(cx + half_w), float(cy + half_h)]
+
+    def update_detection(self, ball_detection: Dict[int, list]) -> Dict[int, list]:
+        """update() untuk format lama {1: [x1,y1,x2,y2]} / {}"""
+        bbox = ball_detection.get(1, []) if ball_detection else []
+        filtered = self.update(bbox if len(bbox) == 4 else None)
+        return {1: filtered} if filtered is not None else {}
+
+    def _start(self, center):
+        self.state = np.zeros((3, 2))
+        self.state[0] = center
+        self.P = self.initial_P.copy()
+        self.missed = 0
+        self.rejections = 0
+        self.accepted_count += 1
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            'accepted': self.accepted_count,
+            'rejected_outliers': self.rejected_count,
+            'restarts': self.restart_count,
+        }
+
+
+def filter_ball_trajectory(ball_detections, kalman_filter: Optional[BallKalmanFilter] = None):
+    """
+    Jalankan BallKalmanFilter (baru, kecuali diberikan) atas satu video, O(n).
+    Input BallTrajectory -> BallTrajectory, input list -> list [{1:[...]} / {}, ...].
+    """
+    kalman_filter = kalman_filter or BallKalmanFilter()
+    if not isinstance(ball_detections, BallTrajectory):
+        return [kalman_filter.update_detection(d) for d in ball_detections]
+
+    boxes = np.full(ball_detections.boxes.shape, np.nan, dtype=ball_detections.boxes.dtype)
+    for frame_num in range(len(ball_detections)):
+        filtered = kalman_filter.update(ball_detections.get_box(frame_num))
+        if filtered is not None:
+            boxes[frame_num] = filtered
+    return BallTrajectory(boxes, dtype=boxes.dtype)
+
+
+def decode_ball_candidates(candidates, max_speed: float = 40.0, miss_cost: float = 2.3,
+                           reacquire_cost: float = 2.0) -> BallTrajectory:
+    """
+    Pilih satu bola per frame dari semua kandidat dengan Viterbi (DP), bukan argmax per frame.
+
+    candidates: per frame array (k, 5) [x1, y1, x2, y2, conf] (k boleh 0).
+    Biaya path = sum(-log(conf)) + sum((jarak pusat antar frame / max_speed)^2 / 2); state
+    "tidak ada bola" berbiaya miss_cost per frame (setara conf exp(-miss_cost) ~ 0.1) dan
+    kembali ke bola setelahnya berbiaya reacquire_cost. Jarak untuk semua frame dihitung
+    sekaligus dengan broadcasting; hanya langkah min-plus yang per frame, O(n * K^2).
+    """
+    num_frames = len(candidates)
+    max_k = max([len(c) for c in candidates] + [1])
+
+    # Padding ke (N, K): slot kosong berbiaya inf
+    boxes = np.zeros((num_frames, max_k, 4))
+    emission = np.full((num_frames, max_k + 1), np.inf)
+    emission[:, max_k] = miss_cost
+    for frame_num, frame_candidates in enumerate(candidates):
+        k = len(frame_candidates)
+        if k:
+            frame_candidates = np.asarray(frame_candidates, dtype=np.float64)
+            boxes[frame_num, :k] = frame_candidates[:, :4]
+            emission[frame_num, :k] = -np.log(np.clip(frame_candidates[:, 4], 1e-6, 1.0))
+
+    if num_frames == 0:
+        return BallTrajectory(np.empty((0, 4)))
+
+    centers = np.stack([(boxes[..., 0] + boxes[..., 2]) / 2, (boxes[..., 1] + boxes[..., 3]) / 2], axis=-1)
+    # transition[t, a, b]: state a di frame t -> state b di frame t+1 (state max_k = tidak ada bola)
+    transition = np.zeros((max(num_frames - 1, 0), max_k + 1, max_k + 1))
+    steps = centers[1:, None, :, :] - centers[:-1, :, None, :]
+    transition[:, :max_k, :max_k] = (steps ** 2).sum(axis=-1) / (2 * max_speed ** 2)
+    transition[:, max_k, :max_k] = reacquire_cost
+
+    score = emission[0].copy()
+    backpointers = np.zeros((num_frames, max_k + 1), dtype=np.int64)
+    states = np.arange(max_k + 1)
+    for t in range(1, num_frames):
+        total = score[:, None] + transition[t - 1]
+        best_previous = total.argmin(axis=0)
+        backpointers[t] = best_previous
+        score = total[best_previous, states] + emission[t]
+
+    path = np.empty(num_frames, dtype=np.int64)
+    path[-1] = score.argmin()
+    for t in range(num_frames - 1, 0, -1):
+        path[t - 1] = backpointers[t, path[t]]
+
+    valid = path < max_k
+    chosen = np.full((num_frames, 4), np.nan)
+    chosen[valid] = boxes[np.flatnonzero(valid), path[valid]]
+    return BallTrajectory(chosen, valid)
 
 
 class BallTracker:
-    def __init__(self, model_path: str, conf: float = 0.15, ball_class_id: Optional[int] = None):
+    def __init__(self, model_path: str, conf: float = 0.15, ball_class_id: Optional[int] = None,
+                 batch_size: int = 8, roi_search: bool = False, roi_size: int = 320,
+                 roi_max_misses: int = 3, roi_min_conf: float = 0.3, kalman_gating: bool = False,
+                 candidate_decoding: bool = False, max_candidates: int = 5, cache_floor_conf: float = 0.05):
         self.model = YOLO(model_path)
+        self.model_path = model_path
         self.conf = conf
         self.ball_class_id = ball_class_id  # kalau None: ambil bbox dengan conf tertinggi
+        self.batch_size = batch_size        # frame per panggilan predict (1 = per frame)
+
+        # ROI search: cari bola hanya di crop roi_size x roi_size sekitar posisi prediksi
+        # (resolusi asli), full frame lagi setelah roi_max_misses miss atau conf < roi_min_conf
+        self.roi_search = roi_search
+        self.roi_size = roi_size
+        self.roi_max_misses = roi_max_misses
+        self.roi_min_conf = roi_min_conf
+        self.reset_roi_tracking()
+
+        # Cache mentah: inference sekali di conf rendah, filter conf/class diulang dari cache
+        self.cache_floor_conf = cache_floor_conf
+
+        # Candidate decoding: simpan max_candidates bbox per frame, pilih path dengan Viterbi
+        # (butuh seluruh video, jadi tidak untuk ROI search maupun pipeline windowed)
+        self.candidate_decoding = candidate_decoding
+        self.max_candidates = max_candidates
+
+        # Kalman gating: buang false positive sebelum interpolasi (conf boleh lebih rendah)
+        self.kalman_filter = BallKalmanFilter() if kalman_gating else None
 
     # ---------- Inference ----------
     def detect_frame(self, frame) -> Dict[int, list]:
         """Return {1: [x1,y1,x2,y2]} or {} if none."""
         res = self.model.predict(frame, conf=self.conf, verbose=False)[0]
+        return self.pick_ball(res)
+
+    def detect_batch(self, frames: List) -> List[Dict[int, list]]:
+        """Satu panggilan predict untuk beberapa frame; hasil sama dengan detect_frame per frame."""
+        results = self.model.predict(frames, conf=self.conf, verbose=False)
+        return [self.pick_ball(res) for res in results]
+
+    def pick_ball(self, res) -> Dict[int, list]:
+        """Pilih bbox bola dari satu hasil YOLO: {1: [x1,y1,x2,y2]} or {}."""
+        best, _ = self.pick_ball_with_conf(res)
+        return {1: best} if best is not None else {}
+
+    def pick_ball_with_conf(self, res):
+        """(bbox, conf) bola terbaik dari satu hasil YOLO, atau (None, -1.0)."""
         best = None
         best_conf = -1.0
 
@@ -31,85 +411,214 @@ class BallTracker:
                 if conf > best_conf:
                     best_conf, best = conf, xyxy
 
-        return {1: best} if best is not None else {}
+        return best, best_conf
+
+    def raw_boxes(self, res) -> np.ndarray:
+        """Semua bbox dari satu hasil YOLO, tanpa filter: array (k, 6) [x1,y1,x2,y2,conf,cls]."""
+        boxes = res.boxes
+        if len(boxes) == 0:
+            return np.zeros((0, 6), dtype=np.float32)
+        return np.column_stack([boxes.xyxy.cpu().numpy(),
+                                boxes.conf.cpu().numpy(),
+                                boxes.cls.cpu().numpy()]).astype(np.float32)
+
+    def ball_candidates_from_raw(self, rows: np.ndarray) -> np.ndarray:
+        """Bbox bola (conf >= self.conf, sesuai ball_class_id) urut conf turun: (k, 5) [x1,y1,x2,y2,conf]."""
+        keep = rows[:, 4] >= self.conf
+        if self.ball_class_id is not None:
+            keep &= rows[:, 5] == self.ball_class_id
+        rows = rows[keep]
+        order = np.argsort(-rows[:, 4], kind="stable")[:self.max_candidates]
+        return rows[order, :5]
+
+    def detect_batch_raw(self, frames: List) -> List[np.ndarray]:
+        """Inference di cache_floor_conf, semua bbox disimpan (lihat RawDetections)."""
+        results = self.model.predict(frames, conf=self.raw_floor_conf, verbose=False)
+        return [self.raw_boxes(res) for res in results]
+
+    def detections_from_raw(self, raw: RawDetections) -> List[Dict[int, list]]:
+        """Terapkan conf / ball_class_id (dan candidate decoding) ke cache mentah: [{1:[...]} / {}, ...]."""
+        candidates = [self.ball_candidates_from_raw(rows) for rows in raw.frames]
+        if self.candidate_decoding:
+            return decode_ball_candidates(candidates).to_detections()
+        return [{1: c[0, :4].tolist()} if len(c) else {} for c in candidates]
+
+    # ---------- ROI search ----------
+    def reset_roi_tracking(self):
+        """Lupakan posisi bola sebelumnya dan nol-kan counter (panggil per video)."""
+        self._roi_history = []   # (frame_idx, cx, cy) dua deteksi terakhir
+        self._roi_frame_idx = 0
+        self._roi_misses = 0
+        self.roi_attempts = 0
+        self.roi_hits = 0
+        self.full_frame_passes = 0
+        self.full_frame_fallbacks = 0
+
+    def predict_ball_center(self):
+        """Ekstrapolasi linear dari dua deteksi terakhir ke frame sekarang (None kalau belum ada)."""
+        if not self._roi_history:
+            return None
+        frame_idx, cx, cy = self._roi_history[-1]
+        if len(self._roi_history) == 2:
+            prev_idx, prev_cx, prev_cy = self._roi_history[0]
+            steps = (self._roi_frame_idx - frame_idx) / (frame_idx - prev_idx)
+            cx += (cx - prev_cx) * steps
+            cy += (cy - prev_cy) * steps
+        return cx, cy
+
+    def detect_frame_roi(self, frame) -> Dict[int, list]:
+        """
+        detect_frame versi tracking: inference hanya di crop sekitar posisi bola yang
+        diprediksi, full frame kalau belum ada prediksi, setelah roi_max_misses miss
+        berturut-turut, atau kalau conf di crop < roi_min_conf. Frame harus berurutan.
+        """
+        det = {}
+        center = self.predict_ball_center()
+        if center is not None and self._roi_misses < self.roi_max_misses:
+            self.roi_attempts += 1
+            h, w = frame.shape[:2]
+            size = min(self.roi_size, w, h)
+            x0 = int(min(max(center[0] - size / 2, 0), w - size))
+            y0 = int(min(max(center[1] - size / 2, 0), h - size))
+            crop = frame[y0:y0 + size, x0:x0 + size]
 
-    def detect_frames(self, frames: List, read_from_stub: bool = False, stub_path: Optional[str] = None):
-        # cache baca
+            res = self.model.predict(crop, conf=self.conf, imgsz=self.roi_size, verbose=False)[0]
+            bbox, conf = self.pick_ball_with_conf(res)
+            if bbox is not None and conf >= self.roi_min_conf:
+                self.roi_hits += 1
+                det = {1: [bbox[0] + x0, bbox[1] + y0, bbox[2] + x0, bbox[3] + y0]}
+            elif bbox is not None:
+                # Ada kandidat tapi ragu: cek ulang di full frame
+                self.full_frame_fallbacks += 1
+                self.full_frame_passes += 1
+                det = self.detect_frame(frame)
+        else:
+            if center is not None:
+                self.full_frame_fallbacks += 1
+            self.full_frame_passes += 1
+            det = self.detect_frame(frame)
+
+        if det:
+            x1, y1, x2, y2 = det[1]
+            self._roi_history = (self._roi_history + [(self._roi_frame_idx, (x1 + x2) / 2, (y1 + y2) / 2)])[-2:]
+            self._roi_misses = 0
+        else:
+            self._roi_misses += 1
+        self._roi_frame_idx += 1
+        return det
+
+    def get_roi_stats(self) -> Dict[str, float]:
+        return {
+            'roi_attempts': self.roi_attempts,
+            'roi_hits': self.roi_hits,
+            'roi_hit_rate': self.roi_hits / self.roi_attempts if self.roi_attempts else 0.0,
+            'full_frame_passes': self.full_frame_passes,
+            'full_frame_fallbacks': self.full_frame_fallbacks,
+        }
+
+    @property
+    def raw_floor_conf(self) -> float:
+        return min(self.conf, self.cache_floor_conf)
+
+    def can_filter_raw(self, raw: RawDetections) -> bool:
+        """True kalau cache mentah bisa dipakai ulang (ROI search tergantung frame sebelumnya)."""
+        return raw.covers(self.conf) and not self.roi_search
+
+    def detect_frames(self, frames: Iterable, read_from_stub: bool = False, stub_path: Optional[str] = None):
+        # cache baca: cache mentah difilter ulang, stub lama (list) dipakai apa adanya
         if read_from_stub and stub_path and os.path.exists(stub_path):
-            print(f"Loading ball detections from cache: {stub_path}")
-            with open(stub_path, "rb") as f:
-                return pickle.load(f)
+            cached = load_detection_stub(stub_path)
+            if not isinstance(cached, RawDetections):
+                print(f"Loading ball detections from cache: {stub_path}")
+                return cached
+            if self.can_filter_raw(cached):
+                print(f"Filtering raw ball detections from cache: {stub_path} (conf={self.conf})")
+                return self.detections_from_raw(cached)
+            print(f"Raw cache {stub_path} was made at conf={cached.floor_conf}, re-running inference")
 
-        print(f"Detecting ball in {len(frames)} frames...")
-        dets = [self.detect_frame(fr) for fr in frames]
+        if self.roi_search:
+            print(f"Detecting ball in {len(frames)} frames (ROI search, {self.roi_size}px)...")
+            self.reset_roi_tracking()
+            dets = [self.detect_frame_roi(fr) for fr in frames]
+            print(f"ROI search stats: {self.get_roi_stats()}")
+        else:
+            print(f"Detecting ball in {len(frames)} frames (batch size {self.batch_size}, "
+                  f"raw boxes from conf={self.raw_floor_conf})...")
+            raw_frames = []
+            for batch in iter_batches(frames, self.batch_size):
+                raw_frames.extend(self.detect_batch_raw(batch))
+            raw = RawDetections(raw_frames, ['x1', 'y1', 'x2', 'y2', 'conf', 'cls'],
+                                floor_conf=self.raw_floor_conf, model_path=self.model_path)
+            dets = self.detections_from_raw(raw)
 
-        # cache tulis
+        # cache tulis (mentah kalau ada, hasil ROI search apa adanya)
         if stub_path:
             os.makedirs(os.path.dirname(stub_path), exist_ok=True)
-            with open(stub_path, "wb") as f:
-                pickle.dump(dets, f)
+            if self.roi_search:
+                with open(stub_path, "wb") as f:
+                    pickle.dump(dets, f)
+            else:
+                raw.save(stub_path)
             print(f"Saved ball detections to: {stub_path}")
 
         return dets
 
     # ---------- Hit estimation ----------
-    def get_ball_shot_frames(self, ball_detections: List[Dict[int, list]],
+    def get_ball_shot_frames(self, ball_detections,
                              window: int = 5, minimum_change_frames_for_hit: int = 25) -> List[int]:
         """Heuristik: perubahan tanda delta_y yang bertahan >= minimum_change_frames_for_hit."""
-        arr = [d.get(1, []) for d in ball_detections]
-        if not any(len(a) == 4 for a in arr):
+        delta_y = self.get_ball_delta_y(ball_detections, window=window)
+        if delta_y is None:
             return []
 
-        df = pd.DataFrame(arr, columns=["x1", "y1", "x2", "y2"]).interpolate().bfill()
-        df["mid_y"] = (df["y1"] + df["y2"]) / 2.0
-        df["mid_y_rolling_mean"] = df["mid_y"].rolling(window=window, min_periods=1).mean()
-        df["delta_y"] = df["mid_y_rolling_mean"].diff()
-        df["ball_hit"] = 0  # init
-
-        hits = []
         look_ahead = int(minimum_change_frames_for_hit * 1.2)
+        return self.find_ball_hits(delta_y, 1, max(1, len(delta_y) - look_ahead),
+                                   minimum_change_frames_for_hit=minimum_change_frames_for_hit)
 
-        for i in range(1, max(1, len(df) - look_ahead)):
-            d0 = df["delta_y"].iloc[i]
-            d1 = df["delta_y"].iloc[i + 1]
-            neg2pos = (d0 < 0) and (d1 > 0)
-            pos2neg = (d0 > 0) and (d1 < 0)
-            if not (neg2pos or pos2neg):
-                continue
-
-            initial_sign = 1 if d0 > 0 else -1
-            change_count = 0
-            for j in range(i + 1, min(len(df), i + look_ahead + 1)):
-                dj = df["delta_y"].iloc[j]
-                if (initial_sign > 0 and dj < 0) or (initial_sign < 0 and dj > 0):
-                    change_count += 1
-
-            if change_count >= minimum_change_frames_for_hit:
-                df.loc[i, "ball_hit"] = 1
-                hits.append(i)
+    def get_ball_delta_y(self, ball_detections, window: int = 5) -> Optional[pd.Series]:
+        """delta_y per frame dari rolling mean mid_y (None kalau tidak ada bola sama sekali)."""
+        return get_ball_delta_y(ball_detections, window=window)
 
-        return hits
+    def find_ball_hits(self, delta_y: pd.Series, start: int, stop: int,
+                       minimum_change_frames_for_hit: int = 25) -> List[int]:
+        """Lihat find_ball_hits (versi vektor, hasil sama dengan loop lama)."""
+        return find_ball_hits(delta_y, start, stop, minimum_change_frames_for_hit=minimum_change_frames_for_hit)
 
     # ---------- Interpolation ----------
-    def interpolate_ball_positions(self, ball_detections: List[Dict[int, list]]):
-        """Return format konsisten: [{1:[x1,y1,x2,y2]}, ...]"""
-        raw = [d.get(1, []) for d in ball_detections]
-        if not any(len(r) == 4 for r in raw):
+    def interpolate_ball_positions(self, ball_detections):
+        """
+        Isi frame tanpa bola (linear, bfill di awal). Input BallTrajectory -> BallTrajectory,
+        input list -> format konsisten: [{1:[x1,y1,x2,y2]}, ...]
+        """
+        trajectory = as_ball_trajectory(ball_detections)
+        if not trajectory.any():
             print("Warning: No ball detections found. Returning empty detections.")
-            return [{} for _ in raw]
+            return trajectory if ball_detections is trajectory else [{} for _ in range(len(trajectory))]
 
-        df = pd.DataFrame(raw, columns=["x1", "y1", "x2", "y2"]).interpolate().bfill()
-        return [{1: row.tolist()} for _, row in df.iterrows()]
+        interpolated = trajectory.interpolated()
+        return interpolated if ball_detections is trajectory else interpolated.to_detections()
+
+    # ---------- Kalman gating ----------
+    def filter_ball_positions(self, ball_detections):
+        """Saring outlier dengan Kalman filter (tanpa efek kalau kalman_gating mati)."""
+        if self.kalman_filter is None:
+            return ball_detections
+        self.kalman_filter.reset()
+        filtered = filter_ball_trajectory(ball_detections, self.kalman_filter)
+        print(f"Kalman gating stats: {self.kalman_filter.get_stats()}")
+        return filtered
 
     # ---------- Drawing ----------
-    def draw_bboxes(self, video_frames: List, ball_detections: List[Dict[int, list]]):
-        out = []
-        for frame, det in zip(video_frames, ball_detections):
-            img = frame.copy()
-            if det and 1 in det and len(det[1]) == 4:
-                x1, y1, x2, y2 = map(int, det[1])
-                cv2.rectangle(img, (x1, y1), (x2, y2), (0, 255, 255), 2)
-                cv2.putText(img, "Ball", (x1, max(0, y1 - 8)),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 255), 2)
-            out.append(img)
-        return out
+    def draw_bboxes(self, video_frames: List, ball_detections):
+        """ball_detections: BallTrajectory atau list [{1:[x1,y1,x2,y2]}, ...]"""
+        return [self.draw_frame_bboxes(frame, det) for frame, det in zip(video_frames, ball_detections)]
+
+    def draw_frame_bboxes(self, frame, det: Dict[int, list]):
+        """Draw the ball box on a copy of a single frame (streaming output)."""
+        img = frame.copy()
+        if det and 1 in det and len(det[1]) == 4:
+            x1, y1, x2, y2 = map(int, det[1])
+            cv2.rectangle(img, (x1, y1), (x2, y2), (0, 255, 255), 2)
+            cv2.putText(img, "Ball", (x1, max(0, y1 - 8)),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 255), 2)
+        return img
@@ -1,17 +1,258 @@
 from ultralytics import YOLO
 import cv2
-import pickle
 import os
 import sys
 import numpy as np
 sys.path.append('../')
-from utils import measure_distance, get_center_of_bbox
+from utils import (measure_distance, get_center_of_bbox, get_closest_keypoint_indices, get_court_region, RawDetections, load_detection_stub,
+                   iter_batches)
 
+TRACKERS_DIR = os.path.dirname(os.path.abspath(__file__))
+TRACKER_CONFIG_DIR = os.path.join(TRACKERS_DIR, 'tracker_configs')
+
+# Player tracker profiles, roughly from cheapest to most expensive on CPU.
+# Ultralytics profiles map to a tracker yaml; numpy_bytetrack uses ByteTracker below.
+TRACKER_PROFILES = {
+    'numpy_bytetrack': None,                                                  # batched detection, IoU + Kalman
+    'bytetrack': 'bytetrack.yaml',                                            # Ultralytics ByteTrack
+    'botsort_nogmc': os.path.join(TRACKER_CONFIG_DIR, 'botsort_nogmc.yaml'),  # BoT-SORT, no GMC, no ReID
+    'botsort_orb': os.path.join(TRACKER_CONFIG_DIR, 'botsort_orb.yaml'),      # ORB GMC, no ReID
+    'botsort': 'botsort.yaml',                                                # Ultralytics default: sparseOptFlow GMC
+    'botsort_reid': os.path.join(TRACKER_CONFIG_DIR, 'botsort_reid.yaml'),    # sparseOptFlow GMC + ReID
+    'botsort_tennis': os.path.join(os.path.dirname(TRACKERS_DIR), 'botsort_tennis.yaml'),    # tuned thresholds + ReID
+}
+DEFAULT_TRACKER_PROFILE = 'botsort'
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:  # scipy is optional here; greedy matching is exact enough for a handful of people
+    linear_sum_assignment = None
+
+
+def box_iou(boxes_a, boxes_b):
+    """Pairwise IoU of two [x1, y1, x2, y2] box arrays: (n, m)"""
+    boxes_a = np.asarray(boxes_a, dtype=np.float64).reshape(-1, 4)
+    boxes_b = np.asarray(boxes_b, dtype=np.float64).reshape(-1, 4)
+    inter_w = np.clip(np.minimum(boxes_a[:, None, 2], boxes_b[None, :, 2]) -
+                      np.maximum(boxes_a[:, None, 0], boxes_b[None, :, 0]), 0, None)
+    inter_h = np.clip(np.minimum(boxes_a[:, None, 3], boxes_b[None, :, 3]) -
+                      np.maximum(boxes_a[:, None, 1], boxes_b[None, :, 1]), 0, None)
+    inter = inter_w * inter_h
+    area_a = (boxes_a[:, 2] - boxes_a[:, 0]) * (boxes_a[:, 3] - boxes_a[:, 1])
+    area_b = (boxes_b[:, 2] - boxes_b[:, 0]) * (boxes_b[:, 3] - boxes_b[:, 1])
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def match_boxes(cost, max_cost):
+    """Minimum-cost assignment of a cost matrix; returns (row, col) pairs with cost <= max_cost"""
+    if cost.size == 0:
+        return []
+    if linear_sum_assignment is not None:
+        rows, cols = linear_sum_assignment(cost)
+        return [(r, c) for r, c in zip(rows, cols) if cost[r, c] <= max_cost]
+
+    # Greedy fallback: repeatedly take the cheapest remaining pair
+    matches = []
+    cost = cost.astype(np.float64).copy()
+    while True:
+        r, c = np.unravel_index(np.argmin(cost), cost.shape)
+        if cost[r, c] > max_cost:
+            return matches
+        matches.append((r, c))
+        cost[r, :] = np.inf
+        cost[:, c] = np.inf
+
+
+class ByteTracker:
+    """
+    Lightweight ByteTrack-style multi-object tracker in NumPy.
+
+    Each track has a constant-velocity Kalman filter on [cx, cy, w, h] (the BoT-SORT XYWH
+    model, so noise scales with the box size). Every frame all tracks are predicted at once,
+    then detections are associated by IoU in three stages as in ByteTrack:
+
+    1. high-confidence detections (>= high_thresh) with confirmed and lost tracks
+    2. the remaining low-confidence detections (>= low_thresh) with still-tracked tracks
+    3. leftover high-confidence detections with tracks started in the previous frame
+
+    Unmatched detections with conf >= new_track_thresh start tentative tracks that are confirmed
+    by a second match, lost tracks are dropped after track_buffer frames. No appearance model
+    and no camera motion compensation, so it costs microseconds per frame next to the detector.
+    """
+
+    TRACKED, LOST = 0, 1
+
+    def __init__(self, high_thresh=0.25, low_thresh=0.1, new_track_thresh=0.25, track_buffer=30,
+                 match_thresh=0.8, std_weight_position=1 / 20, std_weight_velocity=1 / 160):
+        self.high_thresh = high_thresh
+        self.low_thresh = low_thresh
+        self.new_track_thresh = new_track_thresh
+        self.track_buffer = track_buffer
+        self.match_thresh = match_thresh    # maximum 1 - IoU for a match in the first stage
+        self.std_weight_position = std_weight_position
+        self.std_weight_velocity = std_weight_velocity
+
+        self.F = np.eye(8)
+        self.F[:4, 4:] = np.eye(4)
+        self.reset()
+
+    def reset(self):
+        """Forget all tracks and restart IDs at 1 (call per video)"""
+        self.means = np.zeros((0, 8))
+        self.covs = np.zeros((0, 8, 8))
+        self.track_ids = np.zeros(0, dtype=np.int64)
+        self.states = np.zeros(0, dtype=np.int64)
+        self.confirmed = np.zeros(0, dtype=bool)
+        self.last_seen = np.zeros(0, dtype=np.int64)
+        self.frame_id = 0
+        self.next_id = 1
+
+    def update(self, detections):
+        """
+        Process one frame of detections, an (k, >=5) array [x1, y1, x2, y2, conf, ...].
+        Returns {track_id: [x1, y1, x2, y2]} with the matched detection box of every confirmed track.
+        """
+        self.frame_id += 1
+        detections = np.asarray(detections, dtype=np.float64).reshape(-1, max(5, np.shape(detections)[-1]))
+        detections = detections[detections[:, 4] >= self.low_thresh]
+        is_high = detections[:, 4] >= self.high_thresh
+        self._predict()
+
+        track_boxes = self._boxes()
+        det_matched = np.zeros(len(detections), dtype=bool)
+        track_matched = np.zeros(len(self.track_ids), dtype=bool)
+        matches = []
+
+        def associate(track_mask, det_mask, max_cost):
+            tracks = np.flatnonzero(track_mask & ~track_matched)
+            dets = np.flatnonzero(det_mask & ~det_matched)
+            cost = 1.0 - box_iou(track_boxes[tracks], detections[dets, :4])
+            for r, c in match_boxes(cost, max_cost):
+                track_matched[tracks[r]] = True
+                det_matched[dets[c]] = True
+                matches.append((tracks[r], dets[c]))
+
+        associate(self.confirmed, is_high, self.match_thresh)
+        associate(self.confirmed & (self.states == self.TRACKED), ~is_high, 0.5)
+        associate(~self.confirmed, is_high, 0.7)
+
+        output = {}
+        if matches:
+            track_idx, det_idx = map(np.array, zip(*matches))
+            self._correct(track_idx, detections[det_idx, :4])
+            self.states[track_idx] = self.TRACKED
+            self.confirmed[track_idx] = True
+            self.last_seen[track_idx] = self.frame_id
+            for t, d in zip(track_idx, det_idx):
+                output[int(self.track_ids[t])] = detections[d, :4].tolist()
+
+        # Unmatched tentative tracks die, unmatched confirmed tracks become lost until track_buffer expires
+        keep = track_matched | (self.confirmed & (self.frame_id - self.last_seen <= self.track_buffer))
+        self.states[~track_matched] = self.LOST
+        self._select(keep)
+
+        new = np.flatnonzero(~det_matched & (detections[:, 4] >= self.new_track_thresh))
+        if len(new):
+            # Tracks of the first frame are confirmed immediately, as in ByteTrack
+            first_frame = self.frame_id == 1
+            self._start(detections[new, :4], confirmed=first_frame)
+            if first_frame:
+                for t, d in zip(self.track_ids[-len(new):], new):
+                    output[int(t)] = detections[d, :4].tolist()
+        return output
+
+    # ---------- Vectorized Kalman filter ----------
+    def _boxes(self):
+        cx, cy, w, h = self.means[:, 0], self.means[:, 1], self.means[:, 2], self.means[:, 3]
+        return np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+
+    def _predict(self):
+        if not len(self.means):
+            return
+        w, h = self.means[:, 2], self.means[:, 3]
+        pos, vel = self.std_weight_position, self.std_weight_velocity
+        std = np.stack([pos * w, pos * h, pos * w, pos * h, vel * w, vel * h, vel * w, vel * h], axis=1)
+        self.means = self.means @ self.F.T
+        self.covs = self.F @ self.covs @ self.F.T
+        self.covs[:, np.arange(8), np.arange(8)] += std ** 2
+
+    def _correct(self, track_idx, boxes):
+        means, covs = self.means[track_idx], self.covs[track_idx]
+        w, h = means[:, 2], means[:, 3]
+        pos = self.std_weight_position
+        innovation_cov = covs[:, :4, :4].copy()
+        innovation_cov[:, np.arange(4), np.arange(4)] += np.stack([pos * w, pos * h, pos * w, pos * h], axis=1) ** 2
+        # K = P H^T S^-1, with S symmetric
+        gain = np.linalg.solve(innovation_cov, covs[:, :4, :]).transpose(0, 2, 1)
+        measurement = np.column_stack([(boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2,
+                                       boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]])
+        self.means[track_idx] = means + (gain @ (measurement - means[:, :4])[:, :, None])[:, :, 0]
+        self.covs[track_idx] = covs - gain @ innovation_cov @ gain.transpose(0, 2, 1)
+
+    def _start(self, boxes, confirmed):
+        n = len(boxes)
+        w, h = boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]
+        means = np.zeros((n, 8))
+        means[:, :4] = np.column_stack([(boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2, w, h])
+        pos, vel = 2 * self.std_weight_position, 10 * self.std_weight_velocity
+        std = np.stack([pos * w, pos * h, pos * w, pos * h, vel * w, vel * h, vel * w, vel * h], axis=1)
+        covs = np.zeros((n, 8, 8))
+        covs[:, np.arange(8), np.arange(8)] = std ** 2
+
+        self.means = np.concatenate([self.means, means])
+        self.covs = np.concatenate([self.covs, covs])
+        self.track_ids = np.concatenate([self.track_ids, np.arange(self.next_id, self.next_id + n)])
+        self.states = np.concatenate([self.states, np.full(n, self.TRACKED)])
+        self.confirmed = np.concatenate([self.confirmed, np.full(n, confirmed)])
+        self.last_seen = np.concatenate([self.last_seen, np.full(n, self.frame_id)])
+        self.next_id += n
+
+    def _select(self, keep):
+        self.means, self.covs = self.means[keep], self.covs[keep]
+        self.track_ids, self.states = self.track_ids[keep], self.states[keep]
+        self.confirmed, self.last_seen = self.confirmed[keep], self.last_seen[keep]
 
 
 class PlayerTracker:
-    def __init__ (self, model_path):
+    def __init__ (self, model_path, conf=0.25, iou=0.4, cache_floor_conf=0.1, cache_iou=0.7,
+                  tracker_profile=DEFAULT_TRACKER_PROFILE, batch_size=8, court_crop=False,
+                  court_crop_padding=(0.15, 0.35, 0.15, 0.2), court_crop_frames=32, reacquire_players=False):
+        if tracker_profile not in TRACKER_PROFILES:
+            raise ValueError(f"Unknown tracker profile {tracker_profile!r}, choose from {list(TRACKER_PROFILES)}")
         self.model = YOLO(model_path)
+        self.model_path = model_path
+        self.conf = conf  # Balanced confidence threshold
+        self.iou = iou    # IoU threshold for NMS
+        
+        # Raw cache: untracked detection (numpy_bytetrack) runs once at the most permissive
+        # settings and conf/iou are re-applied from the cache. model.track always runs at the
+        # configured conf/iou (the tracker output depends on the boxes it was given, so it cannot
+        # be replayed at other thresholds) and its cache is only reused at the same settings.
+        self.cache_floor_conf = cache_floor_conf
+        self.cache_iou = cache_iou
+        
+        # Tracker profile (see TRACKER_PROFILES). numpy_bytetrack runs batched person detection
+        # (batch_size frames per predict call) and ByteTrack-style association, instead of
+        # sequential model.track calls; conf is then the high-confidence threshold and boxes
+        # down to low_thresh keep tracks alive.
+        self.tracker_profile = tracker_profile
+        self.tracker_config = TRACKER_PROFILES[tracker_profile]
+        self.numpy_tracker = tracker_profile == 'numpy_bytetrack'
+        self.batch_size = batch_size
+        self.box_tracker = ByteTracker(high_thresh=conf, new_track_thresh=conf)
+        
+        # Court crop: detect players only inside the padded court region (from the court
+        # keypoints of the first court_crop_frames frames, fixed for the video so the tracker
+        # sees a steady view), which skips the stands and gives far players more pixels at the
+        # same imgsz. Boxes are mapped back to full-frame coordinates.
+        self.court_crop = court_crop
+        self.court_crop_padding = court_crop_padding
+        self.court_crop_frames = court_crop_frames
+        self.crop_region = None
+        
+        # Player selection: hand a chosen player's normalized ID over to a new track ID that
+        # appears where the player was lost (see OnlinePlayerSelector)
+        self.reacquire_players = reacquire_players
         
     def choose_and_filter_players(self, court_keypoints, player_detection):
         # Check if player_detection is empty or first frame has no detections
@@ -19,6 +260,23 @@ class PlayerTracker:
             print("Warning: No player detections found!")
             return []
         
+        # Single pass: choose the players after the first frames, then filter and
+        # normalize player IDs to 1 and 2 frame by frame
+        selector = OnlinePlayerSelector(self, reacquire=self.reacquire_players)
+        filtered_detections = []
+        for frame_num, player_dict in enumerate(player_detection):
+            frame_keypoints = court_keypoints[frame_num] if frame_num < len(court_keypoints) else None
+            filtered_detections.extend(selector.update(player_dict, frame_keypoints))
+        filtered_detections.extend(selector.finish())
+        return filtered_detections
+    
+    def choose_player_id_mapping(self, court_keypoints, player_detection):
+        """
+        Choose the two players from the first frames and return the {track_id: 1 or 2} mapping.
+        Only the first 10 frames of player_detection are used, so this can run as soon as they
+        are available. Returns None when no players were detected there (detections are then
+        left unfiltered).
+        """
         # Use multiple frames (first 10) to get more robust player selection
         # This handles cases where first frame might not be representative
         num_frames_to_analyze = min(10, len(player_detection))
@@ -34,7 +292,7 @@ class PlayerTracker:
         
         if not all_detections:
             print("Warning: No players detected in first frames!")
-            return player_detection
+            return None
         
         # Calculate average bbox for each track_id
         avg_detections = {}
@@ -58,16 +316,7 @@ class PlayerTracker:
         court_keypoints_first_frame = court_keypoints[0]
         chosen_player = self.choose_players(court_keypoints_first_frame, avg_detections)
         
-        # Filter and normalize player IDs to 1 and 2
-        filtered_player_detections = []
-        for player_dict in player_detection:
-            filtered_player_dict = {track_id: bbox for track_id, bbox in player_dict.items() if track_id in chosen_player}
-            filtered_player_detections.append(filtered_player_dict)
-        
-        # Normalize IDs to 1 and 2
-        normalized_detections = self.normalize_player_ids(filtered_player_detections, chosen_player, avg_detections)
-        
-        return normalized_detections
+        return self.get_player_id_mapping(chosen_player, avg_detections)
     
     def normalize_player_ids(self, player_detections, chosen_players, avg_detections):
         """
@@ -75,13 +324,21 @@ class PlayerTracker:
         Player with higher Y (lower on screen, near bottom) = Player 1
         Player with lower Y (higher on screen, near top) = Player 2
         """
+        id_mapping = self.get_player_id_mapping(chosen_players, avg_detections)
+        if not id_mapping:
+            return player_detections
+        
+        return self.apply_player_id_mapping(player_detections, id_mapping)
+    
+    def get_player_id_mapping(self, chosen_players, avg_detections):
+        """Map the chosen track IDs to 1 (bottom player) and 2 (top player); {} if none were chosen"""
         if len(chosen_players) < 2:
             # If only one player, just map to ID 1
             if len(chosen_players) == 1:
                 old_id = chosen_players[0]
                 id_mapping = {old_id: 1}
             else:
-                return player_detections
+                return {}
         else:
             # Sort players by Y position (bottom of bbox)
             # Calculate average Y position for each player
@@ -103,7 +360,10 @@ class PlayerTracker:
             print(f"  ID Normalization: {id_mapping[sorted_players[0][0]]} (bottom, Y={sorted_players[0][1]:.0f}) ← ID {sorted_players[0][0]}")
             print(f"  ID Normalization: {id_mapping[sorted_players[1][0]]} (top, Y={sorted_players[1][1]:.0f}) ← ID {sorted_players[1][0]}")
         
-        # Apply ID mapping to all frames
+        return id_mapping
+    
+    def apply_player_id_mapping(self, player_detections, id_mapping):
+        """Keep only the mapped tracks in every frame and rename them to their normalized IDs"""
         normalized_detections = []
         for player_dict in player_detections:
             normalized_dict = {}
@@ -125,10 +385,17 @@ class PlayerTracker:
         if debug:
             print(f"  Analyzing {len(player_dict)} detected players...")
         
+        # Distance of every player center to its closest court keypoint in one batched lookup
+        num_keypoints = len(court_keypoints) // 2
+        if num_keypoints:
+            player_centers = [get_center_of_bbox(bbox) for bbox in player_dict.values()]
+            _, keypoint_distances = get_closest_keypoint_indices(player_centers, court_keypoints, range(num_keypoints))
+        else:
+            keypoint_distances = np.full(len(player_dict), np.inf)
+        
         candidates = []
-        for track_id, bbox in player_dict.items():
+        for (track_id, bbox), min_distance in zip(player_dict.items(), keypoint_distances.tolist()):
             x1, y1, x2, y2 = bbox
-            player_center = get_center_of_bbox(bbox)
             
             # Calculate bbox properties
             bbox_width = x2 - x1
@@ -136,14 +403,6 @@ class PlayerTracker:
             bbox_area = bbox_width * bbox_height
             aspect_ratio = bbox_height / bbox_width if bbox_width > 0 else 0
             
-            # Calculate distance to closest court keypoint
-            min_distance = float('inf')
-            for i in range(0, len(court_keypoints), 2):
-                court_keypoint = (float(court_keypoints[i]), float(court_keypoints[i+1]))
-                distance = measure_distance(player_center, court_keypoint)
-                if distance < min_distance:
-                    min_distance = distance
-            
             # Store all metrics
             candidates.append({
                 'track_id': track_id,
@@ -224,49 +483,131 @@ class PlayerTracker:
         
         return chosen_players
     
-    def detect_frames(self, frames, read_from_stub = False, stub_path=None):
-        # Auto-detect if stub exists
+    def detect_frames(self, frames, read_from_stub = False, stub_path=None, court_keypoints=None):
+        # Court crop needs the court keypoints first
+        if self.court_crop:
+            if court_keypoints is None:
+                print("Warning: court crop needs court keypoints, detecting players on the full frame")
+            self.set_court_region(court_keypoints)
+        
+        # Auto-detect if stub exists (raw caches are re-filtered with the current conf/iou)
         if stub_path and os.path.exists(stub_path):
-            print(f"Loading player detections from cache: {stub_path}")
-            with open(stub_path, 'rb') as f:
-                return pickle.load(f)
-        
-        print(f"Detecting players in {len(frames)} frames...")
-        player_detections = []
-        
-        for frame in frames:
-            player_dict = self.detect_frame(frame)
-            player_detections.append(player_dict)
+            cached = load_detection_stub(stub_path)
+            if not isinstance(cached, RawDetections):
+                print(f"Loading player detections from cache: {stub_path}")
+                return cached
+            if self.can_filter_raw(cached):
+                print(f"Filtering raw player detections from cache: {stub_path} "
+                      f"(conf={self.conf}, iou={self.iou}, tracker={self.tracker_profile})")
+                return self.smooth_detections(self.detections_from_raw(cached))
+            print(f"Raw cache {stub_path} (conf={cached.floor_conf}, iou={cached.iou}, tracker={cached.tracker}, "
+                  f"crop={cached.crop_region}) does not match the current settings, re-running detection")
+        
+        if self.numpy_tracker:
+            print(f"Detecting players in {len(frames)} frames (batch size {self.batch_size}, NumPy tracker)...")
+        else:
+            print(f"Detecting players in {len(frames)} frames (tracker profile {self.tracker_profile})...")
+        if self.crop_region is not None:
+            print(f"Cropping player detection to the court region {self.crop_region}")
+        raw = RawDetections(self.detect_raw(frames), self.raw_columns, floor_conf=self.raw_floor_conf,
+                            iou=self.raw_iou, model_path=self.model_path, tracker=self.tracker_profile,
+                            crop_region=self.crop_region)
+        player_detections = self.detections_from_raw(raw)
         
         # Post-process: smooth tracking and fill gaps
         player_detections = self.smooth_detections(player_detections)
         
-        # Save to stub if path provided
+        # Save raw boxes to stub if path provided
         if stub_path is not None:
-            os.makedirs(os.path.dirname(stub_path), exist_ok=True)
-            with open(stub_path, 'wb') as f:
-                pickle.dump(player_detections, f)
-            print(f"Saved player detections to: {stub_path}")
+            raw.save(stub_path)
+            print(f"Saved raw player detections to: {stub_path}")
         
         return player_detections
-        
-    def detect_frame(self, frame):
-        results = self.model.track(
+    
+    @property
+    def detection_conf(self):
+        """Lowest confidence handed to the tracker (the NumPy tracker also uses low-score boxes)"""
+        if self.numpy_tracker:
+            return min(self.conf, self.box_tracker.low_thresh)
+        return self.conf
+    
+    @property
+    def raw_floor_conf(self):
+        if not self.numpy_tracker:
+            return self.conf
+        return min(self.detection_conf, self.cache_floor_conf)
+    
+    @property
+    def raw_columns(self):
+        columns = ['x1', 'y1', 'x2', 'y2', 'conf', 'cls']
+        return columns if self.numpy_tracker else columns + ['track_id']
+    
+    def can_filter_raw(self, raw):
+        """True if a raw cache can reproduce the current settings (IDs must come from the same tracker)"""
+        if not raw.covers(self.detection_conf, self.iou) or raw.crop_region != self.crop_region:
+            return False
+        if 'track_id' not in raw.columns:
+            return self.numpy_tracker
+        # Tracked boxes only replay at the conf/iou they were tracked with
+        if raw.floor_conf != self.conf or raw.iou != self.iou:
+            return False
+        # Caches from before tracker profiles were made with the default BoT-SORT
+        return (raw.tracker or DEFAULT_TRACKER_PROFILE) == self.tracker_profile
+    
+    def reset_tracking(self):
+        """Restart the NumPy tracker (track IDs from 1), call per video"""
+        self.box_tracker.reset()
+    
+    @property
+    def raw_iou(self):
+        if not self.numpy_tracker:
+            return self.iou
+        return max(self.iou, self.cache_iou)
+    
+    def set_court_region(self, court_keypoints):
+        """Set the crop region from court keypoints (court_crop only); None clears it (call per video)"""
+        if not self.court_crop or court_keypoints is None or len(court_keypoints) == 0:
+            self.crop_region = None
+        else:
+            self.crop_region = get_court_region(court_keypoints[:self.court_crop_frames], self.court_crop_padding)
+        return self.crop_region
+    
+    def crop_frame(self, frame):
+        """Crop a frame to the court region: (cropped frame, (x offset, y offset))"""
+        if self.crop_region is None:
+            return frame, (0, 0)
+        height, width = frame.shape[:2]
+        x1, y1, x2, y2 = self.crop_region
+        x1, y1 = min(max(x1, 0), width - 1), min(max(y1, 0), height - 1)
+        x2, y2 = max(min(x2, width), x1 + 1), max(min(y2, height), y1 + 1)
+        return frame[y1:y2, x1:x2], (x1, y1)
+    
+    def track(self, frame, conf, iou):
+        """model.track on the (cropped) frame: (results, offset to add to the boxes)"""
+        frame, offset = self.crop_frame(frame)
+        return self.model.track(
             frame, 
             persist=True,
-            conf=0.25,  # Balanced confidence threshold
-            iou=0.4,    # IoU threshold for NMS
-            tracker="botsort.yaml",  # Using BoT-SORT for better tracking
+            conf=conf,
+            iou=iou,
+            tracker=self.tracker_config,  # BoT-SORT by default, see TRACKER_PROFILES
             classes=[0],  # Only detect person class
             verbose=False,  # Reduce console output
             imgsz=640  # Input image size
-        )
+        ), offset
+        
+    def detect_frame(self, frame):
+        if self.numpy_tracker:
+            return self.detect_batch([frame])[0]
+        
+        results, (offset_x, offset_y) = self.track(frame, self.conf, self.iou)
         
         player_dict = {}
         for box in results[0].boxes:
             if box.id is not None:  # Only include tracked objects with valid ID
                 track_id = int(box.id[0])
-                bbox = box.xyxy[0].tolist()
+                x1, y1, x2, y2 = box.xyxy[0].tolist()
+                bbox = [x1 + offset_x, y1 + offset_y, x2 + offset_x, y2 + offset_y]
                 
                 # Additional validation: check if bbox is reasonable
                 x1, y1, x2, y2 = bbox
@@ -279,59 +620,261 @@ class PlayerTracker:
         
         return player_dict
     
+    def detect_batch(self, frames):
+        """Detect a batch of frames and associate them with the NumPy tracker (state carries over)"""
+        raw = RawDetections(self.detect_batch_raw(frames), self.raw_columns,
+                            floor_conf=self.raw_floor_conf, iou=self.raw_iou)
+        return self.detections_from_raw(raw, reset=False)
+    
+    def detect_batch_raw(self, frames):
+        """Batched person detection without tracking: per frame (k, 6) [x1, y1, x2, y2, conf, cls]"""
+        crops = [self.crop_frame(frame) for frame in frames]
+        results = self.model.predict(
+            [crop for crop, _ in crops],
+            conf=self.raw_floor_conf,
+            iou=self.raw_iou,
+            classes=[0],
+            verbose=False,
+            imgsz=640
+        )
+        raw_frames = []
+        for result, (_, offset) in zip(results, crops):
+            boxes = result.boxes
+            if len(boxes) == 0:
+                raw_frames.append(np.zeros((0, 6), dtype=np.float32))
+                continue
+            raw_frames.append(np.column_stack([self.uncrop_boxes(boxes.xyxy.cpu().numpy(), offset),
+                                               boxes.conf.cpu().numpy(),
+                                               boxes.cls.cpu().numpy()]).astype(np.float32))
+        return raw_frames
+    
+    def detect_raw(self, frames):
+        """Raw boxes for every frame in the current mode (see raw_columns)"""
+        if not self.numpy_tracker:
+            return [self.track_frame_raw(frame) for frame in frames]
+        raw_frames = []
+        for batch in iter_batches(frames, self.batch_size):
+            raw_frames.extend(self.detect_batch_raw(batch))
+        return raw_frames
+    
+    def track_frame_raw(self, frame):
+        """Track at the configured conf/iou and keep every box: (k, 7) [x1, y1, x2, y2, conf, cls, track_id]"""
+        results, offset = self.track(frame, self.raw_floor_conf, self.raw_iou)
+        boxes = results[0].boxes
+        if len(boxes) == 0:
+            return np.zeros((0, 7), dtype=np.float32)
+        track_ids = boxes.id.cpu().numpy() if boxes.id is not None else np.full(len(boxes), -1)
+        return np.column_stack([self.uncrop_boxes(boxes.xyxy.cpu().numpy(), offset),
+                                boxes.conf.cpu().numpy(),
+                                boxes.cls.cpu().numpy(),
+                                track_ids]).astype(np.float32)
+    
+    @staticmethod
+    def uncrop_boxes(xyxy, offset):
+        """Map [x1, y1, x2, y2] boxes from crop to full-frame coordinates"""
+        offset_x, offset_y = offset
+        if offset_x == 0 and offset_y == 0:
+            return xyxy
+        return xyxy + np.array([offset_x, offset_y, offset_x, offset_y], dtype=xyxy.dtype)
+    
+    def detections_from_raw(self, raw, reset=True):
+        """
+        Apply conf, NMS iou and the validity checks of detect_frame to a raw cache (unsmoothed).
+        Caches without track IDs are associated by the NumPy tracker, from scratch unless reset=False.
+        """
+        if 'track_id' not in raw.columns:
+            if reset:
+                self.reset_tracking()
+            player_detections = []
+            for rows in raw.filter(self.detection_conf, classes=[0], iou=self.iou):
+                tracks = self.box_tracker.update(rows)
+                player_detections.append({track_id: bbox for track_id, bbox in tracks.items()
+                                          if bbox[2] - bbox[0] > 10 and bbox[3] - bbox[1] > 10})
+            return player_detections
+        
+        track_id_col = raw.column('track_id')
+        player_detections = []
+        for rows in raw.filter(self.conf, classes=[0], iou=self.iou):
+            player_dict = {}
+            for row in rows:
+                x1, y1, x2, y2 = row[:4].tolist()
+                # Only tracked boxes of a reasonable size (see detect_frame)
+                if row[track_id_col] >= 0 and x2 - x1 > 10 and y2 - y1 > 10:
+                    player_dict[int(row[track_id_col])] = [x1, y1, x2, y2]
+            player_detections.append(player_dict)
+        return player_detections
+    
     def smooth_detections(self, player_detections, max_gap=5):
         """
         Smooth player detections by interpolating small gaps where tracking was lost.
         This helps maintain consistent tracking across frames.
+        
+        All detections are collected in one pass over the frames, sorted by track ID and the
+        gaps of every track are filled with array operations, so the cost is
+        O(detections + filled boxes) instead of O(track IDs x frames). Frames are updated in
+        place and returned.
         """
         if not player_detections:
             return player_detections
         
-        # Get all unique track IDs across all frames
+        # Single pass over the frames: one row per detection
         all_track_ids = set()
-        for frame_detections in player_detections:
+        track_ids, frames, bboxes = [], [], []
+        for frame_idx, frame_detections in enumerate(player_detections):
             all_track_ids.update(frame_detections.keys())
+            for track_id, bbox in frame_detections.items():
+                track_ids.append(track_id)
+                frames.append(frame_idx)
+                bboxes.append(bbox)
+        if not track_ids:
+            return player_detections
         
-        # For each track ID, interpolate missing frames
-        for track_id in all_track_ids:
-            frame_positions = []
-            
-            # Collect all frames where this track_id appears
-            for frame_idx, frame_detections in enumerate(player_detections):
-                if track_id in frame_detections:
-                    frame_positions.append((frame_idx, frame_detections[track_id]))
-            
-            # If track appears in multiple frames, interpolate gaps
-            if len(frame_positions) > 1:
-                for i in range(len(frame_positions) - 1):
-                    start_frame, start_bbox = frame_positions[i]
-                    end_frame, end_bbox = frame_positions[i + 1]
-                    gap = end_frame - start_frame - 1
-                    
-                    # Only interpolate small gaps
-                    if 0 < gap <= max_gap:
-                        # Linear interpolation of bbox coordinates
-                        for frame_idx in range(start_frame + 1, end_frame):
-                            alpha = (frame_idx - start_frame) / (end_frame - start_frame)
-                            interpolated_bbox = [
-                                start_bbox[0] + alpha * (end_bbox[0] - start_bbox[0]),
-                                start_bbox[1] + alpha * (end_bbox[1] - start_bbox[1]),
-                                start_bbox[2] + alpha * (end_bbox[2] - start_bbox[2]),
-                                start_bbox[3] + alpha * (end_bbox[3] - start_bbox[3])
-                            ]
-                            player_detections[frame_idx][track_id] = interpolated_bbox
+        # Group rows by track ID, in set order so boxes are filled (and dict keys added) in the
+        # same order as a per-ID scan; rows of one ID stay in frame order (stable sort)
+        id_rank = {track_id: rank for rank, track_id in enumerate(all_track_ids)}
+        ranks = np.array([id_rank[track_id] for track_id in track_ids])
+        order = np.argsort(ranks, kind='stable')
+        ranks = ranks[order]
+        frames = np.asarray(frames)[order]
+        bboxes = np.asarray(bboxes, dtype=np.float64)[order]
+        
+        # Only interpolate small gaps between consecutive detections of the same ID
+        gaps = np.diff(frames) - 1
+        segments = np.flatnonzero((ranks[1:] == ranks[:-1]) & (gaps > 0) & (gaps <= max_gap))
+        if len(segments) == 0:
+            return player_detections
+        
+        # One row per missing frame: the segment it belongs to and its offset in the gap
+        gap_sizes = gaps[segments]
+        segment_of_row = np.repeat(segments, gap_sizes)
+        offsets = np.arange(len(segment_of_row)) - np.repeat(np.cumsum(gap_sizes) - gap_sizes, gap_sizes) + 1
+        
+        # Linear interpolation of bbox coordinates
+        start_frames = frames[segment_of_row]
+        alpha = offsets / (frames[segment_of_row + 1] - start_frames)
+        start_bboxes = bboxes[segment_of_row]
+        interpolated = start_bboxes + alpha[:, None] * (bboxes[segment_of_row + 1] - start_bboxes)
+        
+        sorted_track_ids = [track_ids[i] for i in order[segment_of_row].tolist()]
+        for frame_idx, track_id, interpolated_bbox in zip((start_frames + offsets).tolist(), sorted_track_ids,
+                                                          interpolated.tolist()):
+            player_detections[frame_idx][track_id] = interpolated_bbox
         
         return player_detections
     
     def draw_bboxes(self, video_frames, player_detections):
         output_video_frames = []
         for frame, player_dict in zip(video_frames, player_detections):
-            for track_id, bbox in player_dict.items():
-                x1, y1, x2, y2 = map(int, bbox)
-                cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                cv2.putText(frame, f"Player {track_id}", (x1, y1-10), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
-            
-            output_video_frames.append(frame)
+            output_video_frames.append(self.draw_frame_bboxes(frame, player_dict))
         
-        return output_video_frames
\ No newline at end of file
+        return output_video_frames
+
+    def draw_frame_bboxes(self, frame, player_dict):
+        """Draw player boxes on a single frame (in place), for streaming output"""
+        for track_id, bbox in player_dict.items():
+            x1, y1, x2, y2 = map(int, bbox)
+            cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+            cv2.putText(frame, f"Player {track_id}", (x1, y1-10), 
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
+        
+        return frame
+
+
+class OnlinePlayerSelector:
+    """
+    Streaming choose_and_filter_players: choose the two players once, then filter and
+    normalize every frame as it arrives.
+
+    The first warmup_frames frames are buffered and the players are chosen from them with
+    PlayerTracker.choose_player_id_mapping (court keypoints of the first frame), exactly
+    like the batch selection. From then on each frame is mapped to IDs 1 (bottom) and
+    2 (top) on the fly, so memory stays constant.
+
+    With reacquire=True a chosen player whose track ID disappears is handed over to an
+    unchosen track ID that shows up within reacquire_distance box heights of the player's
+    last box, at most max_lost_frames later (BoT-SORT switches IDs after occlusions).
+    """
+
+    def __init__(self, player_tracker, warmup_frames=10, reacquire=False, reacquire_distance=0.5,
+                 max_lost_frames=60):
+        self.player_tracker = player_tracker
+        self.warmup_frames = warmup_frames
+        self.reacquire = reacquire
+        self.reacquire_distance = reacquire_distance
+        self.max_lost_frames = max_lost_frames
+
+        self.pending = []               # warm-up frames
+        self.first_court_keypoints = None
+        self.locked = False
+        self.id_mapping = None          # {track_id: 1 or 2}, None = leave frames unfiltered
+        self.last_seen = {}             # normalized ID -> (frame_num, bbox)
+        self.frame_num = 0
+        self.reacquired_count = 0
+
+    def update(self, player_dict, court_keypoints=None):
+        """Add one frame; returns the filtered frames that are final ([] during warm-up)"""
+        if self.first_court_keypoints is None and court_keypoints is not None:
+            self.first_court_keypoints = court_keypoints
+        if self.locked:
+            return [self._apply(player_dict)]
+
+        self.pending.append(player_dict)
+        if len(self.pending) < self.warmup_frames:
+            return []
+        return self._lock()
+
+    def finish(self):
+        """Flush the warm-up frames of a video shorter than warmup_frames"""
+        if self.locked or not self.pending:
+            return []
+        return self._lock()
+
+    def _lock(self):
+        self.id_mapping = self.player_tracker.choose_player_id_mapping([self.first_court_keypoints], self.pending)
+        self.locked = True
+        pending, self.pending = self.pending, []
+        return [self._apply(player_dict) for player_dict in pending]
+
+    def _apply(self, player_dict):
+        frame_num = self.frame_num
+        self.frame_num += 1
+        if self.id_mapping is None:
+            return player_dict
+
+        if self.reacquire:
+            self._reacquire(frame_num, player_dict)
+        normalized_dict = {}
+        for old_id, bbox in player_dict.items():
+            if old_id in self.id_mapping:
+                new_id = self.id_mapping[old_id]
+                normalized_dict[new_id] = bbox
+                self.last_seen[new_id] = (frame_num, bbox)
+        return normalized_dict
+
+    def _reacquire(self, frame_num, player_dict):
+        unmapped = [track_id for track_id in player_dict if track_id not in self.id_mapping]
+        if not unmapped:
+            return
+        for old_id, new_id in list(self.id_mapping.items()):
+            if old_id in player_dict or new_id not in self.last_seen:
+                continue
+            last_frame, last_bbox = self.last_seen[new_id]
+            if frame_num - last_frame > self.max_lost_frames:
+                continue
+
+            # Nearest unchosen track to where the player was last seen
+            last_center = get_center_of_bbox(last_bbox)
+            max_distance = self.reacquire_distance * (last_bbox[3] - last_bbox[1])
+            distances = [(measure_distance(last_center, get_center_of_bbox(player_dict[track_id])), track_id)
+                         for track_id in unmapped]
+            distance, track_id = min(distances)
+            if distance > max_distance:
+                continue
+
+            del self.id_mapping[old_id]
+            self.id_mapping[track_id] = new_id
+            unmapped.remove(track_id)
+            self.reacquired_count += 1
+            print(f"  Player {new_id} re-acquired at frame {frame_num}: track ID {old_id} -> {track_id}")
+            if not unmapped:
+                return
@@ -1,4 +1,11 @@
-from .video_utils import read_video, save_video
+from .video_utils import (read_video,
+                          save_video,
+                          VideoFrameSource,
+                          PrefetchingFrameSource,
+                          AsyncVideoWriter,
+                          codec_for_container,
+                          open_video,
+                          iter_batches)
 from .bbox_utils import (
     get_center_of_bbox, 
     measure_distance,
@@ -6,8 +13,16 @@ from .bbox_utils import (
     get_height_of_bbox,
     measure_xy_distance,
     get_closest_keypoint_index,
-    get_closest_keypoint_index_by_zone
+    get_closest_keypoint_index_by_zone,
+    get_closest_keypoint_indices,
+    get_closest_keypoint_indices_by_zone,
+    get_court_region
 )
+from .sliding_window import (SlidingWindowMax, PlayerHeightWindows, sliding_window_max,
+                             get_player_reference_heights)
+from .ball_trajectory import BallTrajectory, as_ball_trajectory
+from .detection_cache import RawDetections, load_detection_stub, non_max_suppression
 from .conversions import convert_pixel_distance_to_meters, convert_meters_to_pixel_distance
 
-from .player_stats_drawer_utils import draw_player_stats
\ No newline at end of file
+from .player_stats_drawer_utils import draw_player_stats, draw_player_stats_frame
+from .player_stats_utils import get_initial_player_stats, get_next_player_stats, get_player_stats_dataframe
\ No newline at end of file
@@ -0,0 +1,84 @@
+import numpy as np
+
+
+class BallTrajectory:
+    """
+    Array-backed ball trajectory: one [x1, y1, x2, y2] row per frame plus a validity mask.
+
+    Replaces the legacy list of {1: [x1, y1, x2, y2]} / {} dicts without a Python object
+    per frame. Indexing a single frame still returns the legacy dict, so code written for
+    the list format keeps working; from_detections / to_detections convert explicitly.
+
+    Boxes are float32 by default (YOLO boxes are float32 already). The adapters used for
+    legacy lists keep float64 so their results are unchanged.
+    """
+
+    def __init__(self, boxes, valid=None, dtype=np.float32):
+        self.boxes = np.asarray(boxes, dtype=dtype).reshape(-1, 4)
+        if valid is None:
+            valid = ~np.isnan(self.boxes).any(axis=1)
+        self.valid = np.asarray(valid, dtype=bool)
+
+    @classmethod
+    def from_detections(cls, ball_detections, dtype=np.float32):
+        """Build from the legacy [{1: [x1, y1, x2, y2]} or {}, ...] format"""
+        boxes = np.full((len(ball_detections), 4), np.nan, dtype=dtype)
+        valid = np.zeros(len(ball_detections), dtype=bool)
+        for frame_num, detection in enumerate(ball_detections):
+            bbox = detection.get(1, []) if detection else []
+            if len(bbox) == 4:
+                boxes[frame_num] = bbox
+                valid[frame_num] = True
+        return cls(boxes, valid, dtype=dtype)
+
+    def to_detections(self):
+        """Convert back to the legacy [{1: [x1, y1, x2, y2]} or {}, ...] format"""
+        return [{1: bbox} if is_valid else {} for bbox, is_valid in zip(self.boxes.tolist(), self.valid)]
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return BallTrajectory(self.boxes[index], self.valid[index], dtype=self.boxes.dtype)
+        return {1: self.boxes[index].tolist()} if self.valid[index] else {}
+
+    def __iter__(self):
+        return iter(self.to_detections())
+
+    def get_box(self, frame_num):
+        """[x1, y1, x2, y2] of a frame as Python floats, or None without a ball"""
+        return self.boxes[frame_num].tolist() if self.valid[frame_num] else None
+
+    def any(self):
+        return bool(self.valid.any())
+
+    @property
+    def centers(self):
+        """N x 2 ball centers (NaN where there is no ball)"""
+        centers = np.stack([(self.boxes[:, 0] + self.boxes[:, 2]) / 2,
+                            (self.boxes[:, 1] + self.boxes[:, 3]) / 2], axis=1)
+        centers[~self.valid] = np.nan
+        return centers
+
+    def interpolated(self):
+        """
+        Fill every missing frame: linear between detections, the first detection before it
+        and the last one after it (same as DataFrame.interpolate().bfill()).
+        """
+        if not self.valid.any() or self.valid.all():
+            return BallTrajectory(self.boxes.copy(), self.valid.copy(), dtype=self.boxes.dtype)
+
+        frames = np.arange(len(self.boxes))
+        known = np.flatnonzero(self.valid)
+        boxes = np.empty_like(self.boxes)
+        for column in range(4):
+            boxes[:, column] = np.interp(frames, known, self.boxes[known, column])
+        return BallTrajectory(boxes, np.ones(len(boxes), dtype=bool), dtype=self.boxes.dtype)
+
+
+def as_ball_trajectory(ball_detections):
+    """Accept a BallTrajectory or a legacy list of dicts (converted losslessly in float64)"""
+    if isinstance(ball_detections, BallTrajectory):
+        return ball_detections
+    return BallTrajectory.from_detections(ball_detections, dtype=np.float64)
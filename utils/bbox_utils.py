@@ -113,4 +113,98 @@ def get_closest_keypoint_index_by_zone(point, keypoints, keypoint_indices):
             min_distance = distance
             closest_index = keypoint_index
     
-    return closest_index
\ No newline at end of file
+    return closest_index
+
+def get_closest_keypoint_indices(points, keypoints, keypoint_indices):
+    """
+    Array version of get_closest_keypoint_index for M points at once.
+    
+    Args:
+        points: (M, 2) positions
+        keypoints: one frame of keypoints [x0, y0, x1, y1, ...] shared by all points, or
+            (M, 28) with the keypoints of each point's frame (e.g. keypoints[frame_indices])
+        keypoint_indices: candidate keypoint indices
+    
+    Returns:
+        (M,) closest keypoint indices and (M,) distances to them
+    """
+    import numpy as np
+    
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    candidates = np.asarray(keypoint_indices)
+    keypoints = np.asarray(keypoints, dtype=np.float64)
+    keypoints = np.broadcast_to(keypoints.reshape(-1, keypoints.shape[-1]), (len(points), keypoints.shape[-1]))
+    squared = _squared_distances(points, keypoints, candidates)
+    closest = squared.argmin(axis=1) if len(candidates) else np.zeros(len(points), dtype=np.intp)
+    rows = np.arange(len(points))
+    return candidates[closest], np.sqrt(squared[rows, closest])
+
+def get_closest_keypoint_indices_by_zone(points, keypoints, keypoint_indices):
+    """
+    Array version of get_closest_keypoint_index_by_zone (same zones and fallbacks) for M points at once.
+    
+    Args:
+        points: (M, 2) positions
+        keypoints: one frame of keypoints shared by all points, or (M, 28) with the keypoints
+            of each point's frame
+        keypoint_indices: candidate keypoint indices, e.g. [0, 1, 2, 3, 12, 13]
+    
+    Returns:
+        (M,) keypoint indices and (M,) distances to them
+    """
+    import numpy as np
+    
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    candidates = np.asarray(keypoint_indices)
+    keypoints = np.asarray(keypoints, dtype=np.float64)
+    keypoints = np.broadcast_to(keypoints.reshape(-1, keypoints.shape[-1]), (len(points), keypoints.shape[-1]))
+    
+    near_baseline_y = (keypoints[:, 0*2+1] + keypoints[:, 1*2+1]) / 2
+    far_service_y = (keypoints[:, 2*2+1] + keypoints[:, 3*2+1]) / 2
+    net_y = (keypoints[:, 12*2+1] + keypoints[:, 13*2+1]) / 2
+    top_zone_max = net_y - np.abs(net_y - near_baseline_y) * 0.3
+    bottom_zone_min = net_y + np.abs(far_service_y - net_y) * 0.3
+    
+    # Candidate mask per zone (TOP, BOTTOM, NET), all candidates when a zone has none
+    zone_masks = np.array([np.isin(candidates, zone_keypoints) for zone_keypoints in ([0, 1], [2, 3], [12, 13])])
+    zone_masks[~zone_masks.any(axis=1)] = True
+    zones = np.where(points[:, 1] < top_zone_max, 0, np.where(points[:, 1] > bottom_zone_min, 1, 2))
+    
+    squared = _squared_distances(points, keypoints, candidates)
+    squared_in_zone = np.where(zone_masks[zones], squared, np.inf)
+    closest = squared_in_zone.argmin(axis=1)
+    rows = np.arange(len(points))
+    return candidates[closest], np.sqrt(squared[rows, closest])
+
+def _squared_distances(points, keypoints, candidates):
+    """(M, K) squared distances from each point to candidate keypoints of its row of keypoints"""
+    dx = keypoints[:, candidates * 2] - points[:, :1]
+    dy = keypoints[:, candidates * 2 + 1] - points[:, 1:]
+    return dx * dx + dy * dy
+
+def get_court_region(court_keypoints, padding=(0.15, 0.35, 0.15, 0.2)):
+    """
+    Padded bounding box [x1, y1, x2, y2] (ints) of the court from keypoints.
+    
+    Args:
+        court_keypoints: Keypoints of one frame [x0, y0, x1, y1, ...] or a list of them;
+            with several frames the median court bounds are used, so a few bad
+            predictions do not move the region
+        padding: Extra margin (left, top, right, bottom) as a fraction of the court
+            width / height. The top margin is the largest so the far player's body
+            above the far baseline stays inside.
+    
+    The region is not clipped to the frame.
+    """
+    import numpy as np
+    
+    keypoints = np.asarray(court_keypoints, dtype=np.float64)
+    keypoints = keypoints.reshape(-1, keypoints.shape[-1])
+    xs, ys = keypoints[:, 0::2], keypoints[:, 1::2]
+    x1, x2 = np.median(xs.min(axis=1)), np.median(xs.max(axis=1))
+    y1, y2 = np.median(ys.min(axis=1)), np.median(ys.max(axis=1))
+    
+    width, height = x2 - x1, y2 - y1
+    pad_left, pad_top, pad_right, pad_bottom = padding
+    return [int(np.floor(x1 - pad_left * width)), int(np.floor(y1 - pad_top * height)),
+            int(np.ceil(x2 + pad_right * width)), int(np.ceil(y2 + pad_bottom * height))]
@@ -0,0 +1,113 @@
+import os
+import pickle
+import numpy as np
+
+RAW_DETECTIONS_FORMAT = 'raw_detections_v1'
+
+
+class RawDetections:
+    """
+    Every box a detector returned for each frame, before any thresholding.
+
+    frames[i] is a float32 array with one row per box and the columns in `columns`
+    (x1, y1, x2, y2, conf, cls and, for tracked detections, track_id). Inference runs
+    once at floor_conf (and NMS at iou); filter() then re-applies any stricter
+    confidence, class or NMS setting in milliseconds, so threshold sweeps and model
+    comparisons don't need another YOLO pass. tracker names the tracker profile that
+    assigned the track IDs, if any, and crop_region the [x1, y1, x2, y2] region the
+    detector saw (boxes are always in full-frame coordinates).
+    """
+
+    def __init__(self, frames, columns, floor_conf, iou=None, model_path=None, tracker=None, crop_region=None):
+        self.frames = frames
+        self.columns = list(columns)
+        self.floor_conf = floor_conf
+        self.iou = iou
+        self.model_path = model_path
+        self.tracker = tracker
+        self.crop_region = crop_region
+
+    def __len__(self):
+        return len(self.frames)
+
+    def column(self, name):
+        return self.columns.index(name)
+
+    def covers(self, conf, iou=None):
+        """True if filtering can reproduce a run at conf (and NMS iou)"""
+        if conf < self.floor_conf:
+            return False
+        return iou is None or self.iou is None or iou <= self.iou
+
+    def filter(self, conf, classes=None, iou=None):
+        """Per-frame rows with conf >= conf, cls in classes and (if iou is stricter) NMS re-applied"""
+        conf_col, cls_col = self.column('conf'), self.column('cls')
+        filtered = []
+        for rows in self.frames:
+            keep = rows[:, conf_col] >= conf
+            if classes is not None:
+                keep &= np.isin(rows[:, cls_col], classes)
+            rows = rows[keep]
+            if iou is not None and self.iou is not None and iou < self.iou and len(rows) > 1:
+                rows = rows[non_max_suppression(rows[:, :4], rows[:, conf_col], iou, rows[:, cls_col])]
+            filtered.append(rows)
+        return filtered
+
+    def to_dict(self):
+        return {
+            'format': RAW_DETECTIONS_FORMAT,
+            'columns': self.columns,
+            'floor_conf': self.floor_conf,
+            'iou': self.iou,
+            'model_path': self.model_path,
+            'tracker': self.tracker,
+            'crop_region': self.crop_region,
+            'frames': self.frames,
+        }
+
+    def save(self, path):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            pickle.dump(self.to_dict(), f)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['frames'], data['columns'], data['floor_conf'],
+                   iou=data.get('iou'), model_path=data.get('model_path'), tracker=data.get('tracker'),
+                   crop_region=data.get('crop_region'))
+
+
+def load_detection_stub(path):
+    """Load a tracker stub: RawDetections for raw caches, the stored object (legacy lists) otherwise"""
+    with open(path, 'rb') as f:
+        data = pickle.load(f)
+    if isinstance(data, dict) and data.get('format') == RAW_DETECTIONS_FORMAT:
+        return RawDetections.from_dict(data)
+    return data
+
+
+def non_max_suppression(boxes, scores, iou_threshold, classes=None):
+    """
+    Greedy per-class NMS; returns the kept indices in descending score order.
+    A box is suppressed when its IoU with a kept box is above iou_threshold (as in YOLO).
+    """
+    if classes is not None:
+        # Offset boxes per class so different classes never overlap
+        offset = (np.asarray(classes, dtype=np.float64) * (boxes.max() + 1))[:, None]
+        boxes = boxes + offset
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = (x2 - x1) * (y2 - y1)
+    order = np.argsort(-scores, kind='stable')
+
+    keep = []
+    while len(order):
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        inter_w = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        inter_h = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = inter_w * inter_h
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
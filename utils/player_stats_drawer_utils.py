@@ -4,58 +4,62 @@ import cv2
 def draw_player_stats(output_video_frames,player_stats):
 
     for index, row in player_stats.iterrows():
-        player_1_shot_speed = row['player_1_last_shot_speed']
-        player_2_shot_speed = row['player_2_last_shot_speed']
-        player_1_speed = row['player_1_last_player_speed']
-        player_2_speed = row['player_2_last_player_speed']
-
-        avg_player_1_shot_speed = row['player_1_average_shot_speed']
-        avg_player_2_shot_speed = row['player_2_average_shot_speed']
-        avg_player_1_speed = row['player_1_average_player_speed']
-        avg_player_2_speed = row['player_2_average_player_speed']
-
-        frame = output_video_frames[index]
-        shapes = np.zeros_like(frame, np.uint8)
-
-        # Stats box dimensions - smaller to match mini court
-        width = 320
-        height = 210
-
-        # Position: top-left corner, below mini court
-        # Mini court is at (50, 50) with height ~300, so stats start at ~360
-        start_x = 900  # Align with mini court left edge
-        start_y = 370  # Below mini court (50 + 300 + 20 margin)
-        end_x = start_x + width
-        end_y = start_y + height
-
-        overlay = frame.copy()
-        cv2.rectangle(overlay, (start_x, start_y), (end_x, end_y), (0, 0, 0), -1)
-        alpha = 0.5 
-        cv2.addWeighted(overlay, alpha, frame, 1 - alpha, 0, frame)
-        output_video_frames[index] = frame
-
-        text = "     Player 1     Player 2"
-        output_video_frames[index] = cv2.putText(output_video_frames[index], text, (start_x+70, start_y+25), cv2.FONT_HERSHEY_SIMPLEX, 0.55, (255, 255, 255), 2)
-        
-        text = "Shot Speed"
-        output_video_frames[index] = cv2.putText(output_video_frames[index], text, (start_x+10, start_y+65), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (255, 255, 255), 1)
-        text = f"{player_1_shot_speed:.1f} km/h    {player_2_shot_speed:.1f} km/h"
-        output_video_frames[index] = cv2.putText(output_video_frames[index], text, (start_x+120, start_y+65), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
-
-        text = "Player Speed"
-        output_video_frames[index] = cv2.putText(output_video_frames[index], text, (start_x+10, start_y+100), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (255, 255, 255), 1)
-        text = f"{player_1_speed:.1f} km/h    {player_2_speed:.1f} km/h"
-        output_video_frames[index] = cv2.putText(output_video_frames[index], text, (start_x+120, start_y+100), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
-        
-        
-        text = "avg. S. Speed"
-        output_video_frames[index] = cv2.putText(output_video_frames[index], text, (start_x+10, start_y+135), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (255, 255, 255), 1)
-        text = f"{avg_player_1_shot_speed:.1f} km/h    {avg_player_2_shot_speed:.1f} km/h"
-        output_video_frames[index] = cv2.putText(output_video_frames[index], text, (start_x+120, start_y+135), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
-        
-        text = "avg. P. Speed"
-        output_video_frames[index] = cv2.putText(output_video_frames[index], text, (start_x+10, start_y+170), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (255, 255, 255), 1)
-        text = f"{avg_player_1_speed:.1f} km/h    {avg_player_2_speed:.1f} km/h"
-        output_video_frames[index] = cv2.putText(output_video_frames[index], text, (start_x+120, start_y+170), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
+        output_video_frames[index] = draw_player_stats_frame(output_video_frames[index], row)
     
     return output_video_frames
+
+def draw_player_stats_frame(frame, row):
+    """Draw the stats box for a single frame from its row of the player stats dataframe"""
+    player_1_shot_speed = row['player_1_last_shot_speed']
+    player_2_shot_speed = row['player_2_last_shot_speed']
+    player_1_speed = row['player_1_last_player_speed']
+    player_2_speed = row['player_2_last_player_speed']
+
+    avg_player_1_shot_speed = row['player_1_average_shot_speed']
+    avg_player_2_shot_speed = row['player_2_average_shot_speed']
+    avg_player_1_speed = row['player_1_average_player_speed']
+    avg_player_2_speed = row['player_2_average_player_speed']
+
+    shapes = np.zeros_like(frame, np.uint8)
+
+    # Stats box dimensions - smaller to match mini court
+    width = 320
+    height = 210
+
+    # Position: top-left corner, below mini court
+    # Mini court is at (50, 50) with height ~300, so stats start at ~360
+    start_x = 900  # Align with mini court left edge
+    start_y = 370  # Below mini court (50 + 300 + 20 margin)
+    end_x = start_x + width
+    end_y = start_y + height
+
+    overlay = frame.copy()
+    cv2.rectangle(overlay, (start_x, start_y), (end_x, end_y), (0, 0, 0), -1)
+    alpha = 0.5 
+    cv2.addWeighted(overlay, alpha, frame, 1 - alpha, 0, frame)
+    
+    text = "     Player 1     Player 2"
+    frame = cv2.putText(frame, text, (start_x+70, start_y+25), cv2.FONT_HERSHEY_SIMPLEX, 0.55, (255, 255, 255), 2)
+
+    text = "Shot Speed"
+    frame = cv2.putText(frame, text, (start_x+10, start_y+65), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (255, 255, 255), 1)
+    text = f"{player_1_shot_speed:.1f} km/h    {player_2_shot_speed:.1f} km/h"
+    frame = cv2.putText(frame, text, (start_x+120, start_y+65), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
+
+    text = "Player Speed"
+    frame = cv2.putText(frame, text, (start_x+10, start_y+100), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (255, 255, 255), 1)
+    text = f"{player_1_speed:.1f} km/h    {player_2_speed:.1f} km/h"
+    frame = cv2.putText(frame, text, (start_x+120, start_y+100), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
+
+
+    text = "avg. S. Speed"
+    frame = cv2.putText(frame, text, (start_x+10, start_y+135), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (255, 255, 255), 1)
+    text = f"{avg_player_1_shot_speed:.1f} km/h    {avg_player_2_shot_speed:.1f} km/h"
+    frame = cv2.putText(frame, text, (start_x+120, start_y+135), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
+
+    text = "avg. P. Speed"
+    frame = cv2.putText(frame, text, (start_x+10, start_y+170), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (255, 255, 255), 1)
+    text = f"{avg_player_1_speed:.1f} km/h    {avg_player_2_speed:.1f} km/h"
+    frame = cv2.putText(frame, text, (start_x+120, start_y+170), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
+
+    return frame
@@ -0,0 +1,86 @@
+import pandas as pd
+from copy import deepcopy
+import sys
+sys.path.append('../')
+import constants
+from .bbox_utils import measure_distance
+from .conversions import convert_pixel_distance_to_meters
+
+def get_initial_player_stats():
+    """Stats row shown before the first shot"""
+    return {
+        'frame_num' : 0,
+        'player_1_number_of_shots': 0,
+        'player_1_total_shot_speed': 0,
+        'player_1_last_shot_speed': 0,
+        'player_1_total_player_speed': 0,
+        'player_1_last_player_speed': 0,
+
+        'player_2_number_of_shots': 0,
+        'player_2_total_shot_speed': 0,
+        'player_2_last_shot_speed': 0,
+        'player_2_total_player_speed': 0,
+        'player_2_last_player_speed': 0,
+    }
+
+def get_next_player_stats(player_stats, start_frame, end_frame, ball_mini_court_detections,
+                          player_mini_court_detections, video_fps, mini_court_width):
+    """
+    Build the stats row for the shot played at start_frame (ball travelling until end_frame)
+    from the previous cumulative stats row.
+    """
+    ball_shot_time_in_seconds = (end_frame - start_frame) / video_fps  # Use actual video FPS
+
+    #get distance covered by the ball
+    distance_covered_pixels = measure_distance(ball_mini_court_detections[start_frame][1], ball_mini_court_detections[end_frame][1])
+    distance_covered_meters = convert_pixel_distance_to_meters( distance_covered_pixels, constants.DOUBLE_LINE_WIDTH,
+                                                                mini_court_width)
+
+    #speed of ball shot in km/h
+    speed_of_ball_shot = distance_covered_meters / ball_shot_time_in_seconds * 3.6  # Convert m/s to km/h
+
+    #player who shot the ball
+    #find player closest to ball at start_frame
+    player_positions = player_mini_court_detections[start_frame]
+    player_shot_ball = min(player_positions.keys(), key=lambda player_id: measure_distance(player_positions[player_id],
+                                                                                           ball_mini_court_detections[start_frame][1]))
+
+    #opponent player speed
+    opponent_player_id = 1 if player_shot_ball == 2 else 2
+    distance_covered_pixels_opponent = measure_distance(player_mini_court_detections[start_frame][opponent_player_id],
+                                                      player_mini_court_detections[end_frame][opponent_player_id])
+    distance_covered_meters_opponent = convert_pixel_distance_to_meters(distance_covered_pixels_opponent,
+                                                                        constants.DOUBLE_LINE_WIDTH,
+                                                                        mini_court_width)
+
+    speed_of_opponent_player = distance_covered_meters_opponent / ball_shot_time_in_seconds * 3.6  # Convert m/s to km/h
+
+    current_player_stats = deepcopy(player_stats)
+    current_player_stats['frame_num'] = start_frame
+    current_player_stats[f'player_{player_shot_ball}_number_of_shots'] += 1
+    current_player_stats[f'player_{player_shot_ball}_total_shot_speed'] += speed_of_ball_shot
+    current_player_stats[f'player_{player_shot_ball}_last_shot_speed'] = speed_of_ball_shot
+
+    current_player_stats[f'player_{opponent_player_id}_total_player_speed'] += speed_of_opponent_player
+    current_player_stats[f'player_{opponent_player_id}_last_player_speed'] = speed_of_opponent_player
+
+    return current_player_stats
+
+def get_player_stats_dataframe(player_stats_data, frame_nums):
+    """
+    Expand the per-shot stats rows to one row per frame in frame_nums (each frame shows the
+    last row at or before it) and add the running averages.
+
+    frame_nums can be any increasing range of frames, so windowed processing can build the
+    table chunk by chunk.
+    """
+    player_stats_data_df = pd.DataFrame(player_stats_data)
+    frames_df = pd.DataFrame({'frame_num': frame_nums})
+    player_stats_data_df = pd.merge_asof(frames_df, player_stats_data_df, on='frame_num')
+
+    player_stats_data_df['player_1_average_shot_speed'] = player_stats_data_df['player_1_total_shot_speed'] / player_stats_data_df['player_1_number_of_shots']
+    player_stats_data_df['player_2_average_shot_speed'] = player_stats_data_df['player_2_total_shot_speed'] / player_stats_data_df['player_2_number_of_shots']
+    player_stats_data_df['player_1_average_player_speed'] = player_stats_data_df['player_1_total_player_speed'] / player_stats_data_df['player_2_number_of_shots']
+    player_stats_data_df['player_2_average_player_speed'] = player_stats_data_df['player_2_total_player_speed'] / player_stats_data_df['player_1_number_of_shots']
+
+    return player_stats_data_df
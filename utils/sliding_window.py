@@ -0,0 +1,120 @@
+from collections import deque
+
+import numpy as np
+
+from .bbox_utils import get_height_of_bbox
+
+
+class SlidingWindowMax:
+    """
+    Streaming maximum of values[max(0, i - look_behind):i + look_ahead] for every frame i,
+    with a monotonic deque (O(1) amortized per frame). Missing values (None / NaN) are skipped;
+    a window without any value gives NaN.
+
+    push() one value per frame; the maximum of frame i is final once frame i + look_ahead - 1
+    has been pushed and is returned by that push(), finish() returns the last frames (their
+    window is cut at the end). Only the deque is kept, so memory is O(window), not O(frames).
+    A window can start at frame `start`, as if `start` missing values had been pushed.
+    """
+
+    def __init__(self, look_behind, look_ahead, start=0):
+        self.look_behind = look_behind
+        self.look_ahead = look_ahead
+        self.candidates = deque()  # (frame, value), values strictly decreasing
+        self.pushed = start
+        self.emitted = max(0, start - look_ahead + 1)
+
+    def push(self, value):
+        """Add the next frame's value; returns the maxima that became final ([] or [maximum])"""
+        if value is not None and value == value:  # skip None and NaN
+            while self.candidates and self.candidates[-1][1] <= value:
+                self.candidates.pop()
+            self.candidates.append((self.pushed, value))
+        self.pushed += 1
+        if self.emitted + self.look_ahead <= self.pushed:
+            return [self._emit()]
+        return []
+
+    def finish(self):
+        """Maxima of the frames not returned yet"""
+        return [self._emit() for _ in range(self.pushed - self.emitted)]
+
+    def _emit(self):
+        frame_num = self.emitted
+        while self.candidates and self.candidates[0][0] < frame_num - self.look_behind:
+            self.candidates.popleft()
+        self.emitted += 1
+        return self.candidates[0][1] if self.candidates else np.nan
+
+
+def sliding_window_max(values, look_behind, look_ahead):
+    """Maximum of values[max(0, i - look_behind):i + look_ahead] for every i, NaN values skipped"""
+    window = SlidingWindowMax(look_behind, look_ahead)
+    maxima = []
+    for value in values:
+        maxima.extend(window.push(value))
+    maxima.extend(window.finish())
+    return np.array(maxima, dtype=np.float64)
+
+
+class PlayerHeightWindows:
+    """
+    Reference height of each player in each frame: the maximum bbox height over frames
+    [frame - look_behind, frame + look_ahead), one SlidingWindowMax per player ID. Players
+    seen for the first time start a window at the current frame (no height before it).
+
+    Final heights wait in self.pending until pop_heights() hands them out, so memory stays
+    at the windows plus the frames not consumed yet.
+    """
+
+    def __init__(self, look_behind=20, look_ahead=50):
+        self.look_behind = look_behind
+        self.look_ahead = look_ahead
+        self.windows = {}
+        self.pending = {}  # player_id: final heights of frames [released, ...)
+        self.frames = 0
+        self.released = 0
+        self.finished = False
+
+    def push(self, players):
+        """Add one frame of {player_id: bbox}"""
+        for player_id in players:
+            if player_id not in self.windows:
+                window = SlidingWindowMax(self.look_behind, self.look_ahead, start=self.frames)
+                self.windows[player_id] = window
+                self.pending[player_id] = [np.nan] * (window.emitted - self.released)
+        for player_id, window in self.windows.items():
+            bbox = players.get(player_id)
+            self.pending[player_id].extend(window.push(get_height_of_bbox(bbox) if bbox is not None else None))
+        self.frames += 1
+
+    def finish(self):
+        for player_id, window in self.windows.items():
+            self.pending[player_id].extend(window.finish())
+        self.finished = True
+
+    @property
+    def ready(self):
+        """Number of frames whose reference heights are final"""
+        if self.finished:
+            return self.frames
+        return max(0, self.frames - self.look_ahead + 1)
+
+    def pop_heights(self, end):
+        """{player_id: reference heights of frames [released, end)}, released afterwards"""
+        count = end - self.released
+        heights = {}
+        for player_id, pending in self.pending.items():
+            heights[player_id] = pending[:count]
+            del pending[:count]
+        self.released = end
+        return heights
+
+
+def get_player_reference_heights(player_boxes, look_behind=20, look_ahead=50):
+    """{player_id: per-frame max bbox height over [frame - look_behind, frame + look_ahead)} of a whole video"""
+    windows = PlayerHeightWindows(look_behind, look_ahead)
+    for players in player_boxes:
+        windows.push(players)
+    windows.finish()
+    return windows.pop_heights(len(player_boxes))
@@ -1,22 +1,336 @@
 import cv2
+import os
+import queue
+import threading
+import time
+from itertools import islice
+
+
+class VideoFrameSource:
+    """
+    Lazily decoded, re-iterable stream of video frames.
+
+    Frames are decoded one at a time while iterating, so peak memory stays at a
+    single frame instead of the whole video. Every iteration opens a fresh
+    capture, which lets several stages (detection, drawing, ...) walk over the
+    same video one after another.
+
+    Fps and resolution are read from the container metadata up front. len() is the
+    container's frame count until a full pass has decoded the video, then the number of
+    frames actually decoded (CAP_PROP_FRAME_COUNT is only an estimate for many containers,
+    so per-frame results should be sized by what was decoded, e.g. len(player_detections)).
+    """
+
+    def __init__(self, video_path):
+        self.video_path = video_path
+
+        cap = cv2.VideoCapture(video_path)
+        self.frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.fps = cap.get(cv2.CAP_PROP_FPS)
+        self.width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fourcc = int(cap.get(cv2.CAP_PROP_FOURCC))
+        self.fourcc = "".join(chr((fourcc >> 8 * i) & 0xFF) for i in range(4)).strip("\x00")
+        cap.release()
+
+    def __len__(self):
+        """Frame count: a metadata estimate until the video was decoded to the end once"""
+        return self.frame_count
+
+    def __iter__(self):
+        cap = cv2.VideoCapture(self.video_path)
+        try:
+            decoded = 0
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                decoded += 1
+                yield frame
+            self.frame_count = decoded
+        finally:
+            cap.release()
+
+    @property
+    def resolution(self):
+        """(width, height) of the decoded frames"""
+        return (self.width, self.height)
+
+    def read_frame(self, index=0):
+        """Decode a single frame by index (e.g. the first frame for court detection)."""
+        return next(islice(iter(self), index, None), None)
+
+    def read_frames(self, indices):
+        """
+        Decode the frames at sorted indices spread over the video (e.g. engine calibration
+        samples) by seeking instead of decoding every frame in between. Indices past the
+        last decodable frame are skipped.
+        """
+        cap = cv2.VideoCapture(self.video_path)
+        frames = []
+        try:
+            position = 0
+            for index in indices:
+                if index != position:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                frames.append(frame)
+                position = index + 1
+        finally:
+            cap.release()
+        return frames
+
+
+class PrefetchingFrameSource(VideoFrameSource):
+    """
+    VideoFrameSource that decodes on a background thread.
+
+    Frames are read ahead into a bounded queue of queue_size frames, so decoding
+    overlaps with whatever the consumer does with each frame (YOLO, drawing, ...)
+    and memory stays at queue_size frames. cv2 releases the GIL while decoding, so
+    the wall-clock time approaches max(decode, consumer) instead of their sum.
+
+    Throughput counters accumulate over all iterations:
+    - frames_decoded / decode_seconds: time spent inside cap.read()
+    - wait_seconds: time the consumer was blocked on an empty queue
+      (close to zero means decoding is not the bottleneck)
+    """
+
+    _END = object()
+
+    def __init__(self, video_path, queue_size=32):
+        super().__init__(video_path)
+        self.queue_size = queue_size
+        self.frames_decoded = 0
+        self.decode_seconds = 0.0
+        self.wait_seconds = 0.0
+
+    def __iter__(self):
+        frame_queue = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        decoder = threading.Thread(target=self._decode, args=(frame_queue, stop), daemon=True)
+        decoder.start()
+        try:
+            while True:
+                start = time.perf_counter()
+                item = frame_queue.get()
+                self.wait_seconds += time.perf_counter() - start
+                if item is self._END:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # Also reached when the consumer stops early (e.g. read_frame)
+            stop.set()
+            decoder.join()
+
+    def _decode(self, frame_queue, stop):
+        cap = cv2.VideoCapture(self.video_path)
+        try:
+            decoded = 0
+            while not stop.is_set():
+                start = time.perf_counter()
+                ret, frame = cap.read()
+                if not ret:
+                    self.frame_count = decoded  # decoded to the end: exact length
+                    break
+                self.decode_seconds += time.perf_counter() - start
+                self.frames_decoded += 1
+                decoded += 1
+                self._put(frame_queue, frame, stop)
+        except Exception as e:
+            self._put(frame_queue, e, stop)
+        finally:
+            cap.release()
+            self._put(frame_queue, self._END, stop)
+
+    def _put(self, frame_queue, item, stop):
+        """Blocking put that gives up once the consumer has stopped iterating"""
+        while not stop.is_set():
+            try:
+                frame_queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    @property
+    def decode_fps(self):
+        """Frames per second the decoder thread achieves on its own"""
+        return self.frames_decoded / self.decode_seconds if self.decode_seconds > 0 else 0.0
+
+    def get_throughput_stats(self):
+        return {
+            'frames_decoded': self.frames_decoded,
+            'decode_seconds': self.decode_seconds,
+            'decode_fps': self.decode_fps,
+            'consumer_wait_seconds': self.wait_seconds,
+        }
+
+
+def open_video(video_path, prefetch=32):
+    """Frame source for video_path, decoding on a background thread unless prefetch is 0."""
+    if prefetch and prefetch > 0:
+        return PrefetchingFrameSource(video_path, queue_size=prefetch)
+    return VideoFrameSource(video_path)
+
+
+def iter_batches(frames, batch_size):
+    """Yield consecutive lists of at most batch_size frames from any iterable of frames."""
+    iterator = iter(frames)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
 
 def read_video(video_path):
     """Reads a video file and returns its frames as a list of numpy arrays."""
-    cap = cv2.VideoCapture(video_path)
-    frames = []
-    
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-        frames.append(frame)
-
-    cap.release()
-    return frames
-
-def save_video(output_video_frames, output_video_path, fps=30):
-    fourcc = cv2.VideoWriter_fourcc(*'MJPG')
-    out = cv2.VideoWriter(output_video_path, fourcc, fps, (output_video_frames[0].shape[1], output_video_frames[0].shape[0]))
-    for frame in output_video_frames:
-        out.write(frame)
-    out.release()
+    return list(VideoFrameSource(video_path))
+
+
+# Codecs cv2.VideoWriter writes into each container, the first one is the default
+CONTAINER_CODECS = {
+    '.avi': ('MJPG', 'XVID', 'DIVX'),
+    '.mp4': ('mp4v', 'avc1'),
+    '.mkv': ('MJPG', 'XVID', 'mp4v', 'avc1'),
+}
+
+
+def codec_for_container(output_video_path, preferred=None):
+    """preferred (e.g. the source fourcc) if the output container takes it, else the container default"""
+    codecs = CONTAINER_CODECS.get(os.path.splitext(output_video_path)[1].lower(), ('MJPG',))
+    return preferred if preferred in codecs else codecs[0]
+
+
+class AsyncVideoWriter:
+    """
+    Video writer that accepts frames one at a time and encodes them on a background thread.
+
+    write() only enqueues the frame (blocking while queue_size frames are waiting), so
+    rendering the next frame overlaps with encoding the previous ones and the output
+    video never has to exist as a list. The cv2.VideoWriter is opened on the first
+    frame, which gives the output resolution; an IOError is raised (on a later write()
+    or on close()) if it cannot be opened, e.g. for a codec the container does not take.
+    Use it as a context manager or call close().
+
+    frames_written / encode_seconds count the time spent inside VideoWriter.write().
+    """
+
+    _END = object()
+
+    def __init__(self, output_video_path, fps=30, codec='MJPG', queue_size=32):
+        self.output_video_path = output_video_path
+        self.fps = fps
+        self.codec = codec
+        self.frames_written = 0
+        self.encode_seconds = 0.0
+
+        self._error = None
+        self._closed = False
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._encoder = threading.Thread(target=self._encode, daemon=True)
+        self._encoder.start()
+
+    @classmethod
+    def for_source(cls, output_video_path, source, codec=None, fps=None, queue_size=32):
+        """
+        Writer using the fps (unless fps is given) of a VideoFrameSource and, unless codec is
+        given, its codec when the output container takes it (an .mp4 avc1 source written to
+        .avi becomes MJPG).
+        """
+        codec = codec or codec_for_container(output_video_path, getattr(source, 'fourcc', None))
+        return cls(output_video_path, fps=fps or source.fps, codec=codec, queue_size=queue_size)
+
+    def write(self, frame):
+        if self._closed:
+            raise ValueError("write() on a closed AsyncVideoWriter")
+        if self._error is not None:
+            raise self._error
+        self._queue.put(frame)
+
+    def close(self):
+        """Wait until every queued frame is encoded and release the file."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(self._END)
+        self._encoder.join()
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+            return
+        # An exception is already in flight: release the file without hiding it
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    def _encode(self):
+        out = None
+        try:
+            while True:
+                frame = self._queue.get()
+                if frame is self._END:
+                    return
+                if self._error is not None:
+                    continue  # keep draining so write() never blocks after a failure
+                try:
+                    if out is None:
+                        fourcc = cv2.VideoWriter_fourcc(*self.codec)
+                        out = cv2.VideoWriter(self.output_video_path, fourcc, self.fps,
+                                              (frame.shape[1], frame.shape[0]))
+                        if not out.isOpened():
+                            raise IOError(f"Could not open video writer for {self.output_video_path} "
+                                          f"(codec {self.codec})")
+                    start = time.perf_counter()
+                    out.write(frame)
+                    self.encode_seconds += time.perf_counter() - start
+                    self.frames_written += 1
+                except Exception as e:
+                    self._error = e
+        finally:
+            if out is not None:
+                out.release()
+
+    @property
+    def encode_fps(self):
+        """Frames per second the encoder thread achieves on its own"""
+        return self.frames_written / self.encode_seconds if self.encode_seconds > 0 else 0.0
+
+    def get_throughput_stats(self):
+        return {
+            'frames_written': self.frames_written,
+            'encode_seconds': self.encode_seconds,
+            'encode_fps': self.encode_fps,
+        }
+
+
+def save_video(output_video_frames, output_video_path, fps=None, codec=None, source=None):
+    """
+    Write frames from a list or any iterable (e.g. a generator of annotated frames).
+
+    fps and codec default to those of source (the input VideoFrameSource, see
+    AsyncVideoWriter.for_source); without one to 30 fps and the output container's default
+    codec. Encoding runs on a background thread; the finished AsyncVideoWriter is returned
+    for its throughput counters.
+    """
+    if source is not None:
+        writer = AsyncVideoWriter.for_source(output_video_path, source, codec=codec, fps=fps)
+    else:
+        writer = AsyncVideoWriter(output_video_path, fps=fps or 30,
+                                  codec=codec or codec_for_container(output_video_path))
+
+    with writer:
+        for frame in output_video_frames:
+            writer.write(frame)
+    return writer